@@ -1,4 +1,4 @@
-from fastapi import HTTPException, status, Depends
+from fastapi import HTTPException, status, Depends, Request
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from typing import Optional
 from auth_utils import decode_access_token
@@ -13,11 +13,9 @@ load_dotenv(ROOT_DIR / '.env')
 
 security = HTTPBearer()
 
-async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security)):
-    """Dependency to get current authenticated user"""
-    token = credentials.credentials
-    
-    payload = decode_access_token(token)
+def user_id_from_credentials(credentials: HTTPAuthorizationCredentials) -> str:
+    """Decode the bearer token and return its user id, without a database lookup"""
+    payload = decode_access_token(credentials.credentials)
     if payload is None:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -32,6 +30,16 @@ async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(s
             detail="Could not validate credentials",
             headers={"WWW-Authenticate": "Bearer"},
         )
+    return user_id
+
+async def get_current_user(request: Request, credentials: HTTPAuthorizationCredentials = Depends(security)):
+    """Dependency to get current authenticated user"""
+    # Sub-requests of /api/batch reuse the user the batch request already authenticated
+    shared_user = getattr(request.state, "current_user", None)
+    if shared_user is not None:
+        return shared_user
+
+    user_id = user_id_from_credentials(credentials)
     
     # Get user from database
     pool = await get_pool()
@@ -50,12 +58,12 @@ async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(s
     
     return record_to_dict(user_record)
 
-async def get_current_user_optional(credentials: Optional[HTTPAuthorizationCredentials] = Depends(HTTPBearer(auto_error=False))):
+async def get_current_user_optional(request: Request, credentials: Optional[HTTPAuthorizationCredentials] = Depends(HTTPBearer(auto_error=False))):
     """Dependency to get current user if authenticated, otherwise None"""
     if credentials is None:
         return None
     
     try:
-        return await get_current_user(credentials)
+        return await get_current_user(request, credentials)
     except HTTPException:
         return None
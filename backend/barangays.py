@@ -0,0 +1,117 @@
+"""
+Barangay boundaries loaded from a GeoJSON file
+
+BARANGAY_GEOJSON_PATH (default backend/data/barangays.geojson) holds one feature
+per barangay with Polygon or MultiPolygon geometry (Point features are accepted
+and have no boundary). The file is read once per process. When it is missing or
+unreadable every lookup returns no barangays, so features built on top of it
+degrade instead of failing.
+
+Each barangay is a dict:
+    name      from the first of NAME_PROPERTIES present on the feature
+    lat, lon  area-weighted centroid of the boundary
+    polygons  list of polygons, each a list of rings as (N, 2) lon/lat arrays,
+              outer ring first
+"""
+import json
+import logging
+import os
+from pathlib import Path
+
+import numpy as np
+
+
+BARANGAY_GEOJSON_PATH = Path(os.environ.get(
+    'BARANGAY_GEOJSON_PATH', Path(__file__).parent / 'data' / 'barangays.geojson'
+))
+NAME_PROPERTIES = ('name', 'NAME', 'barangay', 'ADM4_EN', 'NAME_3')
+
+logger = logging.getLogger(__name__)
+
+_barangays = None
+
+
+def _ring_moments(ring):
+    """Unsigned area and centroid of a closed lon/lat ring (planar shoelace)"""
+    x, y = ring[:, 0], ring[:, 1]
+    cross = x[:-1] * y[1:] - x[1:] * y[:-1]
+    area = cross.sum() / 2
+    if area == 0:
+        return 0.0, x.mean(), y.mean()
+    return abs(area), ((x[:-1] + x[1:]) * cross).sum() / (6 * area), ((y[:-1] + y[1:]) * cross).sum() / (6 * area)
+
+
+def polygons_centroid(polygons):
+    """(lat, lon) centroid of polygons with holes, weighted by area"""
+    total = sum_x = sum_y = 0.0
+    for rings in polygons:
+        for index, ring in enumerate(rings):
+            area, x, y = _ring_moments(ring)
+            sign = 1 if index == 0 else -1  # holes subtract
+            total += sign * area
+            sum_x += sign * area * x
+            sum_y += sign * area * y
+    if total <= 0:
+        points = np.concatenate([rings[0] for rings in polygons])
+        return float(points[:, 1].mean()), float(points[:, 0].mean())
+    return sum_y / total, sum_x / total
+
+
+def _closed_ring(coordinates):
+    ring = np.asarray(coordinates, dtype=float)[:, :2]
+    if not np.array_equal(ring[0], ring[-1]):
+        ring = np.vstack([ring, ring[:1]])
+    return ring
+
+
+def geometry_polygons(geometry):
+    """Polygons (lists of closed lon/lat rings) of a Polygon or MultiPolygon, else None"""
+    kind, coordinates = geometry.get('type'), geometry.get('coordinates')
+    if not coordinates:
+        return None
+    if kind == 'Polygon':
+        coordinates = [coordinates]
+    elif kind != 'MultiPolygon':
+        return None
+    return [[_closed_ring(ring) for ring in polygon] for polygon in coordinates if polygon]
+
+
+def _parse_feature(feature):
+    properties = feature.get('properties') or {}
+    name = next((properties[key] for key in NAME_PROPERTIES if properties.get(key)), None)
+    geometry = feature.get('geometry') or {}
+    if not name or not geometry.get('coordinates'):
+        return None
+
+    if geometry.get('type') == 'Point':
+        coordinates = geometry['coordinates']
+        return {'name': name, 'lat': float(coordinates[1]), 'lon': float(coordinates[0]), 'polygons': []}
+    polygons = geometry_polygons(geometry)
+    if not polygons:
+        return None
+    lat, lon = polygons_centroid(polygons)
+    return {'name': name, 'lat': float(lat), 'lon': float(lon), 'polygons': polygons}
+
+
+def load_barangays(path=None):
+    """All barangays from the GeoJSON file, or [] when it is not available"""
+    global _barangays
+    if _barangays is not None and path is None:
+        return _barangays
+
+    source = Path(path) if path else BARANGAY_GEOJSON_PATH
+    try:
+        with open(source) as f:
+            features = json.load(f).get('features', [])
+        barangays = [parsed for parsed in map(_parse_feature, features) if parsed]
+    except FileNotFoundError:
+        logger.warning("No barangay boundaries at %s; barangay lookups are disabled", source)
+        barangays = []
+    except (ValueError, TypeError, KeyError, IndexError) as e:
+        logger.error("Could not read barangay boundaries from %s: %s", source, e)
+        barangays = []
+
+    if path is None:
+        _barangays = barangays
+    return barangays
+
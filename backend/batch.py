@@ -0,0 +1,127 @@
+"""
+In-process dispatch of batched GET sub-requests
+
+/api/batch lets clients on high-latency links fetch several endpoints in one
+HTTP round trip. Each sub-request is run through the ASGI app itself (routing,
+dependencies and middleware included) without touching the network, and all of
+them run concurrently.
+"""
+import asyncio
+import json
+import logging
+
+
+MAX_BATCH_REQUESTS = 20
+SUB_REQUEST_TIMEOUT = 10.0
+
+# Request headers a sub-request may set itself; others come from the batch request
+ALLOWED_SUB_REQUEST_HEADERS = {'if-none-match', 'accept-language'}
+# Response headers worth returning per item
+FORWARDED_RESPONSE_HEADERS = {'etag', 'cache-control', 'last-modified', 'retry-after'}
+
+logger = logging.getLogger(__name__)
+
+
+class BatchRequestError(ValueError):
+    """A sub-request cannot be dispatched"""
+
+
+def split_path(path, prefix='/api/', forbidden=('/api/batch',)):
+    """Validate a sub-request path and split off its query string"""
+    path, _, query = path.partition('?')
+    if not path.startswith(prefix) or '..' in path.split('/'):
+        raise BatchRequestError(f"Sub-request paths must start with {prefix}")
+    if path.rstrip('/') in forbidden:
+        raise BatchRequestError("Batches cannot be nested")
+    return path, query
+
+
+async def dispatch_get(app, parent_scope, path, query='', headers=None, state=None):
+    """Run one GET through the ASGI `app`; returns (status, headers, body bytes)"""
+    scope = {
+        'type': 'http',
+        'asgi': parent_scope.get('asgi', {'version': '3.0'}),
+        'http_version': parent_scope.get('http_version', '1.1'),
+        'method': 'GET',
+        'scheme': parent_scope.get('scheme', 'http'),
+        'server': parent_scope.get('server'),
+        'client': parent_scope.get('client'),
+        'root_path': parent_scope.get('root_path', ''),
+        'path': path,
+        'raw_path': path.encode(),
+        'query_string': query.encode(),
+        'headers': [(name.lower().encode(), value.encode()) for name, value in (headers or {}).items()],
+        'state': dict(state or {}),
+    }
+    response = {'status': 500, 'headers': [], 'body': bytearray()}
+    request_sent = False
+    finished = asyncio.Event()
+
+    async def receive():
+        nonlocal request_sent
+        if not request_sent:
+            request_sent = True
+            return {'type': 'http.request', 'body': b'', 'more_body': False}
+        await finished.wait()
+        return {'type': 'http.disconnect'}
+
+    async def send(message):
+        if message['type'] == 'http.response.start':
+            response['status'] = message['status']
+            response['headers'] = message.get('headers', [])
+        elif message['type'] == 'http.response.body':
+            response['body'].extend(message.get('body', b''))
+            if not message.get('more_body', False):
+                finished.set()
+
+    try:
+        await app(scope, receive, send)
+    finally:
+        finished.set()
+    decoded_headers = {name.decode().lower(): value.decode() for name, value in response['headers']}
+    return response['status'], decoded_headers, bytes(response['body'])
+
+
+def decode_body(headers, body):
+    """Embed JSON bodies as values and anything else as text"""
+    if not body:
+        return None
+    if headers.get('content-type', '').startswith('application/json'):
+        return json.loads(body)
+    return body.decode(errors='replace')
+
+
+async def run_batch(app, parent_scope, items, shared_headers, state):
+    """Dispatch `items` ({'path', 'headers', 'id'}) concurrently, preserving order"""
+
+    async def run(item):
+        result = {'id': item.get('id'), 'path': item['path']}
+        try:
+            path, query = split_path(item['path'])
+            headers = {
+                name: value for name, value in (item.get('headers') or {}).items()
+                if name.lower() in ALLOWED_SUB_REQUEST_HEADERS
+            }
+            headers.update(shared_headers)
+            status, response_headers, body = await asyncio.wait_for(
+                dispatch_get(app, parent_scope, path, query, headers, state), SUB_REQUEST_TIMEOUT
+            )
+            result.update(
+                status=status,
+                headers={name: value for name, value in response_headers.items() if name in FORWARDED_RESPONSE_HEADERS},
+                body=decode_body(response_headers, body),
+            )
+        except BatchRequestError as e:
+            result.update(status=400, body={'detail': str(e)})
+        except asyncio.TimeoutError:
+            result.update(status=504, body={'detail': 'Sub-request timed out'})
+        except ValueError as e:
+            # Only this item is broken; the rest of the batch is still answered
+            logger.warning("Undecodable response from batched %s: %s", item['path'], e)
+            result.update(status=500, body={'detail': 'Sub-response could not be decoded'})
+        except Exception:
+            # The app already logged the error while answering with a 500
+            result.update(status=500, body={'detail': 'Internal Server Error'})
+        return result
+
+    return await asyncio.gather(*(run(item) for item in items))
@@ -0,0 +1,367 @@
+"""
+Negotiated response compression (gzip, brotli, zstd)
+
+CompressionMiddleware is a pure ASGI middleware: it picks the best encoding the
+client accepts, compresses bodies above a size threshold with a level chosen by
+route, and streams compression for streaming responses. Server-sent events and
+responses that already carry a Content-Encoding pass through untouched.
+
+Payloads that never change are compressed once at startup with the highest
+levels (PrecompressedJSON) and served as cached bytes.
+
+In the other direction, DecompressionMiddleware inflates request bodies sent
+with Content-Encoding gzip or br as the app reads them, with limits against
+decompression bombs.
+
+brotli and zstandard are optional; without them only gzip is offered.
+"""
+import hashlib
+import json
+import os
+import zlib
+
+from starlette.exceptions import HTTPException
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - optional dependency
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover - optional dependency
+    zstandard = None
+
+
+# Server preference when the client weighs encodings equally
+ENCODING_PREFERENCE = [name for name, module in (('zstd', zstandard), ('br', brotli)) if module] + ['gzip']
+
+FAST = {'gzip': 1, 'br': 1, 'zstd': 1}
+BALANCED = {'gzip': 6, 'br': 5, 'zstd': 3}
+MAX = {'gzip': 9, 'br': 11, 'zstd': 19}
+
+COMPRESSIBLE_TYPES = (
+    'application/json', 'application/geo+json', 'application/x-ndjson',
+    'application/javascript', 'image/svg+xml', 'text/',
+)
+MINIMUM_SIZE = 1024
+
+
+class _Compressor:
+    """Incremental compressor with a uniform compress()/finish() interface"""
+
+    def __init__(self, encoding, level):
+        if encoding == 'gzip':
+            self._obj = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+            self.compress, self._finish = self._obj.compress, self._obj.flush
+        elif encoding == 'br':
+            self._obj = brotli.Compressor(quality=level)
+            self.compress, self._finish = self._obj.process, self._obj.finish
+        elif encoding == 'zstd':
+            self._obj = zstandard.ZstdCompressor(level=level).compressobj()
+            self.compress, self._finish = self._obj.compress, self._obj.flush
+        else:
+            raise ValueError(f"Unsupported encoding {encoding!r}")
+
+    def finish(self):
+        return self._finish()
+
+
+def compress(data, encoding, level):
+    compressor = _Compressor(encoding, level)
+    return compressor.compress(data) + compressor.finish()
+
+
+def negotiate_encoding(accept_encoding, available=None):
+    """Best encoding from an Accept-Encoding header, or None for identity"""
+    available = available or ENCODING_PREFERENCE
+    weights = {}
+    for part in (accept_encoding or '').split(','):
+        name, _, params = part.strip().partition(';')
+        name = name.strip().lower()
+        if not name:
+            continue
+        quality = 1.0
+        for param in params.split(';'):
+            key, _, value = param.strip().partition('=')
+            if key == 'q':
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        weights[name] = quality
+
+    best, best_quality = None, 0.0
+    for encoding in available:
+        quality = weights.get(encoding, weights.get('*', 0.0))
+        if quality > best_quality:
+            best, best_quality = encoding, quality
+    return best
+
+
+def etag_matches(if_none_match, etag):
+    """Weak comparison of an If-None-Match header against an ETag"""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == '*':
+        return True
+    opaque = etag.removeprefix('W/')
+    return any(candidate.strip().removeprefix('W/') == opaque for candidate in if_none_match.split(','))
+
+
+def _is_compressible(content_type):
+    content_type = content_type.split(';')[0].strip().lower()
+    return content_type != 'text/event-stream' and content_type.startswith(COMPRESSIBLE_TYPES)
+
+
+class CompressionMiddleware:
+    """Compress HTTP responses with the encoding negotiated per request.
+
+    `route_levels` maps path prefixes to level presets (FAST, BALANCED, MAX);
+    the longest matching prefix wins and other routes use `default_levels`.
+    """
+
+    def __init__(self, app, minimum_size=MINIMUM_SIZE, default_levels=BALANCED, route_levels=None):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.default_levels = default_levels
+        self.route_levels = sorted((route_levels or {}).items(), key=lambda item: -len(item[0]))
+
+    def _levels_for(self, path):
+        for prefix, levels in self.route_levels:
+            if path.startswith(prefix):
+                return levels
+        return self.default_levels
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+        headers = dict(scope.get('headers') or [])
+        encoding = negotiate_encoding(headers.get(b'accept-encoding', b'').decode('latin-1'))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        level = self._levels_for(scope['path'])[encoding]
+        start_message = None
+        compressor = None
+        passthrough = False
+
+        async def send_compressed(message):
+            nonlocal start_message, compressor, passthrough
+            if message['type'] == 'http.response.start':
+                response_headers = {name.lower(): value for name, value in message.get('headers', [])}
+                passthrough = (
+                    message['status'] in (204, 304)
+                    or b'content-encoding' in response_headers
+                    or not _is_compressible(response_headers.get(b'content-type', b'').decode('latin-1'))
+                )
+                if passthrough:
+                    await send(message)
+                else:
+                    # Held back until the first body chunk shows whether compressing pays off
+                    start_message = message
+                return
+            if message['type'] != 'http.response.body' or passthrough:
+                await send(message)
+                return
+
+            body = message.get('body', b'')
+            more_body = message.get('more_body', False)
+            if start_message is not None:
+                held, start_message = start_message, None
+                if not more_body and len(body) < self.minimum_size:
+                    passthrough = True
+                    await send(held)
+                    await send(message)
+                    return
+                compressor = _Compressor(encoding, level)
+                # The encoded bytes differ, so a strong validator becomes weak
+                response_headers = []
+                for name, value in held.get('headers', []):
+                    if name.lower() == b'content-length':
+                        continue
+                    if name.lower() == b'etag' and not value.startswith(b'W/'):
+                        value = b'W/' + value
+                    response_headers.append((name, value))
+                response_headers.append((b'content-encoding', encoding.encode()))
+                response_headers.append((b'vary', b'Accept-Encoding'))
+                if not more_body:
+                    body = compressor.compress(body) + compressor.finish()
+                    response_headers.append((b'content-length', str(len(body)).encode()))
+                    await send({**held, 'headers': response_headers})
+                    await send({'type': 'http.response.body', 'body': body})
+                    return
+                await send({**held, 'headers': response_headers})
+
+            chunk = compressor.compress(body)
+            if not more_body:
+                chunk += compressor.finish()
+            if chunk or not more_body:
+                await send({'type': 'http.response.body', 'body': chunk, 'more_body': more_body})
+
+        await self.app(scope, receive, send_compressed)
+
+
+class PrecompressedJSON:
+    """A constant JSON payload serialized and compressed once with every encoding"""
+
+    def __init__(self, payload, levels=MAX):
+        self.body = json.dumps(payload, separators=(',', ':')).encode()
+        self.etag = 'W/"' + hashlib.sha256(self.body).hexdigest()[:16] + '"'
+        self.encoded = {encoding: compress(self.body, encoding, levels[encoding]) for encoding in ENCODING_PREFERENCE}
+
+    def response_parts(self, accept_encoding, if_none_match=None):
+        """(status, headers, body) for a request with the given headers"""
+        headers = {'ETag': self.etag, 'Vary': 'Accept-Encoding', 'Content-Type': 'application/json'}
+        if etag_matches(if_none_match, self.etag):
+            return 304, headers, b''
+        encoding = negotiate_encoding(accept_encoding)
+        if encoding is None:
+            return 200, headers, self.body
+        headers['Content-Encoding'] = encoding
+        return 200, headers, self.encoded[encoding]
+
+
+# Limits for inflated request bodies
+MAX_DECOMPRESSED_BODY = int(os.environ.get('MAX_DECOMPRESSED_BODY_BYTES', 25 * 1024 * 1024))
+MAX_COMPRESSION_RATIO = 100
+# Ratios are only judged past this size; small JSON can legitimately shrink a lot
+RATIO_CHECK_AFTER = 1024 * 1024
+INFLATE_CHUNK = 64 * 1024
+BROTLI_INPUT_CHUNK = 1024
+
+
+class RequestBodyTooLarge(HTTPException):
+    def __init__(self, detail):
+        super().__init__(status_code=413, detail=detail)
+
+
+class _Decompressor:
+    """Incremental decompressor yielding bounded output chunks"""
+
+    def __init__(self, encoding):
+        self.encoding = encoding
+        if encoding == 'gzip':
+            self._obj = zlib.decompressobj(16 + zlib.MAX_WBITS)
+        else:
+            self._obj = brotli.Decompressor()
+
+    def feed(self, data):
+        if self.encoding == 'gzip':
+            while data:
+                chunk = self._obj.decompress(data, INFLATE_CHUNK)
+                data = self._obj.unconsumed_tail
+                yield chunk
+        else:
+            # brotli cannot cap its output, so keep each input slice small
+            for start in range(0, len(data), BROTLI_INPUT_CHUNK):
+                yield self._obj.process(data[start:start + BROTLI_INPUT_CHUNK])
+
+    def finish(self):
+        if self.encoding == 'gzip':
+            if not self._obj.eof:
+                raise zlib.error('truncated gzip body')
+            return self._obj.flush()
+        if not self._obj.is_finished():
+            raise brotli.error('truncated brotli body')
+        return b''
+
+
+class DecompressionMiddleware:
+    """Inflate gzip/br request bodies in a streaming way before the app reads them.
+
+    Bodies growing past `max_size` or `max_ratio` times their compressed size
+    are rejected with 413, malformed ones with 400 and other encodings with 415.
+    """
+
+    def __init__(self, app, max_size=MAX_DECOMPRESSED_BODY, max_ratio=MAX_COMPRESSION_RATIO):
+        self.app = app
+        self.max_size = max_size
+        self.max_ratio = max_ratio
+        self.encodings = ['gzip'] + (['br'] if brotli else [])
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+        headers = scope.get('headers') or []
+        encoding = dict(headers).get(b'content-encoding', b'identity').decode('latin-1').strip().lower()
+        if encoding == 'identity':
+            await self.app(scope, receive, send)
+            return
+        if encoding not in self.encodings:
+            await _send_error(send, 415, f"Unsupported Content-Encoding {encoding!r}",
+                              [(b'accept-encoding', ', '.join(self.encodings).encode())])
+            return
+
+        scope = dict(scope)
+        scope['headers'] = [
+            (name, value) for name, value in headers
+            if name not in (b'content-encoding', b'content-length')
+        ]
+        decompressor = _Decompressor(encoding)
+        pending = []
+        compressed_size = 0
+        inflated_size = 0
+        finished = False
+
+        def check(chunk):
+            nonlocal inflated_size
+            inflated_size += len(chunk)
+            if inflated_size > self.max_size:
+                raise RequestBodyTooLarge(f"Decompressed body exceeds {self.max_size} bytes")
+            if inflated_size > RATIO_CHECK_AFTER and inflated_size > compressed_size * self.max_ratio:
+                raise RequestBodyTooLarge("Compression ratio of the body is too high")
+            return chunk
+
+        async def receive_inflated():
+            nonlocal compressed_size, finished
+            while not pending:
+                if finished:
+                    return await receive()
+                message = await receive()
+                if message['type'] != 'http.request':
+                    return message
+                body = message.get('body', b'')
+                compressed_size += len(body)
+                try:
+                    pending.extend(check(chunk) for chunk in decompressor.feed(body) if chunk)
+                    if not message.get('more_body', False):
+                        finished = True
+                        tail = decompressor.finish()
+                        if tail:
+                            pending.append(check(tail))
+                        pending.append(b'')
+                except (zlib.error, *((brotli.error,) if brotli else ())):
+                    raise HTTPException(status_code=400, detail=f"Malformed {encoding} request body")
+            chunk = pending.pop(0)
+            return {'type': 'http.request', 'body': chunk, 'more_body': bool(pending) or not finished}
+
+        response_started = False
+
+        async def send_tracking(message):
+            nonlocal response_started
+            if message['type'] == 'http.response.start':
+                response_started = True
+            await send(message)
+
+        try:
+            await self.app(scope, receive_inflated, send_tracking)
+        except HTTPException as e:
+            # Raised while reading outside any exception-handling layer
+            if response_started:
+                raise
+            await _send_error(send, e.status_code, e.detail)
+
+
+async def _send_error(send, status_code, detail, extra_headers=()):
+    body = json.dumps({'detail': detail}).encode()
+    await send({
+        'type': 'http.response.start',
+        'status': status_code,
+        'headers': [(b'content-type', b'application/json'), (b'content-length', str(len(body)).encode()),
+                    *extra_headers],
+    })
+    await send({'type': 'http.response.body', 'body': body})
@@ -18,6 +18,10 @@ DATABASE_URL = os.environ.get('DATABASE_URL')
 if not DATABASE_URL:
     raise ValueError("DATABASE_URL environment variable is not set. Please configure it in backend/.env file.")
 
+# Session-level features (LISTEN, advisory locks held across transactions) need a
+# direct connection; Neon's "-pooler" endpoint runs PgBouncer in transaction mode
+DATABASE_DIRECT_URL = os.environ.get('DATABASE_DIRECT_URL', DATABASE_URL)
+
 # Global connection pool
 _pool: Optional[asyncpg.Pool] = None
 
@@ -106,3 +110,15 @@ def record_to_dict(record):
 def records_to_list(records):
     """Convert list of asyncpg Records to list of dicts"""
     return [dict(record) for record in records]
+
+
+async def primary_key_columns(conn, table):
+    """Ordered primary key column names of a table"""
+    rows = await conn.fetch('''
+        SELECT a.attname
+        FROM pg_index i
+        JOIN pg_attribute a ON a.attrelid = i.indrelid AND a.attnum = ANY(i.indkey)
+        WHERE i.indrelid = $1::regclass AND i.indisprimary
+        ORDER BY array_position(i.indkey::int2[], a.attnum)
+    ''', table)
+    return [row['attname'] for row in rows]
@@ -0,0 +1,88 @@
+"""
+Local stand-in for the upstream typhoon bulletin feed
+
+Serves GET /bulletin/latest in the format HttpBulletinSource expects, with an
+ETag. Every --advance seconds a new bulletin is issued: the storm moves along
+its forecast track, so ingestion, history and the snapshot can be exercised
+end to end without the real feed.
+
+Usage:
+    python dev_typhoon_feed.py --port 8765 --advance 120
+    TYPHOON_FEED_URL=http://localhost:8765/bulletin/latest uvicorn server:app
+"""
+import argparse
+import hashlib
+import json
+import time
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+TRACK = [(13.0, 125.0), (13.6, 123.9), (14.3, 122.6), (15.2, 120.5), (16.0, 119.0),
+         (17.5, 117.5), (19.0, 116.0), (20.4, 114.8)]
+
+
+def bulletin_at(step, issued_at):
+    lat, lon = TRACK[step % len(TRACK)]
+    ahead = [TRACK[(step + n) % len(TRACK)] for n in (1, 2, 3)]
+    return {
+        'id': f'DEV-{step:04d}',
+        'name': 'Typhoon DEV',
+        'local_name': 'Tester',
+        'issued_at': issued_at.isoformat().replace('+00:00', 'Z'),
+        'center': {'lat': lat, 'lon': lon},
+        'max_wind_kph': 150 + 5 * (step % 8),
+        'movement': 'West northwest at 20 km/h',
+        'intensity': 'Typhoon',
+        'pressure_hpa': 970 - step % 8,
+        'wind_radii_km': {'storm': 100, 'gale': 250},
+        'forecast': [
+            {'hours': 24 * (n + 1), 'lat': point[0], 'lon': point[1], 'intensity': 'Typhoon'}
+            for n, point in enumerate(ahead)
+        ],
+        'warnings': ['Development feed - not a real bulletin'],
+        'satellite_image_url': None,
+    }
+
+
+def make_handler(started, advance):
+    class FeedHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split('?')[0] != '/bulletin/latest':
+                self.send_error(404)
+                return
+            step = int((time.time() - started) // advance)
+            issued_at = datetime.fromtimestamp(started + step * advance, timezone.utc)
+            body = json.dumps(bulletin_at(step, issued_at)).encode()
+            etag = f'"{hashlib.sha1(body).hexdigest()[:16]}"'
+            if self.headers.get('If-None-Match') == etag:
+                self.send_response(304)
+                self.send_header('ETag', etag)
+                self.end_headers()
+                return
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.send_header('ETag', etag)
+            self.end_headers()
+            self.wfile.write(body)
+
+    return FeedHandler
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--advance', type=float, default=120, help='seconds between bulletins')
+    args = parser.parse_args()
+
+    server = ThreadingHTTPServer(('127.0.0.1', args.port), make_handler(time.time(), args.advance))
+    print(f'Serving bulletins on http://127.0.0.1:{args.port}/bulletin/latest')
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
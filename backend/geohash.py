@@ -0,0 +1,110 @@
+"""
+Geohash encoding and bounding-box covers for indexed viewport queries
+
+Incidents store a geohash of their location (STORED_PRECISION characters,
+about 5 m). A geohash prefix is a lon/lat cell, and all points in a cell sort
+together, so a bounding box becomes a handful of string ranges over the btree
+index on incidents.geohash: cover() picks the cells and prefix_ranges() merges
+neighbours on the curve into ranges. The exact latitude/longitude check then
+only trims the edges of the cover.
+"""
+import numpy as np
+
+
+BASE32 = '0123456789bcdefghjkmnpqrstuvwxyz'
+STORED_PRECISION = 9
+# More cells fit a viewport more tightly but mean more index ranges to scan
+MAX_COVER_CELLS = 32
+
+
+def _bit_counts(precision):
+    total = 5 * precision
+    return (total + 1) // 2, total // 2  # longitude bits come first
+
+
+def cell_size(precision):
+    """(height, width) in degrees of a cell at `precision`"""
+    lon_bits, lat_bits = _bit_counts(precision)
+    return 180 / 2 ** lat_bits, 360 / 2 ** lon_bits
+
+
+def _quantize(value, low, high, bits):
+    cells = 2 ** bits
+    return min(int((value - low) / (high - low) * cells), cells - 1)
+
+
+def encode(lat, lon, precision=STORED_PRECISION):
+    lon_bits, lat_bits = _bit_counts(precision)
+    x = _quantize(lon, -180, 180, lon_bits)
+    y = _quantize(lat, -90, 90, lat_bits)
+    code = 0
+    for bit in range(5 * precision):
+        if bit % 2 == 0:
+            lon_bits -= 1
+            code = code << 1 | (x >> lon_bits) & 1
+        else:
+            lat_bits -= 1
+            code = code << 1 | (y >> lat_bits) & 1
+    return ''.join(BASE32[(code >> shift) & 31] for shift in range(5 * (precision - 1), -1, -5))
+
+
+def encode_many(lats, lons, precision=STORED_PRECISION):
+    """encode() over arrays of points"""
+    lon_bits, lat_bits = _bit_counts(precision)
+    x = np.minimum(((np.asarray(lons, dtype=float) + 180) / 360 * 2 ** lon_bits).astype(np.int64), 2 ** lon_bits - 1)
+    y = np.minimum(((np.asarray(lats, dtype=float) + 90) / 180 * 2 ** lat_bits).astype(np.int64), 2 ** lat_bits - 1)
+    code = np.zeros(len(x), dtype=np.int64)
+    for bit in range(5 * precision):
+        if bit % 2 == 0:
+            lon_bits -= 1
+            code = code << 1 | (x >> lon_bits) & 1
+        else:
+            lat_bits -= 1
+            code = code << 1 | (y >> lat_bits) & 1
+    alphabet = np.array(list(BASE32))
+    chars = [alphabet[(code >> shift) & 31] for shift in range(5 * (precision - 1), -1, -5)]
+    return [''.join(row) for row in zip(*chars)]
+
+
+def _cell_span(low, high, origin, size):
+    limit = int(round(2 * -origin / size)) - 1
+    return max(int((low - origin) // size), 0), min(int((high - origin) // size), limit)
+
+
+def cover(min_lat, min_lon, max_lat, max_lon, max_cells=MAX_COVER_CELLS):
+    """Sorted geohash prefixes whose cells together contain the bounding box"""
+    best = ['']
+    for precision in range(1, STORED_PRECISION + 1):
+        height, width = cell_size(precision)
+        rows = _cell_span(min_lat, max_lat, -90, height)
+        columns = _cell_span(min_lon, max_lon, -180, width)
+        if (rows[1] - rows[0] + 1) * (columns[1] - columns[0] + 1) > max_cells:
+            break
+        best = sorted(
+            encode(-90 + (row + 0.5) * height, -180 + (column + 0.5) * width, precision)
+            for row in range(rows[0], rows[1] + 1)
+            for column in range(columns[0], columns[1] + 1)
+        )
+    return best
+
+
+def _successor(prefix):
+    """Next prefix of the same length in sort order, or None after the last one"""
+    digits = [BASE32.index(char) for char in prefix]
+    for position in range(len(digits) - 1, -1, -1):
+        if digits[position] < 31:
+            digits[position] += 1
+            return ''.join(BASE32[digit] for digit in digits[:position + 1]) + '0' * (len(digits) - position - 1)
+        digits[position] = 0
+    return None
+
+
+def prefix_ranges(prefixes):
+    """Merge sorted equal-length prefixes into [low, high) ranges (high None = unbounded)"""
+    ranges = []
+    for prefix in prefixes:
+        if ranges and ranges[-1][1] == prefix:
+            ranges[-1][1] = _successor(prefix)
+        else:
+            ranges.append([prefix, _successor(prefix)])
+    return [tuple(bounds) for bounds in ranges]
@@ -0,0 +1,207 @@
+"""
+Hazard-zone map layers (flood, landslide, storm surge, ...)
+
+Every <name>.geojson file in HAZARD_DATA_DIR (default backend/data/hazards) is
+one layer of Polygon/MultiPolygon zones. Each zone's hazard level comes from
+the first of LEVEL_PROPERTIES present on it. Raw hazard maps are far too
+detailed for phones, so each layer is simplified once at load
+(Douglas-Peucker) for every zoom level from MIN_ZOOM to MAX_ZOOM, with a
+tolerance of SIMPLIFY_PIXELS screen pixels at that zoom.
+
+Tiles are served per slippy-map z/x/y: the zones whose bounding box overlaps
+the tile, with the geometry for that zoom. Zones are not clipped, so a zone
+crossing tiles appears in each and clients dedupe by feature id. Layers are
+loaded once per process, so a replaced file takes effect on restart. The layer
+version is a hash of the file as loaded, so tile URLs carrying it can be cached
+indefinitely.
+
+Point queries use the grid index from spatial_index.py on the full geometry.
+A missing directory means no layers, not an error.
+"""
+import hashlib
+import json
+import logging
+import math
+import os
+from functools import lru_cache
+from pathlib import Path
+
+import numpy as np
+
+from barangays import geometry_polygons
+from spatial_index import PolygonIndex
+
+
+HAZARD_DATA_DIR = Path(os.environ.get('HAZARD_DATA_DIR', Path(__file__).parent / 'data' / 'hazards'))
+LEVEL_PROPERTIES = ('level', 'LEVEL', 'susceptibility', 'HAZ', 'Var')
+MIN_ZOOM = 8
+MAX_ZOOM = 16
+# Deepest zoom accepted in tile requests; past MAX_ZOOM the MAX_ZOOM geometry is reused
+MAX_TILE_ZOOM = 22
+TILE_SIZE = 256
+SIMPLIFY_PIXELS = 0.5
+
+logger = logging.getLogger(__name__)
+
+_layers = None
+
+
+def _segment_distances(points, start, end):
+    """Planar distances of points to the segment start-end"""
+    direction = end - start
+    length = direction @ direction
+    if length == 0:
+        return np.hypot(*(points - start).T)
+    t = np.clip((points - start) @ direction / length, 0, 1)
+    return np.hypot(*(points - (start + t[:, None] * direction)).T)
+
+
+def simplify_ring(ring, tolerance):
+    """Douglas-Peucker simplification of a closed ring; keeps both ends"""
+    if len(ring) <= 4:
+        return ring
+    keep = np.zeros(len(ring), dtype=bool)
+    keep[0] = keep[-1] = True
+    stack = [(0, len(ring) - 1)]
+    while stack:
+        first, last = stack.pop()
+        if last - first < 2:
+            continue
+        distances = _segment_distances(ring[first + 1:last], ring[first], ring[last])
+        farthest = int(distances.argmax())
+        if distances[farthest] > tolerance:
+            split = first + 1 + farthest
+            keep[split] = True
+            stack.append((first, split))
+            stack.append((split, last))
+    return ring[keep]
+
+
+def zoom_tolerance(zoom):
+    """Degrees covered by SIMPLIFY_PIXELS screen pixels at `zoom`"""
+    return 360 / (TILE_SIZE * 2 ** zoom) * SIMPLIFY_PIXELS
+
+
+def simplify_polygons(polygons, tolerance):
+    """GeoJSON geometry of the simplified polygons, or None when nothing is left"""
+    decimals = max(0, math.ceil(-math.log10(tolerance))) + 1
+    simplified = []
+    for outer, *holes in polygons:
+        outer = simplify_ring(outer, tolerance)
+        if len(outer) < 4:  # collapsed below a triangle at this zoom
+            continue
+        rings = [outer] + [ring for ring in (simplify_ring(hole, tolerance) for hole in holes) if len(ring) >= 4]
+        simplified.append([ring.round(decimals).tolist() for ring in rings])
+    if not simplified:
+        return None
+    if len(simplified) == 1:
+        return {'type': 'Polygon', 'coordinates': simplified[0]}
+    return {'type': 'MultiPolygon', 'coordinates': simplified}
+
+
+def valid_tile(z, x, y):
+    """Whether z/x/y names an existing slippy-map tile up to MAX_TILE_ZOOM"""
+    return 0 <= z <= MAX_TILE_ZOOM and 0 <= x < 2 ** z and 0 <= y < 2 ** z
+
+
+def tile_bounds(z, x, y):
+    """(lon_min, lat_min, lon_max, lat_max) of a slippy-map tile"""
+    scale = 2 ** z
+
+    def lat(row):
+        return math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * row / scale))))
+
+    return x / scale * 360 - 180, lat(y + 1), (x + 1) / scale * 360 - 180, lat(y)
+
+
+class HazardLayer:
+    """Zones of one hazard map with their per-zoom simplified geometry"""
+
+    def __init__(self, name, features, version):
+        self.name = name
+        self.version = version
+        self.zones = []
+        for feature in features:
+            polygons = geometry_polygons(feature.get('geometry') or {})
+            if not polygons:
+                continue
+            properties = feature.get('properties') or {}
+            level = next((properties[key] for key in LEVEL_PROPERTIES if properties.get(key) is not None), None)
+            self.zones.append({
+                'id': len(self.zones),
+                'level': level,
+                'properties': properties,
+                'polygons': polygons,
+            })
+        self.index = PolygonIndex(self.zones)
+        self.simplified = {
+            zoom: [simplify_polygons(zone['polygons'], zoom_tolerance(zoom)) for zone in self.zones]
+            for zoom in range(MIN_ZOOM, MAX_ZOOM + 1)
+        }
+
+    def describe(self):
+        boxes = self.index.boxes
+        return {
+            'name': self.name,
+            'version': self.version,
+            'zones': len(self.zones),
+            'levels': sorted({str(zone['level']) for zone in self.zones if zone['level'] is not None}),
+            'bounds': [float(v) for v in (*boxes[:, :2].min(axis=0), *boxes[:, 2:].max(axis=0))] if len(boxes) else None,
+            'min_zoom': MIN_ZOOM,
+            'max_zoom': MAX_ZOOM,
+        }
+
+    def tile(self, z, x, y):
+        """GeoJSON FeatureCollection of the zones overlapping the tile"""
+        features = []
+        if z >= MIN_ZOOM:
+            geometries = self.simplified[min(z, MAX_ZOOM)]
+            for number in self.index.intersecting(*tile_bounds(z, x, y)):
+                zone = self.index.entries[number]
+                if geometries[zone['id']] is not None:
+                    features.append({
+                        'type': 'Feature',
+                        'id': zone['id'],
+                        'properties': {'layer': self.name, 'level': zone['level']},
+                        'geometry': geometries[zone['id']],
+                    })
+        return {'type': 'FeatureCollection', 'features': features}
+
+    def zones_at(self, lat, lon):
+        return [
+            {'layer': self.name, 'id': zone['id'], 'level': zone['level'], 'properties': zone['properties']}
+            for zone in self.index.containing(lat, lon)
+        ]
+
+
+def load_hazard_layers(directory=None):
+    """All layers in the hazard data directory by name ({} when there is none)"""
+    global _layers
+    if _layers is not None and directory is None:
+        return _layers
+
+    source = Path(directory) if directory else HAZARD_DATA_DIR
+    layers = {}
+    if not source.is_dir():
+        logger.warning("No hazard maps at %s; hazard layers are disabled", source)
+    for path in sorted(source.glob('*.geojson')) if source.is_dir() else []:
+        try:
+            raw = path.read_bytes()
+            layers[path.stem] = HazardLayer(
+                path.stem, json.loads(raw).get('features', []), hashlib.sha256(raw).hexdigest()[:12]
+            )
+        except (ValueError, TypeError, KeyError, IndexError) as e:
+            logger.error("Could not read hazard map %s: %s", path, e)
+
+    if directory is None:
+        _layers = layers
+    return layers
+
+
+@lru_cache(maxsize=2048)
+def tile_json(name, version, z, x, y):
+    """Serialized tile; `version` is part of the cache key so new files are never served stale"""
+    if not valid_tile(z, x, y):
+        raise ValueError(f"No tile {z}/{x}/{y}")
+    layer = load_hazard_layers()[name]
+    return json.dumps(layer.tile(z, x, y), separators=(',', ':')).encode()
@@ -0,0 +1,105 @@
+"""
+Cold-tier archival of incident images
+
+Photos of incidents resolved long ago are rarely viewed but dominate the size of
+the incidents table and its backups. The archival job moves their base64
+payloads into gzip files on local disk, addressed by SHA-256 of the decoded
+image (identical photos are stored once), and leaves small stubs in the row:
+
+    {"id": ..., "name": ..., "size": ..., "mime": "image/jpeg",
+     "sha256": "...", "archived": true, "data": null}
+
+Rehydration reads the files back into the row on demand and marks the images
+`rehydrated: true`, which keeps them out of later archival runs; an admin who
+restored them wants them inline. The archive directory must be shared by the
+web workers and the job workers.
+"""
+import base64
+import gzip
+import hashlib
+import json
+import os
+from datetime import datetime, timezone, timedelta
+from pathlib import Path
+
+
+ARCHIVE_DIR = Path(os.environ.get('IMAGE_ARCHIVE_DIR', Path(__file__).parent / 'archive' / 'images'))
+ARCHIVE_AFTER_DAYS = int(os.environ.get('IMAGE_ARCHIVE_AFTER_DAYS', 30))
+ARCHIVE_BATCH_SIZE = 50
+
+
+def archive_path(sha256):
+    return ARCHIVE_DIR / sha256[:2] / sha256[2:4] / f'{sha256}.gz'
+
+
+def archive_image(image):
+    """Write one image payload to the archive and return its stub (blocking)"""
+    header, _, encoded = image['data'].partition(',')
+    raw = base64.b64decode(encoded)
+    sha256 = hashlib.sha256(raw).hexdigest()
+    path = archive_path(sha256)
+    if not path.exists():
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_suffix(f'.{os.getpid()}.tmp')
+        with gzip.open(tmp_path, 'wb') as f:
+            f.write(raw)
+        os.replace(tmp_path, path)
+
+    stub = {key: value for key, value in image.items() if key != 'data'}
+    stub.update({
+        'size': len(raw),
+        'mime': image.get('mime') or (header[5:].split(';')[0] if header.startswith('data:') else None),
+        'sha256': sha256,
+        'archived': True,
+        'data': None,
+    })
+    return stub
+
+
+def rehydrate_image(stub):
+    """Return the image with its data URL restored from the archive (blocking)"""
+    with gzip.open(archive_path(stub['sha256']), 'rb') as f:
+        raw = f.read()
+    image = {key: value for key, value in stub.items() if key != 'archived'}
+    image['rehydrated'] = True
+    image['data'] = f"data:{stub.get('mime') or 'application/octet-stream'};base64,{base64.b64encode(raw).decode()}"
+    return image
+
+
+def is_archivable(image):
+    """Inline payload that was not deliberately restored from the archive"""
+    return bool(image.get('data')) and not image.get('rehydrated')
+
+
+def archive_images(images):
+    """Archive every archivable payload in an images list; returns the new list"""
+    return [archive_image(image) if is_archivable(image) else image for image in images]
+
+
+def rehydrate_images(images):
+    """Restore every archived payload in an images list; returns the new list"""
+    return [rehydrate_image(image) if image.get('archived') else image for image in images]
+
+
+def parse_images(value):
+    return json.loads(value) if isinstance(value, str) else (value or [])
+
+
+async def find_archivable_incidents(conn, older_than_days=ARCHIVE_AFTER_DAYS, limit=ARCHIVE_BATCH_SIZE, after=''):
+    """Ids (above `after`, ascending) of incidents resolved `older_than_days` ago that still hold archivable image data
+
+    resolved_at is set by a trigger when the status becomes resolved, so later
+    edits (notes, location tagging, image processing) do not postpone archival.
+    """
+    cutoff = datetime.now(timezone.utc).replace(tzinfo=None) - timedelta(days=older_than_days)
+    rows = await conn.fetch('''
+        SELECT id FROM incidents
+        WHERE status = 'resolved' AND resolved_at < $1 AND id > $2
+          AND EXISTS (
+              SELECT 1 FROM jsonb_array_elements(images) image
+              WHERE image->>'data' IS NOT NULL AND image->'rehydrated' IS DISTINCT FROM 'true'::jsonb
+          )
+        ORDER BY id
+        LIMIT $3
+    ''', cutoff, after, limit)
+    return [row['id'] for row in rows]
@@ -0,0 +1,144 @@
+"""
+Live incident feed: PostgreSQL LISTEN/NOTIFY fanned out to SSE subscribers
+
+Writers publish small change events with pg_notify inside their transaction.
+Each worker keeps one dedicated listener connection and fans events out to any
+number of subscribers, each with a bounded queue. A subscriber that falls behind
+is disconnected and resumes from its Last-Event-ID out of the replay history.
+Notifications sent while the listener is reconnecting are lost, so after a
+reconnect every subscriber gets a `reset` event and the history is dropped.
+"""
+import asyncio
+import json
+import logging
+from collections import deque
+
+import asyncpg
+
+
+INCIDENT_CHANNEL = 'incident_events'
+
+# Fields sent with each event; NOTIFY payloads are capped at 8000 bytes, so
+# images and free text stay out and clients fetch the full incident on demand
+EVENT_FIELDS = ['id', 'incident_type', 'status', 'latitude', 'longitude', 'created_at', 'updated_at']
+
+HISTORY_SIZE = 1000
+SUBSCRIBER_QUEUE_SIZE = 100
+RECONNECT_DELAY = 5
+
+logger = logging.getLogger(__name__)
+
+
+async def publish_incident_event(conn, op, incident):
+    """Queue a change event on `conn`; delivered when its transaction commits"""
+    summary = {field: incident.get(field) for field in EVENT_FIELDS}
+    await conn.execute('''
+        SELECT pg_notify($1, json_build_object(
+            'id', nextval('incident_event_seq'), 'op', $2::text, 'incident', $3::json
+        )::text)
+    ''', INCIDENT_CHANNEL, op, json.dumps(summary, default=str))
+
+
+class Subscription:
+    """One client's bounded event queue"""
+
+    def __init__(self, queue_size):
+        self.queue = asyncio.Queue(maxsize=queue_size)
+        self.lagged = False
+
+    def offer(self, event):
+        """Enqueue without blocking; returns False when the client is too slow"""
+        try:
+            self.queue.put_nowait(event)
+            return True
+        except asyncio.QueueFull:
+            self.lagged = True
+            return False
+
+
+class IncidentFeed:
+    """Per-worker LISTEN connection and subscriber registry"""
+
+    def __init__(self, dsn, history_size=HISTORY_SIZE, queue_size=SUBSCRIBER_QUEUE_SIZE):
+        self.dsn = dsn
+        self.queue_size = queue_size
+        self.history = deque(maxlen=history_size)
+        self.subscribers = set()
+        self._conn = None
+        self._task = None
+
+    async def start(self):
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        if self._conn and not self._conn.is_closed():
+            await self._conn.close()
+
+    async def _run(self):
+        """Keep the listener connection alive, reconnecting after failures"""
+        listened = False
+        while True:
+            try:
+                if self._conn is None or self._conn.is_closed():
+                    self._conn = await asyncpg.connect(self.dsn)
+                    await self._conn.add_listener(INCIDENT_CHANNEL, self._on_notify)
+                    logger.info("Listening for %s", INCIDENT_CHANNEL)
+                    if listened:
+                        self._reset_subscribers()
+                    listened = True
+                await asyncio.sleep(RECONNECT_DELAY)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning("Incident feed listener failed: %s", e)
+                await asyncio.sleep(RECONNECT_DELAY)
+
+    def _broadcast(self, event):
+        for subscription in list(self.subscribers):
+            if not subscription.offer(event):
+                self.subscribers.discard(subscription)
+
+    def _on_notify(self, connection, pid, channel, payload):
+        event = json.loads(payload)
+        self.history.append(event)
+        self._broadcast(event)
+
+    def _reset_subscribers(self):
+        """Make every client reload after a gap in the notifications.
+
+        The history is dropped too, so clients resuming from an id before the
+        gap get a `reset` instead of an incomplete replay.
+        """
+        last_event_id = self.history[-1]['id'] if self.history else 0
+        self.history.clear()
+        logger.warning("Incident feed reconnected; resetting %d subscribers", len(self.subscribers))
+        self._broadcast({'id': last_event_id, 'op': 'reset', 'incident': None})
+
+    def subscribe(self, last_event_id=None):
+        """Register a subscriber, replaying events after `last_event_id`.
+
+        When that id is no longer in the history, a `reset` event tells the
+        client to reload instead.
+        """
+        subscription = Subscription(self.queue_size)
+        if last_event_id is not None:
+            ids = [str(event['id']) for event in self.history]
+            replay = None
+            if str(last_event_id) in ids:
+                replay = list(self.history)[ids.index(str(last_event_id)) + 1:]
+            if replay is not None and len(replay) <= self.queue_size:
+                for event in replay:
+                    subscription.offer(event)
+            else:
+                subscription.offer({'id': last_event_id, 'op': 'reset', 'incident': None})
+        self.subscribers.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        self.subscribers.discard(subscription)
@@ -0,0 +1,213 @@
+"""
+Durable PostgreSQL-backed job queue
+
+Request handlers enqueue jobs on their own connection, inside the same
+transaction as their write, so a job exists if and only if the write committed.
+Workers claim jobs with SELECT ... FOR UPDATE SKIP LOCKED, retry failures with
+exponential backoff and move jobs that keep failing to the `dead` state.
+
+While a job runs, its worker refreshes locked_at every HEARTBEAT_INTERVAL.
+The reaper only requeues jobs whose heartbeat stopped, so long jobs are not run
+twice, and outcomes are only recorded by the worker that still holds the lock.
+
+Workers run in a separate process, see job_worker.py.
+"""
+import asyncio
+import json
+import logging
+import random
+import traceback
+from datetime import datetime, timezone, timedelta
+
+
+DEFAULT_MAX_ATTEMPTS = 5
+BACKOFF_BASE_SECONDS = 10
+BACKOFF_MAX_SECONDS = 60 * 60
+POLL_INTERVAL = 1.0
+HEARTBEAT_INTERVAL = 30
+# Running jobs without a heartbeat for this long are assumed orphaned by a dead worker
+VISIBILITY_TIMEOUT = timedelta(minutes=5)
+REAP_INTERVAL = 60
+
+logger = logging.getLogger(__name__)
+
+# kind -> async handler(payload)
+_handlers = {}
+
+
+def job_handler(kind):
+    """Register an async function as the handler of a job kind"""
+    def decorator(fn):
+        _handlers[kind] = fn
+        return fn
+    return decorator
+
+
+def registered_kinds():
+    """Sorted job kinds with a registered handler"""
+    return sorted(_handlers)
+
+
+def _utcnow():
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+async def enqueue(conn, kind, payload=None, delay=None, max_attempts=DEFAULT_MAX_ATTEMPTS):
+    """Insert a job using the caller's connection (and transaction); returns its id"""
+    run_at = _utcnow() + (delay or timedelta(0))
+    return await conn.fetchval('''
+        INSERT INTO jobs (kind, payload, run_at, max_attempts)
+        VALUES ($1, $2, $3, $4)
+        RETURNING id
+    ''', kind, json.dumps(payload or {}), run_at, max_attempts)
+
+
+def backoff_delay(attempts):
+    """Exponential backoff with jitter for the given attempt number"""
+    delay = min(BACKOFF_BASE_SECONDS * 2 ** (attempts - 1), BACKOFF_MAX_SECONDS)
+    return timedelta(seconds=delay * random.uniform(0.5, 1.0))
+
+
+async def claim_job(conn, worker_id):
+    """Atomically take the oldest ready job, or return None"""
+    return await conn.fetchrow('''
+        UPDATE jobs SET status = 'running', attempts = attempts + 1, locked_at = $1, locked_by = $2
+        WHERE id = (
+            SELECT id FROM jobs
+            WHERE status = 'queued' AND run_at <= $1
+            ORDER BY run_at
+            LIMIT 1
+            FOR UPDATE SKIP LOCKED
+        )
+        RETURNING id, kind, payload, attempts, max_attempts, locked_by
+    ''', _utcnow(), worker_id)
+
+
+def _updated(result):
+    return int(result.split()[-1]) > 0
+
+
+async def heartbeat_job(conn, job):
+    """Refresh the lock of a running job; False when this worker no longer holds it"""
+    return _updated(await conn.execute('''
+        UPDATE jobs SET locked_at = $3
+        WHERE id = $1 AND status = 'running' AND locked_by = $2
+    ''', job['id'], job['locked_by'], _utcnow()))
+
+
+async def complete_job(conn, job):
+    """Mark a job done; False when it was reaped and belongs to another worker now"""
+    return _updated(await conn.execute('''
+        UPDATE jobs SET status = 'done', finished_at = $3, locked_at = NULL, locked_by = NULL, last_error = NULL
+        WHERE id = $1 AND status = 'running' AND locked_by = $2
+    ''', job['id'], job['locked_by'], _utcnow()))
+
+
+async def fail_job(conn, job, error):
+    """Reschedule a failed job, or mark it dead once attempts are exhausted.
+
+    Returns False when the job was reaped and belongs to another worker now.
+    """
+    if job['attempts'] >= job['max_attempts']:
+        updated = _updated(await conn.execute('''
+            UPDATE jobs SET status = 'dead', finished_at = $3, locked_at = NULL, locked_by = NULL, last_error = $4
+            WHERE id = $1 AND status = 'running' AND locked_by = $2
+        ''', job['id'], job['locked_by'], _utcnow(), error))
+        if updated:
+            logger.error("Job %s (%s) is dead after %s attempts", job['id'], job['kind'], job['attempts'])
+        return updated
+    return _updated(await conn.execute('''
+        UPDATE jobs SET status = 'queued', run_at = $3, locked_at = NULL, locked_by = NULL, last_error = $4
+        WHERE id = $1 AND status = 'running' AND locked_by = $2
+    ''', job['id'], job['locked_by'], _utcnow() + backoff_delay(job['attempts']), error))
+
+
+async def reap_orphaned_jobs(conn):
+    """Requeue running jobs whose heartbeat stopped; returns count"""
+    now = _utcnow()
+    result = await conn.execute('''
+        UPDATE jobs SET status = CASE WHEN attempts >= max_attempts THEN 'dead' ELSE 'queued' END,
+                        finished_at = CASE WHEN attempts >= max_attempts THEN $2 END,
+                        last_error = 'No heartbeat from worker ' || locked_by,
+                        locked_at = NULL, locked_by = NULL
+        WHERE status = 'running' AND locked_at < $1
+    ''', now - VISIBILITY_TIMEOUT, now)
+    return int(result.split()[-1])
+
+
+async def _keep_alive(pool, job):
+    """Heartbeat a running job until cancelled"""
+    while True:
+        await asyncio.sleep(HEARTBEAT_INTERVAL)
+        try:
+            async with pool.acquire() as conn:
+                if not await heartbeat_job(conn, job):
+                    logger.warning("Job %s (%s) lost its lock to the reaper", job['id'], job['kind'])
+                    return
+        except Exception as e:
+            logger.warning("Heartbeat of job %s failed: %s", job['id'], e)
+
+
+async def run_job(pool, job):
+    """Execute one claimed job and record the outcome"""
+    handler = _handlers.get(job['kind'])
+    payload = json.loads(job['payload']) if isinstance(job['payload'], str) else job['payload']
+    heartbeat = asyncio.create_task(_keep_alive(pool, job))
+    try:
+        if handler is None:
+            raise LookupError(f"No handler registered for job kind {job['kind']!r}")
+        await handler(payload)
+    except Exception:
+        error = traceback.format_exc(limit=5)
+        logger.warning("Job %s (%s) failed on attempt %s", job['id'], job['kind'], job['attempts'])
+        outcome = False
+    else:
+        error = None
+        outcome = True
+    finally:
+        heartbeat.cancel()
+
+    try:
+        async with pool.acquire() as conn:
+            recorded = await complete_job(conn, job) if outcome else await fail_job(conn, job, error)
+    except Exception as e:
+        # The heartbeat has stopped, so the reaper requeues the job
+        logger.warning("Recording the outcome of job %s (%s) failed: %s", job['id'], job['kind'], e)
+        return outcome
+    if not recorded:
+        logger.warning("Outcome of job %s (%s) discarded; it was reaped", job['id'], job['kind'])
+    return outcome
+
+
+async def worker_loop(pool, worker_id, stop):
+    """Claim and run jobs until `stop` is set"""
+    while not stop.is_set():
+        try:
+            async with pool.acquire() as conn:
+                job = await claim_job(conn, worker_id)
+        except Exception as e:
+            logger.warning("Claiming a job failed: %s", e)
+            job = None
+        if job is None:
+            try:
+                await asyncio.wait_for(stop.wait(), POLL_INTERVAL)
+            except asyncio.TimeoutError:
+                pass
+            continue
+        await run_job(pool, job)
+
+
+async def reaper_loop(pool, stop):
+    """Periodically requeue orphaned jobs until `stop` is set"""
+    while not stop.is_set():
+        try:
+            async with pool.acquire() as conn:
+                reaped = await reap_orphaned_jobs(conn)
+            if reaped:
+                logger.warning("Requeued %d orphaned jobs", reaped)
+        except Exception as e:
+            logger.warning("Reaping orphaned jobs failed: %s", e)
+        try:
+            await asyncio.wait_for(stop.wait(), REAP_INTERVAL)
+        except asyncio.TimeoutError:
+            pass
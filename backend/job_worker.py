@@ -0,0 +1,54 @@
+"""
+Standalone worker process for the PostgreSQL job queue
+
+Usage:
+    python job_worker.py --workers 4
+"""
+import argparse
+import asyncio
+import logging
+import os
+import signal
+import socket
+
+from database import get_pool, close_pool
+from job_queue import worker_loop, reaper_loop, registered_kinds
+from schema import ensure_schema
+import tasks  # noqa: F401  (registers job handlers)
+
+
+logger = logging.getLogger('job_worker')
+
+
+async def main():
+    """Run N async workers until SIGINT/SIGTERM; in-flight jobs finish first"""
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--workers', type=int, default=int(os.environ.get('JOB_WORKERS', 4)))
+    args = parser.parse_args()
+
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+    )
+
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stop.set)
+
+    pool = await get_pool()
+    try:
+        async with pool.acquire() as conn:
+            await ensure_schema(conn)
+        host = f'{socket.gethostname()}:{os.getpid()}'
+        logger.info("Starting %d workers for %s", args.workers, ', '.join(registered_kinds()))
+        await asyncio.gather(
+            reaper_loop(pool, stop),
+            *(worker_loop(pool, f'{host}/{n}', stop) for n in range(args.workers)),
+        )
+    finally:
+        await close_pool()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,155 @@
+"""
+JSON Patch (RFC 6902) and JSON Merge Patch (RFC 7396)
+
+Used to apply small client deltas to the JSONB documents users keep
+(emergency plans and checklists) instead of re-uploading them whole.
+"""
+import copy
+
+
+JSON_PATCH_MEDIA_TYPE = 'application/json-patch+json'
+MERGE_PATCH_MEDIA_TYPE = 'application/merge-patch+json'
+
+
+class JsonPatchError(ValueError):
+    """The patch is malformed or cannot be applied to the document"""
+
+
+class JsonPatchTestFailed(JsonPatchError):
+    """A `test` operation did not match the document"""
+
+
+def parse_pointer(pointer):
+    """Reference tokens of a JSON Pointer ("" is the whole document)"""
+    if pointer == '':
+        return []
+    if not isinstance(pointer, str) or not pointer.startswith('/'):
+        raise JsonPatchError(f"Invalid JSON pointer {pointer!r}")
+    return [token.replace('~1', '/').replace('~0', '~') for token in pointer[1:].split('/')]
+
+
+def _array_index(container, token, allow_end=False):
+    if allow_end and token == '-':
+        return len(container)
+    if not token.isdigit() or (token != '0' and token.startswith('0')):
+        raise JsonPatchError(f"Invalid array index {token!r}")
+    index = int(token)
+    if index > len(container) or (index == len(container) and not allow_end):
+        raise JsonPatchError(f"Array index {index} out of range")
+    return index
+
+
+def _resolve(document, tokens):
+    """Value at the location given by `tokens`"""
+    value = document
+    for token in tokens:
+        if isinstance(value, list):
+            value = value[_array_index(value, token)]
+        elif isinstance(value, dict):
+            if token not in value:
+                raise JsonPatchError(f"Path member {token!r} does not exist")
+            value = value[token]
+        else:
+            raise JsonPatchError(f"Cannot traverse into a {type(value).__name__}")
+    return value
+
+
+def json_equal(a, b):
+    """Equality as RFC 6902 `test` defines it.
+
+    Values must be of the same JSON type, so true is not 1 and "1" is not 1.
+    JSON has a single number type and numbers compare by value, so 1 equals 1.0.
+    """
+    if isinstance(a, bool) or isinstance(b, bool):
+        return type(a) is type(b) and a == b
+    if isinstance(a, (int, float)) and isinstance(b, (int, float)):
+        return a == b
+    if type(a) is not type(b):
+        return False
+    if isinstance(a, dict):
+        return a.keys() == b.keys() and all(json_equal(a[key], b[key]) for key in a)
+    if isinstance(a, list):
+        return len(a) == len(b) and all(map(json_equal, a, b))
+    return a == b
+
+
+def _add(document, tokens, value):
+    if not tokens:
+        return value
+    parent = _resolve(document, tokens[:-1])
+    token = tokens[-1]
+    if isinstance(parent, list):
+        parent.insert(_array_index(parent, token, allow_end=True), value)
+    elif isinstance(parent, dict):
+        parent[token] = value
+    else:
+        raise JsonPatchError(f"Cannot add to a {type(parent).__name__}")
+    return document
+
+
+def _remove(document, tokens):
+    if not tokens:
+        raise JsonPatchError("Cannot remove the whole document")
+    parent = _resolve(document, tokens[:-1])
+    token = tokens[-1]
+    if isinstance(parent, list):
+        return parent.pop(_array_index(parent, token))
+    if isinstance(parent, dict):
+        if token not in parent:
+            raise JsonPatchError(f"Path member {token!r} does not exist")
+        return parent.pop(token)
+    raise JsonPatchError(f"Cannot remove from a {type(parent).__name__}")
+
+
+def apply_json_patch(document, operations):
+    """Apply RFC 6902 operations to a copy of `document` and return it.
+
+    The patch is atomic: on any error the original document is untouched.
+    """
+    if not isinstance(operations, list):
+        raise JsonPatchError("A JSON Patch must be an array of operations")
+    document = copy.deepcopy(document)
+    for operation in operations:
+        if not isinstance(operation, dict) or 'op' not in operation or 'path' not in operation:
+            raise JsonPatchError("Each operation needs 'op' and 'path'")
+        op = operation['op']
+        tokens = parse_pointer(operation['path'])
+        if op in ('add', 'replace', 'test') and 'value' not in operation:
+            raise JsonPatchError(f"'{op}' operation needs a 'value'")
+
+        if op == 'add':
+            document = _add(document, tokens, copy.deepcopy(operation['value']))
+        elif op == 'remove':
+            _remove(document, tokens)
+        elif op == 'replace':
+            if tokens:
+                _remove(document, tokens)
+            document = _add(document, tokens, copy.deepcopy(operation['value']))
+        elif op in ('move', 'copy'):
+            source = parse_pointer(operation.get('from', ''))
+            if op == 'move':
+                if tokens[:len(source)] == source and tokens != source:
+                    raise JsonPatchError("Cannot move a value into one of its children")
+                value = _remove(document, source) if source else document
+            else:
+                value = copy.deepcopy(_resolve(document, source))
+            document = _add(document, tokens, value)
+        elif op == 'test':
+            if not json_equal(_resolve(document, tokens), operation['value']):
+                raise JsonPatchTestFailed(f"Test failed at {operation['path']!r}")
+        else:
+            raise JsonPatchError(f"Unknown operation {op!r}")
+    return document
+
+
+def apply_merge_patch(document, patch):
+    """Apply an RFC 7396 merge patch and return the result (inputs are not modified)"""
+    if not isinstance(patch, dict):
+        return copy.deepcopy(patch)
+    result = copy.deepcopy(document) if isinstance(document, dict) else {}
+    for key, value in patch.items():
+        if value is None:
+            result.pop(key, None)
+        else:
+            result[key] = apply_merge_patch(result.get(key), value)
+    return result
@@ -1,12 +1,21 @@
 """
 Migration script from MongoDB to Neon PostgreSQL
+
+Existing tables are kept: the schema step only creates what is missing and
+applies schema.py's upgrades, and rows already present (written by a running
+mongo_replicator.py) win over the exported copies. See mongo_replicator.py for
+the cutover order; `--schema-only` runs just the schema step.
 """
 import os
+import argparse
 import asyncio
 import json
 from motor.motor_asyncio import AsyncIOMotorClient
 import asyncpg
-from datetime import datetime
+from migration_verify import verify_checksums, DEFAULT_CONCURRENCY
+from table_specs import TABLE_ORDER, column_names, document_to_row
+from database import primary_key_columns
+from schema import ensure_schema
 
 # MongoDB connection
 MONGO_URL = os.environ.get('MONGO_URL', 'mongodb://localhost:27017')
@@ -26,6 +35,17 @@ COLLECTIONS = [
     'status_checks'
 ]
 
+# Progress output prefix per table
+TABLE_ICONS = {
+    'users': '👥',
+    'incidents': '📋',
+    'hotlines': '📞',
+    'map_locations': '📍',
+    'emergency_plans': '📝',
+    'checklists': '✅',
+    'status_checks': '🔍',
+}
+
 
 async def export_mongodb_data():
     """Export all data from MongoDB"""
@@ -39,8 +59,8 @@ async def export_mongodb_data():
         print(f"📦 Exporting {collection_name}...")
         collection = db[collection_name]
         
-        # Get all documents
-        documents = await collection.find({}, {"_id": 0}).to_list(10000)
+        # Get all documents; _id stays for the timestamp fallback of table_specs
+        documents = await collection.find({}).to_list(10000)
         exported_data[collection_name] = documents
         print(f"   ✅ Exported {len(documents)} documents from {collection_name}")
     
@@ -56,18 +76,13 @@ async def export_mongodb_data():
 
 
 async def create_postgresql_schema(conn):
-    """Create PostgreSQL tables matching MongoDB collections"""
+    """Create missing PostgreSQL tables matching MongoDB collections.
+
+    Tables that already exist are never dropped: the replicator may already be
+    writing to them, and they carry the columns added by schema.py.
+    """
     print("\n🏗️  Creating PostgreSQL schema...")
     
-    # Drop existing tables (if any)
-    await conn.execute('DROP TABLE IF EXISTS incidents CASCADE')
-    await conn.execute('DROP TABLE IF EXISTS hotlines CASCADE')
-    await conn.execute('DROP TABLE IF EXISTS map_locations CASCADE')
-    await conn.execute('DROP TABLE IF EXISTS users CASCADE')
-    await conn.execute('DROP TABLE IF EXISTS emergency_plans CASCADE')
-    await conn.execute('DROP TABLE IF EXISTS checklists CASCADE')
-    await conn.execute('DROP TABLE IF EXISTS status_checks CASCADE')
-    
     # Create users table
     await conn.execute('''
         CREATE TABLE IF NOT EXISTS users (
@@ -160,140 +175,38 @@ async def create_postgresql_schema(conn):
     ''')
     print("   ✅ Created status_checks table")
     
+    # Columns, indexes and tables added since the base schema
+    await ensure_schema(conn)
+    print("   ✅ Applied schema upgrades")
+    
     print("✅ Schema creation completed!\n")
 
 
 async def migrate_data(conn, exported_data):
-    """Migrate data from MongoDB export to PostgreSQL"""
+    """Migrate data from MongoDB export to PostgreSQL
+
+    Rows are built with table_specs.document_to_row, the same conversion the
+    checksum verification and the replicator apply, so a freshly migrated
+    table verifies clean.
+    """
     print("🚀 Starting data migration...\n")
     
-    # Migrate users first (due to foreign key constraints)
-    if exported_data.get('users'):
-        print(f"👥 Migrating {len(exported_data['users'])} users...")
-        for user in exported_data['users']:
-            await conn.execute('''
-                INSERT INTO users (id, email, password, full_name, phone, is_admin, created_at)
-                VALUES ($1, $2, $3, $4, $5, $6, $7)
-                ON CONFLICT (id) DO NOTHING
-            ''', 
-                user['id'],
-                user['email'],
-                user['password'],
-                user['full_name'],
-                user.get('phone'),
-                user.get('is_admin', False),
-                datetime.fromisoformat(user['created_at']) if isinstance(user.get('created_at'), str) else user.get('created_at', datetime.now())
-            )
-        print(f"   ✅ Migrated {len(exported_data['users'])} users\n")
-    
-    # Migrate incidents
-    if exported_data.get('incidents'):
-        print(f"📋 Migrating {len(exported_data['incidents'])} incidents...")
-        for incident in exported_data['incidents']:
-            await conn.execute('''
-                INSERT INTO incidents (id, incident_type, date, time, latitude, longitude, 
-                                      description, reporter_phone, images, internal_notes, status, created_at)
-                VALUES ($1, $2, $3, $4, $5, $6, $7, $8, $9, $10, $11, $12)
-                ON CONFLICT (id) DO NOTHING
-            ''',
-                incident['id'],
-                incident['incident_type'],
-                incident.get('date'),
-                incident.get('time'),
-                float(incident['latitude']),
-                float(incident['longitude']),
-                incident['description'],
-                incident.get('reporter_phone'),
-                json.dumps(incident.get('images', [])),
-                incident.get('internal_notes', ''),
-                incident.get('status', 'new'),
-                datetime.fromisoformat(incident['created_at']) if isinstance(incident.get('created_at'), str) else incident.get('created_at', datetime.now())
-            )
-        print(f"   ✅ Migrated {len(exported_data['incidents'])} incidents\n")
-    
-    # Migrate hotlines
-    if exported_data.get('hotlines'):
-        print(f"📞 Migrating {len(exported_data['hotlines'])} hotlines...")
-        for hotline in exported_data['hotlines']:
-            await conn.execute('''
-                INSERT INTO hotlines (id, label, number, category)
-                VALUES ($1, $2, $3, $4)
-                ON CONFLICT (id) DO NOTHING
-            ''',
-                hotline['id'],
-                hotline['label'],
-                hotline['number'],
-                hotline['category']
-            )
-        print(f"   ✅ Migrated {len(exported_data['hotlines'])} hotlines\n")
-    
-    # Migrate map_locations
-    if exported_data.get('map_locations'):
-        print(f"📍 Migrating {len(exported_data['map_locations'])} map locations...")
-        for location in exported_data['map_locations']:
-            await conn.execute('''
-                INSERT INTO map_locations (id, type, name, address, lat, lng, capacity, services, hotline)
-                VALUES ($1, $2, $3, $4, $5, $6, $7, $8, $9)
-                ON CONFLICT (id) DO NOTHING
-            ''',
-                location['id'],
-                location['type'],
-                location['name'],
-                location['address'],
-                float(location['lat']),
-                float(location['lng']),
-                location.get('capacity'),
-                location.get('services'),
-                location.get('hotline')
-            )
-        print(f"   ✅ Migrated {len(exported_data['map_locations'])} locations\n")
-    
-    # Migrate emergency_plans
-    if exported_data.get('emergency_plans'):
-        print(f"📝 Migrating {len(exported_data['emergency_plans'])} emergency plans...")
-        for plan in exported_data['emergency_plans']:
-            await conn.execute('''
-                INSERT INTO emergency_plans (id, user_id, plan_data, updated_at)
-                VALUES ($1, $2, $3, $4)
-                ON CONFLICT (id) DO NOTHING
-            ''',
-                plan['id'],
-                plan['user_id'],
-                json.dumps(plan['plan_data']),
-                datetime.fromisoformat(plan['updated_at']) if isinstance(plan.get('updated_at'), str) else plan.get('updated_at', datetime.now())
-            )
-        print(f"   ✅ Migrated {len(exported_data['emergency_plans'])} emergency plans\n")
-    
-    # Migrate checklists
-    if exported_data.get('checklists'):
-        print(f"✅ Migrating {len(exported_data['checklists'])} checklists...")
-        for checklist in exported_data['checklists']:
-            await conn.execute('''
-                INSERT INTO checklists (id, user_id, checklist_data, updated_at)
-                VALUES ($1, $2, $3, $4)
-                ON CONFLICT (id) DO NOTHING
-            ''',
-                checklist['id'],
-                checklist['user_id'],
-                json.dumps(checklist['checklist_data']),
-                datetime.fromisoformat(checklist['updated_at']) if isinstance(checklist.get('updated_at'), str) else checklist.get('updated_at', datetime.now())
-            )
-        print(f"   ✅ Migrated {len(exported_data['checklists'])} checklists\n")
-    
-    # Migrate status_checks
-    if exported_data.get('status_checks'):
-        print(f"🔍 Migrating {len(exported_data['status_checks'])} status checks...")
-        for check in exported_data['status_checks']:
-            await conn.execute('''
-                INSERT INTO status_checks (id, client_name, timestamp)
-                VALUES ($1, $2, $3)
-                ON CONFLICT (id) DO NOTHING
-            ''',
-                check['id'],
-                check['client_name'],
-                datetime.fromisoformat(check['timestamp']) if isinstance(check.get('timestamp'), str) else check.get('timestamp', datetime.now())
-            )
-        print(f"   ✅ Migrated {len(exported_data['status_checks'])} status checks\n")
+    # TABLE_ORDER migrates users first (due to foreign key constraints)
+    for table in TABLE_ORDER:
+        documents = exported_data.get(table)
+        if not documents:
+            continue
+        columns = column_names(table)
+        placeholders = ', '.join(f'${i}' for i in range(1, len(columns) + 1))
+        # Partitioned tables key on (id, created_at); rows already replicated are newer
+        key_columns = await primary_key_columns(conn, table)
+        print(f"{TABLE_ICONS[table]} Migrating {len(documents)} {table}...")
+        await conn.executemany(f'''
+            INSERT INTO {table} ({', '.join(columns)})
+            VALUES ({placeholders})
+            ON CONFLICT ({', '.join(key_columns)}) DO NOTHING
+        ''', [document_to_row(table, document) for document in documents])
+        print(f"   ✅ Migrated {len(documents)} {table}\n")
     
     print("✅ Data migration completed!\n")
 
@@ -311,13 +224,37 @@ async def verify_migration(conn):
     print("\n✅ Verification completed!")
 
 
+async def verify_migration_checksums():
+    """Verify migrated contents chunk by chunk against MongoDB"""
+    client = AsyncIOMotorClient(MONGO_URL)
+    pool = await asyncpg.create_pool(NEON_CONNECTION_STRING, min_size=1, max_size=DEFAULT_CONCURRENCY)
+    try:
+        await verify_checksums(client[MONGO_DB], pool)
+    finally:
+        await pool.close()
+        client.close()
+
+
 async def main():
     """Main migration function"""
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--schema-only', action='store_true',
+                        help='Only create missing tables and apply schema upgrades')
+    args = parser.parse_args()
+
     print("=" * 60)
     print("🚀 MongoDB to Neon PostgreSQL Migration")
     print("=" * 60)
     print()
     
+    if args.schema_only:
+        conn = await asyncpg.connect(NEON_CONNECTION_STRING)
+        try:
+            await create_postgresql_schema(conn)
+        finally:
+            await conn.close()
+        return
+    
     # Step 1: Export MongoDB data
     exported_data = await export_mongodb_data()
     
@@ -336,6 +273,9 @@ async def main():
         # Step 5: Verify migration
         await verify_migration(conn)
         
+        # Step 6: Compare chunk checksums against the MongoDB source
+        await verify_migration_checksums()
+        
         print("\n" + "=" * 60)
         print("🎉 Migration completed successfully!")
         print("=" * 60)
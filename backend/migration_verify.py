@@ -0,0 +1,194 @@
+"""
+Checksum-based verification of a MongoDB -> PostgreSQL migration
+
+Splits every table into id-range chunks, hashes each chunk on the MongoDB source
+and the PostgreSQL target concurrently, and reports the exact id ranges whose
+contents differ so a re-sync can target only those chunks.
+
+Ids are compared with byte ordering on both sides (MongoDB's default string
+ordering and COLLATE "C" in PostgreSQL), so chunk membership is identical.
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import time
+
+from table_specs import TABLE_ORDER, TABLE_SPECS, canonical_document, canonical_row, column_names
+
+
+DEFAULT_CHUNK_SIZE = 1000
+DEFAULT_CONCURRENCY = 4
+
+
+def _id_order(table):
+    """ORDER BY / comparison expression for the primary key of a table"""
+    id_column, id_type = TABLE_SPECS[table]['columns'][0]
+    if id_type == 'int':
+        return id_column
+    return f'{id_column} COLLATE "C"'
+
+
+async def chunk_boundaries(pool, table, chunk_size):
+    """Return (lower, upper) id ranges covering the whole key space of a table.
+
+    Bounds come from the target; the first and last ranges are open-ended so
+    rows that only exist on the source are still covered.
+    """
+    if chunk_size < 1:
+        raise ValueError(f"chunk_size must be at least 1, got {chunk_size}")
+    order = _id_order(table)
+    async with pool.acquire() as conn:
+        rows = await conn.fetch(f'''
+            SELECT id FROM (
+                SELECT id, row_number() OVER (ORDER BY {order}) AS rn FROM {table}
+            ) numbered
+            WHERE (rn - 1) % $1 = 0
+            ORDER BY {order}
+        ''', chunk_size)
+
+    bounds = [row['id'] for row in rows][1:]
+    lowers = [None] + bounds
+    uppers = bounds + [None]
+    return list(zip(lowers, uppers))
+
+
+def _range_filter(lower, upper):
+    """MongoDB filter for a half-open id range"""
+    condition = {}
+    if lower is not None:
+        condition['$gte'] = lower
+    if upper is not None:
+        condition['$lt'] = upper
+    return {'id': condition} if condition else {}
+
+
+async def hash_source_chunk(mongo_db, table, lower, upper):
+    """Hash a chunk of a MongoDB collection; returns (row_count, hex digest)"""
+    digest = hashlib.sha256()
+    count = 0
+    # _id is kept: missing timestamps are derived from it, as on migration
+    cursor = mongo_db[table].find(_range_filter(lower, upper)).sort('id', 1)
+    async for doc in cursor:
+        digest.update(canonical_document(table, doc).encode())
+        digest.update(b'\n')
+        count += 1
+    return count, digest.hexdigest()
+
+
+async def hash_target_chunk(pool, table, lower, upper):
+    """Hash a chunk of a PostgreSQL table; returns (row_count, hex digest)"""
+    order = _id_order(table)
+    conditions = []
+    params = []
+    if lower is not None:
+        params.append(lower)
+        conditions.append(f'{order} >= ${len(params)}')
+    if upper is not None:
+        params.append(upper)
+        conditions.append(f'{order} < ${len(params)}')
+
+    query = f"SELECT {', '.join(column_names(table))} FROM {table}"
+    if conditions:
+        query += ' WHERE ' + ' AND '.join(conditions)
+    query += f' ORDER BY {order}'
+
+    digest = hashlib.sha256()
+    count = 0
+    async with pool.acquire() as conn:
+        async with conn.transaction(readonly=True):
+            async for record in conn.cursor(query, *params, prefetch=200):
+                digest.update(canonical_row(table, dict(record)).encode())
+                digest.update(b'\n')
+                count += 1
+    return count, digest.hexdigest()
+
+
+async def verify_table(mongo_db, pool, table, chunk_size=DEFAULT_CHUNK_SIZE, semaphore=None):
+    """Compare one table chunk by chunk and return the divergent chunks"""
+    semaphore = semaphore or asyncio.Semaphore(DEFAULT_CONCURRENCY)
+    ranges = await chunk_boundaries(pool, table, chunk_size)
+
+    async def compare(lower, upper):
+        async with semaphore:
+            (source_rows, source_hash), (target_rows, target_hash) = await asyncio.gather(
+                hash_source_chunk(mongo_db, table, lower, upper),
+                hash_target_chunk(pool, table, lower, upper),
+            )
+        if source_hash == target_hash:
+            return None
+        return {
+            'table': table,
+            'lower': lower,
+            'upper': upper,
+            'source_rows': source_rows,
+            'target_rows': target_rows,
+        }
+
+    results = await asyncio.gather(*(compare(lower, upper) for lower, upper in ranges))
+    return {
+        'table': table,
+        'chunks': len(ranges),
+        'divergent': [result for result in results if result is not None],
+    }
+
+
+async def verify_checksums(mongo_db, pool, tables=None, chunk_size=DEFAULT_CHUNK_SIZE,
+                           concurrency=DEFAULT_CONCURRENCY):
+    """Verify all tables in parallel and print a per-table summary"""
+    print("🔐 Verifying chunk checksums...\n")
+    semaphore = asyncio.Semaphore(concurrency)
+    started = time.monotonic()
+
+    reports = await asyncio.gather(*(
+        verify_table(mongo_db, pool, table, chunk_size, semaphore)
+        for table in (tables or TABLE_ORDER)
+    ))
+
+    for report in reports:
+        if report['divergent']:
+            print(f"   ❌ {report['table']}: {len(report['divergent'])}/{report['chunks']} chunks differ")
+            for chunk in report['divergent']:
+                print(f"      [{chunk['lower']!r}, {chunk['upper']!r}) "
+                      f"source={chunk['source_rows']} target={chunk['target_rows']}")
+        else:
+            print(f"   ✅ {report['table']}: {report['chunks']} chunks match")
+
+    print(f"\n⏱️  Checksum verification took {time.monotonic() - started:.1f}s")
+    return reports
+
+
+async def main():
+    """Run checksum verification against the configured databases"""
+    import asyncpg
+    from motor.motor_asyncio import AsyncIOMotorClient
+    from migrate_to_neon import MONGO_URL, MONGO_DB, NEON_CONNECTION_STRING
+
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--table', action='append', choices=TABLE_ORDER,
+                        help='Table to verify (repeatable, default: all)')
+    parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE)
+    parser.add_argument('--concurrency', type=int, default=DEFAULT_CONCURRENCY)
+    parser.add_argument('--report', help='Write divergent ranges to this JSON file')
+    args = parser.parse_args()
+
+    client = AsyncIOMotorClient(MONGO_URL)
+    pool = await asyncpg.create_pool(NEON_CONNECTION_STRING, min_size=1, max_size=args.concurrency)
+    try:
+        reports = await verify_checksums(
+            client[MONGO_DB], pool, args.table, args.chunk_size, args.concurrency
+        )
+    finally:
+        await pool.close()
+        client.close()
+
+    if args.report:
+        with open(args.report, 'w') as f:
+            json.dump(reports, f, indent=2, default=str)
+        print(f"💾 Report saved to {args.report}")
+
+    return 1 if any(report['divergent'] for report in reports) else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(asyncio.run(main()))
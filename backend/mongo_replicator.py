@@ -0,0 +1,372 @@
+"""
+Continuous MongoDB -> PostgreSQL replication for zero-downtime cutover
+
+Tails the MongoDB backend (change streams, or an oplog timestamp poller for a
+local replica set) and applies batched upserts/deletes to PostgreSQL. The resume
+position and lag metrics are checkpointed in replication_state in the same
+transaction as each batch, so a restart never skips or loses events.
+
+Typical cutover:
+    1. python migrate_to_neon.py --schema-only
+    2. python mongo_replicator.py --start-at <current unix time>
+    3. python migrate_to_neon.py (exports after the start time; keeps the
+       tables and any rows the replicator already wrote)
+    4. watch GET /api/admin/replication until lag is ~0, switch traffic, stop
+
+The replicator refuses to start until the base tables exist, so step 1 cannot
+be skipped.
+
+Deletes carry only the MongoDB _id, so replication_id_map maps _id to row id.
+It is seeded from a scan of every collection at startup (covering rows the
+migration copied) and kept up to date from the stream. A delete that still
+cannot be resolved stops the replicator rather than leaving the row behind.
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import time
+from datetime import datetime, timezone
+
+import asyncpg
+from bson.timestamp import Timestamp
+from motor.motor_asyncio import AsyncIOMotorClient
+
+from database import DATABASE_URL, primary_key_columns
+from schema import ensure_schema
+from table_specs import TABLE_ORDER, TABLE_SPECS, column_names, document_to_row, to_pg_value
+
+
+MONGO_URL = os.environ.get('MONGO_URL', 'mongodb://localhost:27017')
+MONGO_DB = os.environ.get('DB_NAME', 'test_database')
+
+DEFAULT_BATCH_SIZE = 500
+DEFAULT_FLUSH_INTERVAL = 1.0
+ID_MAP_SEED_BATCH = 5000
+
+# Array parameter type matching each primary key type, so deletes use the index
+ID_ARRAY_TYPES = {'int': 'integer[]', 'text': 'varchar[]'}
+
+logger = logging.getLogger('mongo_replicator')
+
+
+class UnmappedDeleteError(RuntimeError):
+    """A delete event for a document whose PostgreSQL row id is unknown"""
+
+
+async def missing_tables(conn, tables=TABLE_ORDER):
+    """Names of the replicated tables that do not exist yet"""
+    rows = await conn.fetch(
+        'SELECT name FROM unnest($1::text[]) AS name WHERE to_regclass(name) IS NULL', list(tables)
+    )
+    return [row['name'] for row in rows]
+
+
+def upsert_sql(table, key_columns):
+    """INSERT ... ON CONFLICT statement for a replicated table"""
+    columns = column_names(table)
+    placeholders = ', '.join(f'${i}' for i in range(1, len(columns) + 1))
+    updates = ', '.join(f'{column} = EXCLUDED.{column}' for column in columns if column not in key_columns)
+    return f'''
+        INSERT INTO {table} ({', '.join(columns)})
+        VALUES ({placeholders})
+        ON CONFLICT ({', '.join(key_columns)}) DO UPDATE SET {updates}
+    '''
+
+
+class PostgresApplier:
+    """Applies batches of change events to PostgreSQL and checkpoints them"""
+
+    def __init__(self, pool, source, ignore_unmapped_deletes=False):
+        self.pool = pool
+        self.source = source
+        self.ignore_unmapped_deletes = ignore_unmapped_deletes
+        self.events_applied = 0
+        self.lag_seconds = None
+        self.last_event_at = None
+        self._upsert_sql = {}
+
+    async def upsert_statement(self, conn, table):
+        """Cached upsert for a table, keyed on its primary key.
+
+        Partitioned tables use (id, <partition column>) as primary key.
+        """
+        if table not in self._upsert_sql:
+            self._upsert_sql[table] = upsert_sql(table, await primary_key_columns(conn, table))
+        return self._upsert_sql[table]
+
+    async def load_position(self):
+        """Return the last checkpointed position for this source, if any"""
+        async with self.pool.acquire() as conn:
+            position = await conn.fetchval(
+                'SELECT position FROM replication_state WHERE source = $1', self.source
+            )
+        return json.loads(position) if isinstance(position, str) else position
+
+    async def seed_id_map(self, db, batch_size=ID_MAP_SEED_BATCH):
+        """Map the _id of every existing document to its row id.
+
+        Rows copied by migrate_to_neon.py never pass through the replicator,
+        so without this their deletes could not be resolved.
+        """
+        statement = '''
+            INSERT INTO replication_id_map (collection, mongo_id, row_id)
+            VALUES ($1, $2, $3)
+            ON CONFLICT (collection, mongo_id) DO UPDATE SET row_id = EXCLUDED.row_id
+        '''
+        async with self.pool.acquire() as conn:
+            for collection in TABLE_ORDER:
+                batch = []
+                count = 0
+                async for doc in db[collection].find({}, {'_id': 1, 'id': 1}):
+                    if 'id' not in doc:
+                        continue
+                    batch.append((collection, str(doc['_id']), str(doc['id'])))
+                    if len(batch) >= batch_size:
+                        await conn.executemany(statement, batch)
+                        count += len(batch)
+                        batch = []
+                if batch:
+                    await conn.executemany(statement, batch)
+                    count += len(batch)
+                logger.info("Mapped %d existing %s documents", count, collection)
+
+    async def mark_idle(self):
+        """Report zero lag once nothing is pending on the source"""
+        if self.lag_seconds == 0.0:
+            return
+        self.lag_seconds = 0.0
+        async with self.pool.acquire() as conn:
+            await conn.execute(
+                'UPDATE replication_state SET lag_seconds = 0, updated_at = $2 WHERE source = $1',
+                self.source, datetime.now(timezone.utc).replace(tzinfo=None)
+            )
+
+    async def apply(self, events, position, event_time):
+        """Apply (op, collection, mongo_id, doc) events and checkpoint position.
+
+        Events are coalesced per document so only the last state is written.
+        """
+        latest = {}
+        batch_row_ids = {}
+        for op, collection, mongo_id, doc in events:
+            latest[(collection, mongo_id)] = (op, doc)
+            if doc is not None and 'id' in doc:
+                batch_row_ids[(collection, mongo_id)] = str(doc['id'])
+
+        upserts = {table: [] for table in TABLE_ORDER}
+        deletes = {table: [] for table in TABLE_ORDER}
+        id_map = []
+        for (collection, mongo_id), (op, doc) in latest.items():
+            if op == 'delete':
+                deletes[collection].append(mongo_id)
+            elif doc is not None and 'id' in doc:
+                upserts[collection].append(document_to_row(collection, doc))
+                id_map.append((collection, mongo_id, str(doc['id'])))
+
+        async with self.pool.acquire() as conn:
+            async with conn.transaction():
+                for table in TABLE_ORDER:
+                    if upserts[table]:
+                        await conn.executemany(await self.upsert_statement(conn, table), upserts[table])
+                if id_map:
+                    await conn.executemany('''
+                        INSERT INTO replication_id_map (collection, mongo_id, row_id)
+                        VALUES ($1, $2, $3)
+                        ON CONFLICT (collection, mongo_id) DO UPDATE SET row_id = EXCLUDED.row_id
+                    ''', id_map)
+
+                for table in reversed(TABLE_ORDER):
+                    if deletes[table]:
+                        await self._apply_deletes(conn, table, deletes[table], batch_row_ids)
+
+                await self._checkpoint(conn, position, event_time, len(events))
+
+    async def _apply_deletes(self, conn, table, mongo_ids, batch_row_ids):
+        mapped = await conn.fetch('''
+            DELETE FROM replication_id_map
+            WHERE collection = $1 AND mongo_id = ANY($2::text[])
+            RETURNING mongo_id, row_id
+        ''', table, mongo_ids)
+        row_ids = {record['mongo_id']: record['row_id'] for record in mapped}
+        for mongo_id in mongo_ids:
+            if (table, mongo_id) in batch_row_ids:
+                row_ids.setdefault(mongo_id, batch_row_ids[(table, mongo_id)])
+
+        missing = [mongo_id for mongo_id in mongo_ids if mongo_id not in row_ids]
+        if missing and not self.ignore_unmapped_deletes:
+            # Rolls back the batch; the checkpoint stays before these events
+            raise UnmappedDeleteError(
+                f"No row id known for {len(missing)} deleted {table} documents: {', '.join(missing[:10])}"
+            )
+        if missing:
+            logger.warning("Skipping %d deleted %s documents without a row id", len(missing), table)
+        if row_ids:
+            id_type = TABLE_SPECS[table]['columns'][0][1]
+            await conn.execute(
+                f'DELETE FROM {table} WHERE id = ANY($1::{ID_ARRAY_TYPES[id_type]})',
+                [to_pg_value(row_id, id_type) for row_id in row_ids.values()]
+            )
+
+    async def _checkpoint(self, conn, position, event_time, event_count):
+        self.events_applied += event_count
+        if event_time is not None:
+            self.last_event_at = event_time
+            self.lag_seconds = max(0.0, time.time() - event_time.replace(tzinfo=timezone.utc).timestamp())
+        await conn.execute('''
+            INSERT INTO replication_state (source, position, last_event_at, lag_seconds, events_applied, updated_at)
+            VALUES ($1, $2, $3, $4, $5, $6)
+            ON CONFLICT (source) DO UPDATE SET
+                position = EXCLUDED.position,
+                last_event_at = COALESCE(EXCLUDED.last_event_at, replication_state.last_event_at),
+                lag_seconds = COALESCE(EXCLUDED.lag_seconds, replication_state.lag_seconds),
+                events_applied = replication_state.events_applied + $7,
+                updated_at = EXCLUDED.updated_at
+        ''', self.source, json.dumps(position), self.last_event_at, self.lag_seconds,
+           event_count, datetime.now(timezone.utc).replace(tzinfo=None), event_count)
+
+
+def _timestamp_to_datetime(ts):
+    """bson Timestamp -> naive UTC datetime"""
+    return datetime.fromtimestamp(ts.time, timezone.utc).replace(tzinfo=None)
+
+
+async def replicate_change_stream(db, applier, batch_size, flush_interval, start_at=None):
+    """Tail a database-level change stream (MongoDB 4.0+ replica set)"""
+    position = await applier.load_position()
+    options = {'full_document': 'updateLookup'}
+    if position and position.get('resume_token'):
+        options['resume_after'] = position['resume_token']
+    elif start_at is not None:
+        options['start_at_operation_time'] = Timestamp(int(start_at), 0)
+
+    pipeline = [{'$match': {
+        'ns.coll': {'$in': TABLE_ORDER},
+        'operationType': {'$in': ['insert', 'update', 'replace', 'delete']},
+    }}]
+    op_names = {'insert': 'upsert', 'update': 'upsert', 'replace': 'upsert', 'delete': 'delete'}
+
+    async with db.watch(pipeline, max_await_time_ms=int(flush_interval * 1000), **options) as stream:
+        logger.info("Tailing change stream on %s", db.name)
+        while True:
+            events = []
+            event_time = None
+            deadline = time.monotonic() + flush_interval
+            while len(events) < batch_size and time.monotonic() < deadline:
+                change = await stream.try_next()
+                if change is None:
+                    continue
+                events.append((
+                    op_names[change['operationType']],
+                    change['ns']['coll'],
+                    str(change['documentKey']['_id']),
+                    change.get('fullDocument'),
+                ))
+                event_time = _timestamp_to_datetime(change['clusterTime'])
+
+            if events or stream.resume_token != (position or {}).get('resume_token'):
+                position = {'resume_token': stream.resume_token}
+                await applier.apply(events, position, event_time)
+                if events:
+                    logger.info("Applied %d events, lag %.1fs", len(events), applier.lag_seconds or 0.0)
+            if not events:
+                await applier.mark_idle()
+
+
+async def replicate_oplog(client, db, applier, batch_size, poll_interval, start_at=None):
+    """Poll local.oplog.rs by timestamp (single-node replica sets, no change streams)"""
+    oplog = client.local['oplog.rs']
+    position = await applier.load_position()
+    if position and position.get('ts'):
+        last_ts = Timestamp(*position['ts'])
+    elif start_at is not None:
+        last_ts = Timestamp(int(start_at), 0)
+    else:
+        newest = await oplog.find_one(sort=[('$natural', -1)])
+        last_ts = newest['ts']
+
+    namespaces = [f'{db.name}.{collection}' for collection in TABLE_ORDER]
+    logger.info("Polling oplog for %s from %s", db.name, last_ts)
+    while True:
+        entries = await oplog.find(
+            {'ts': {'$gt': last_ts}, 'ns': {'$in': namespaces}, 'op': {'$in': ['i', 'u', 'd']}}
+        ).sort('$natural', 1).limit(batch_size).to_list(batch_size)
+        if not entries:
+            await applier.mark_idle()
+            await asyncio.sleep(poll_interval)
+            continue
+
+        # Updates only carry a diff; fetch the current documents in one query per collection
+        updated = {}
+        for entry in entries:
+            if entry['op'] == 'u':
+                updated.setdefault(entry['ns'].split('.', 1)[1], set()).add(entry['o2']['_id'])
+        current = {}
+        for collection, ids in updated.items():
+            async for doc in db[collection].find({'_id': {'$in': list(ids)}}):
+                current[(collection, str(doc['_id']))] = doc
+
+        events = []
+        for entry in entries:
+            collection = entry['ns'].split('.', 1)[1]
+            if entry['op'] == 'i':
+                events.append(('upsert', collection, str(entry['o']['_id']), entry['o']))
+            elif entry['op'] == 'u':
+                mongo_id = str(entry['o2']['_id'])
+                events.append(('upsert', collection, mongo_id, current.get((collection, mongo_id))))
+            else:
+                events.append(('delete', collection, str(entry['o']['_id']), None))
+
+        last_ts = entries[-1]['ts']
+        await applier.apply(events, {'ts': [last_ts.time, last_ts.inc]}, _timestamp_to_datetime(last_ts))
+        logger.info("Applied %d oplog entries, lag %.1fs", len(events), applier.lag_seconds or 0.0)
+
+
+async def main():
+    """Run the replicator until interrupted"""
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--mode', choices=['change-stream', 'oplog'], default='change-stream')
+    parser.add_argument('--start-at', type=float,
+                        help='Unix time to start from when no checkpoint exists')
+    parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE)
+    parser.add_argument('--flush-interval', type=float, default=DEFAULT_FLUSH_INTERVAL,
+                        help='Max seconds to wait before applying a partial batch')
+    parser.add_argument('--ignore-unmapped-deletes', action='store_true',
+                        help='Log and skip deletes of documents with no known row id instead of '
+                             'stopping (only once they are confirmed to have never been migrated)')
+    args = parser.parse_args()
+
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+    )
+
+    client = AsyncIOMotorClient(MONGO_URL)
+    pool = await asyncpg.create_pool(DATABASE_URL, min_size=1, max_size=2)
+    try:
+        async with pool.acquire() as conn:
+            missing = await missing_tables(conn)
+            if missing:
+                raise SystemExit(
+                    f"Tables {', '.join(missing)} do not exist; run "
+                    "`python migrate_to_neon.py --schema-only` before starting the replicator"
+                )
+            await ensure_schema(conn)
+        applier = PostgresApplier(pool, args.mode, args.ignore_unmapped_deletes)
+        db = client[MONGO_DB]
+        await applier.seed_id_map(db)
+        if args.mode == 'oplog':
+            await replicate_oplog(client, db, applier, args.batch_size, args.flush_interval, args.start_at)
+        else:
+            await replicate_change_stream(db, applier, args.batch_size, args.flush_interval, args.start_at)
+    finally:
+        await pool.close()
+        client.close()
+
+
+if __name__ == "__main__":
+    try:
+        asyncio.run(main())
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,220 @@
+"""
+Monthly range partitioning and retention for time-series tables
+
+status_checks (by timestamp) and incidents (by created_at) grow without bound.
+Once converted to monthly range partitions, recent-data queries only touch the
+newest partitions and retention drops or detaches whole months instead of
+running huge DELETEs.
+
+The one-off conversion rewrites the table and takes an exclusive lock, so it is
+run by hand during a quiet period:
+    python partitions.py convert status_checks
+    python partitions.py convert incidents
+
+Afterwards the scheduler's partitions.maintain task creates partitions ahead of
+time and applies the retention policies below.
+"""
+import argparse
+import asyncio
+import logging
+import os
+import re
+from datetime import date, datetime, timezone
+
+
+# Partition key and retention per table. Old status checks are dropped; old
+# incidents are only detached, leaving a standalone table to archive.
+PARTITIONED_TABLES = {
+    'status_checks': {
+        'column': 'timestamp',
+        'keep_months': int(os.environ.get('STATUS_CHECK_RETENTION_MONTHS', 3)),
+        'retention': 'drop',
+    },
+    'incidents': {
+        'column': 'created_at',
+        'keep_months': int(os.environ.get('INCIDENT_RETENTION_MONTHS', 36)),
+        'retention': 'detach',
+    },
+}
+
+MONTHS_AHEAD = 3
+
+logger = logging.getLogger(__name__)
+
+
+def _add_months(month, count):
+    """First day of the month `count` months after `month`"""
+    index = month.year * 12 + month.month - 1 + count
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(table, month):
+    return f'{table}_p{month.year:04d}_{month.month:02d}'
+
+
+def _partition_month(table, name):
+    """Month a partition covers, parsed from its name; None for others"""
+    match = re.fullmatch(rf'{re.escape(table)}_p(\d{{4}})_(\d{{2}})', name)
+    return date(int(match.group(1)), int(match.group(2)), 1) if match else None
+
+
+def _current_month():
+    today = datetime.now(timezone.utc).date()
+    return date(today.year, today.month, 1)
+
+
+async def is_partitioned(conn, table):
+    return await conn.fetchval(
+        "SELECT relkind = 'p' FROM pg_class WHERE relname = $1 AND relnamespace = 'public'::regnamespace",
+        table
+    ) or False
+
+
+async def list_partitions(conn, table):
+    rows = await conn.fetch('''
+        SELECT child.relname AS name
+        FROM pg_inherits
+        JOIN pg_class parent ON parent.oid = pg_inherits.inhparent
+        JOIN pg_class child ON child.oid = pg_inherits.inhrelid
+        WHERE parent.relname = $1
+        ORDER BY child.relname
+    ''', table)
+    return [row['name'] for row in rows]
+
+
+async def create_partition(conn, table, month):
+    """Create the partition for one month if it does not exist yet.
+
+    Rows of that month already in the default partition would make CREATE
+    fail, so the default is detached, the rows are moved into the new
+    partition and the default is attached again, all in one transaction.
+    """
+    name = partition_name(table, month)
+    bounds = f"FROM ('{month.isoformat()}') TO ('{_add_months(month, 1).isoformat()}')"
+    column = PARTITIONED_TABLES[table]['column']
+    default = f'{table}_pdefault'
+    async with conn.transaction():
+        stranded = await conn.fetchval(
+            f'SELECT EXISTS (SELECT 1 FROM {default} WHERE {column} >= $1 AND {column} < $2)',
+            month, _add_months(month, 1)
+        ) if await conn.fetchval('SELECT to_regclass($1) IS NOT NULL', default) else False
+        if not stranded:
+            await conn.execute(f'CREATE TABLE IF NOT EXISTS {name} PARTITION OF {table} FOR VALUES {bounds}')
+            return name
+
+        await conn.execute(f'ALTER TABLE {table} DETACH PARTITION {default}')
+        await conn.execute(f'CREATE TABLE {name} PARTITION OF {table} FOR VALUES {bounds}')
+        moved = await conn.execute(f'''
+            WITH moved AS (
+                DELETE FROM {default} WHERE {column} >= $1 AND {column} < $2 RETURNING *
+            )
+            INSERT INTO {table} SELECT * FROM moved
+        ''', month, _add_months(month, 1))
+        await conn.execute(f'ALTER TABLE {table} ATTACH PARTITION {default} DEFAULT')
+    logger.info("Moved %s rows from %s into %s", moved.split()[-1], default, name)
+    return name
+
+
+async def ensure_partitions(conn, table, months_ahead=MONTHS_AHEAD):
+    """Create partitions from the current month up to `months_ahead` months out"""
+    month = _current_month()
+    created = []
+    existing = set(await list_partitions(conn, table))
+    for offset in range(months_ahead + 1):
+        target = _add_months(month, offset)
+        if partition_name(table, target) in existing:
+            continue
+        created.append(await create_partition(conn, table, target))
+    return created
+
+
+async def apply_retention(conn, table, keep_months, action):
+    """Drop or detach partitions entirely older than `keep_months` months"""
+    cutoff = _add_months(_current_month(), -keep_months)
+    removed = []
+    for name in await list_partitions(conn, table):
+        month = _partition_month(table, name)
+        if month is None or _add_months(month, 1) > cutoff:
+            continue
+        if action == 'drop':
+            await conn.execute(f'DROP TABLE {name}')
+        else:
+            await conn.execute(f'ALTER TABLE {table} DETACH PARTITION {name}')
+        removed.append(name)
+    return removed
+
+
+async def maintain_partitions(conn):
+    """Scheduler entry point: create upcoming partitions and enforce retention"""
+    for table, policy in PARTITIONED_TABLES.items():
+        if not await is_partitioned(conn, table):
+            continue
+        created = await ensure_partitions(conn, table)
+        removed = await apply_retention(conn, table, policy['keep_months'], policy['retention'])
+        if created or removed:
+            logger.info("%s partitions: created %s, %s %s", table, created, policy['retention'], removed)
+
+
+async def convert_to_partitioned(conn, table):
+    """Rewrite `table` as a monthly range-partitioned table, keeping its rows.
+
+    The primary key becomes (id, <partition column>) because unique constraints
+    on a partitioned table must include the partition key.
+    """
+    if await is_partitioned(conn, table):
+        print(f"   {table} is already partitioned")
+        return
+
+    column = PARTITIONED_TABLES[table]['column']
+    staging = f'{table}_partitioned'
+    async with conn.transaction():
+        await conn.execute(f'LOCK TABLE {table} IN ACCESS EXCLUSIVE MODE')
+        await conn.execute(f'''
+            CREATE TABLE {staging} (LIKE {table} INCLUDING DEFAULTS INCLUDING CONSTRAINTS)
+            PARTITION BY RANGE ({column})
+        ''')
+        await conn.execute(f'ALTER TABLE {staging} ADD PRIMARY KEY (id, {column})')
+
+        oldest = await conn.fetchval(f'SELECT MIN({column}) FROM {table}')
+        month = date(oldest.year, oldest.month, 1) if oldest else _current_month()
+        last = _add_months(_current_month(), MONTHS_AHEAD)
+        while month <= last:
+            await conn.execute(f'''
+                CREATE TABLE {partition_name(table, month)} PARTITION OF {staging}
+                FOR VALUES FROM ('{month.isoformat()}') TO ('{_add_months(month, 1).isoformat()}')
+            ''')
+            month = _add_months(month, 1)
+        await conn.execute(f'CREATE TABLE {table}_pdefault PARTITION OF {staging} DEFAULT')
+
+        moved = await conn.execute(f'INSERT INTO {staging} SELECT * FROM {table}')
+        await conn.execute(f'DROP TABLE {table}')
+        await conn.execute(f'ALTER TABLE {staging} RENAME TO {table}')
+    print(f"   ✅ {table}: {moved.split()[-1]} rows moved into monthly partitions")
+
+
+async def main():
+    from database import DATABASE_URL
+    from schema import ensure_schema
+    import asyncpg
+
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    convert_parser = subparsers.add_parser('convert', help='Convert a table to monthly partitions')
+    convert_parser.add_argument('table', choices=sorted(PARTITIONED_TABLES))
+    subparsers.add_parser('maintain', help='Create upcoming partitions and apply retention now')
+    args = parser.parse_args()
+
+    conn = await asyncpg.connect(DATABASE_URL)
+    try:
+        if args.command == 'convert':
+            await convert_to_partitioned(conn, args.table)
+            # Recreate indexes and triggers that were dropped with the old table
+            await ensure_schema(conn)
+        else:
+            await maintain_partitions(conn)
+    finally:
+        await conn.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,486 @@
+"""
+Streaming logical backup and restore for the Neon PostgreSQL database
+
+Backup streams every table with COPY ... TO STDOUT into gzip-compressed,
+size-capped part files and writes a manifest.json describing them. All tables
+are read from one exported snapshot, so the backup is consistent even though
+tables are dumped in parallel. Restore streams the parts back with COPY FROM,
+one connection per table. Memory use is bounded by the COPY block size in both
+directions.
+
+Every table of the public schema is included (partitions through their
+parent), and restores load tables referenced by foreign keys before the tables
+referencing them.
+
+Incremental backups export only rows whose updated_at (or timestamp for
+status_checks) moved past the parent backup's watermark, plus the current id
+list of each table so deletes can be replayed. Tables without such a column are
+exported in full and replace their previous contents. Restoring an incremental
+backup replays its whole chain: the base full backup, then every increment in
+order.
+
+Usage:
+    python pg_backup.py backup --out backups
+    python pg_backup.py backup --out backups --incremental
+    python pg_backup.py restore backups/20240815T020000Z --truncate
+"""
+import argparse
+import asyncio
+import gzip
+import hashlib
+import json
+import os
+import time
+from datetime import datetime, timezone, timedelta
+from pathlib import Path
+
+import asyncpg
+
+from database import DATABASE_URL, primary_key_columns
+
+
+MANIFEST_NAME = 'manifest.json'
+DEFAULT_PART_SIZE = 64 * 1024 * 1024  # uncompressed bytes per part file
+DEFAULT_JOBS = 4
+READ_BLOCK_SIZE = 1024 * 1024
+
+# Change-tracking column per table; tables not listed are copied in full
+WATERMARK_COLUMNS = {
+    'incidents': 'updated_at',
+    'hotlines': 'updated_at',
+    'map_locations': 'updated_at',
+    'emergency_plans': 'updated_at',
+    'checklists': 'updated_at',
+    'status_checks': 'timestamp',
+}
+
+# Append-only tables whose deletes (retention) are not replayed
+APPEND_ONLY = {'status_checks'}
+
+# Re-export rows changed shortly before the parent watermark, to cover
+# transactions that were still in flight when the parent snapshot was taken
+WATERMARK_OVERLAP = timedelta(minutes=10)
+
+
+def _format_rate(nbytes, rows, seconds):
+    seconds = max(seconds, 1e-6)
+    return f"{nbytes / seconds / 1024 / 1024:.1f} MB/s, {rows / seconds:.0f} rows/s"
+
+
+class PartWriter:
+    """COPY output sink that rotates gzip part files at a size limit"""
+
+    def __init__(self, directory, table, part_size, compresslevel=6):
+        self.directory = directory
+        self.table = table
+        self.part_size = part_size
+        self.compresslevel = compresslevel
+        self.parts = []
+        self._file = None
+        self._digest = None
+        self._written = 0
+
+    def _open_part(self):
+        name = f'{self.table}.{len(self.parts):05d}.csv.gz'
+        self._file = gzip.open(self.directory / name, 'wb', compresslevel=self.compresslevel)
+        self._digest = hashlib.sha256()
+        self._written = 0
+        self.parts.append({'file': name})
+
+    def _close_part(self):
+        self._file.close()
+        part = self.parts[-1]
+        part['bytes'] = self._written
+        part['compressed_bytes'] = os.path.getsize(self.directory / part['file'])
+        part['sha256'] = self._digest.hexdigest()
+        self._file = None
+
+    async def __call__(self, data):
+        if self._file is None:
+            self._open_part()
+        await asyncio.to_thread(self._file.write, data)
+        self._digest.update(data)
+        self._written += len(data)
+        if self._written >= self.part_size:
+            self._close_part()
+
+    def close(self):
+        if self._file is not None:
+            self._close_part()
+        return self.parts
+
+
+async def _table_columns(conn, table):
+    rows = await conn.fetch('''
+        SELECT column_name FROM information_schema.columns
+        WHERE table_schema = 'public' AND table_name = $1
+        ORDER BY ordinal_position
+    ''', table)
+    return [row['column_name'] for row in rows]
+
+
+async def _dependency_levels(conn, tables):
+    """Group tables so each one only references tables of earlier groups"""
+    rows = await conn.fetch('''
+        SELECT DISTINCT c.conrelid::regclass::text AS dependent, c.confrelid::regclass::text AS referenced
+        FROM pg_constraint c
+        WHERE c.contype = 'f'
+          AND c.conparentid = 0
+          AND c.conrelid <> c.confrelid
+          AND c.conrelid = ANY($1::regclass[])
+          AND c.confrelid = ANY($1::regclass[])
+    ''', tables)
+    pending = {table: set() for table in tables}
+    for row in rows:
+        pending[row['dependent']].add(row['referenced'])
+    levels = []
+    while pending:
+        ready = sorted(table for table, references in pending.items() if not references & pending.keys())
+        if not ready:
+            raise ValueError(f"Foreign keys form a cycle between {', '.join(sorted(pending))}")
+        levels.append(ready)
+        for table in ready:
+            del pending[table]
+    return levels
+
+
+async def list_tables(conn):
+    """Tables of the public schema (not partitions), referenced tables first"""
+    rows = await conn.fetch('''
+        SELECT relname FROM pg_class
+        WHERE relnamespace = 'public'::regnamespace AND relkind IN ('r', 'p') AND NOT relispartition
+    ''')
+    levels = await _dependency_levels(conn, [row['relname'] for row in rows])
+    return [table for level in levels for table in level]
+
+
+async def _sync_sequences(conn, table):
+    """Move serial/identity sequences past the restored values"""
+    rows = await conn.fetch('''
+        SELECT attname, pg_get_serial_sequence($1::text, attname) AS sequence
+        FROM pg_attribute
+        WHERE attrelid = $1::text::regclass AND attnum > 0 AND NOT attisdropped
+    ''', table)
+    for row in rows:
+        if row['sequence']:
+            await conn.execute(
+                f"SELECT setval($1::text::regclass, COALESCE(MAX({row['attname']}), 1), MAX({row['attname']}) IS NOT NULL) FROM {table}",
+                row['sequence']
+            )
+
+
+def _copy_row_count(status):
+    """'COPY 123' -> 123"""
+    return int(status.split()[-1]) if status else 0
+
+
+async def backup_table(pool, snapshot, directory, table, part_size, since=None):
+    """Dump one table inside the shared snapshot; returns its manifest entry.
+
+    With `since`, only rows changed after it are dumped, together with the
+    table's full id list; tables without a watermark column are dumped whole.
+    """
+    started = time.monotonic()
+    writer = PartWriter(directory, table, part_size)
+    id_writer = None
+    async with pool.acquire() as conn:
+        async with conn.transaction(isolation='repeatable_read', readonly=True):
+            await conn.execute(f"SET TRANSACTION SNAPSHOT '{snapshot}'")
+            columns = await _table_columns(conn, table)
+            if since is not None and table in WATERMARK_COLUMNS:
+                status = await conn.copy_from_query(
+                    f"SELECT {', '.join(columns)} FROM {table} WHERE {WATERMARK_COLUMNS[table]} > $1",
+                    since, output=writer, format='csv'
+                )
+            else:
+                # COPY TO does not accept partitioned tables, a query works for both
+                status = await conn.copy_from_query(
+                    f"SELECT {', '.join(columns)} FROM {table}", output=writer, format='csv'
+                )
+            if since is not None and table in WATERMARK_COLUMNS and table not in APPEND_ONLY:
+                id_writer = PartWriter(directory, f'{table}.ids', part_size)
+                await conn.copy_from_query(f'SELECT id FROM {table}', output=id_writer, format='csv')
+    parts = writer.close()
+    rows = _copy_row_count(status)
+    seconds = time.monotonic() - started
+    nbytes = sum(part['bytes'] for part in parts)
+    print(f"   ✅ {table}: {rows} rows in {len(parts)} parts ({_format_rate(nbytes, rows, seconds)})")
+    entry = {'columns': columns, 'rows': rows, 'bytes': nbytes, 'seconds': round(seconds, 3), 'parts': parts}
+    if since is not None and table not in WATERMARK_COLUMNS:
+        entry['complete'] = True
+    if id_writer is not None:
+        entry['id_parts'] = id_writer.close()
+    return entry
+
+
+def _read_manifest(directory):
+    with open(Path(directory) / MANIFEST_NAME) as f:
+        return json.load(f)
+
+
+def _latest_backup(out_dir):
+    """Most recent backup directory under out_dir, or None"""
+    candidates = sorted(
+        path for path in Path(out_dir).iterdir()
+        if path.is_dir() and (path / MANIFEST_NAME).exists()
+    ) if Path(out_dir).is_dir() else []
+    return candidates[-1] if candidates else None
+
+
+async def backup(out_dir, tables=None, part_size=DEFAULT_PART_SIZE, jobs=DEFAULT_JOBS,
+                 incremental=False, parent_dir=None):
+    """Write a backup of the given tables into a new timestamped directory.
+
+    Incremental backups build on `parent_dir`, or the latest backup in out_dir.
+    """
+    since = None
+    parent = None
+    if incremental:
+        parent = Path(parent_dir) if parent_dir else _latest_backup(out_dir)
+        if parent is None:
+            raise ValueError(f"No previous backup in {out_dir} to build an increment on")
+        since = datetime.fromisoformat(_read_manifest(parent)['watermark']) - WATERMARK_OVERLAP
+
+    created_at = datetime.now(timezone.utc)
+    directory = Path(out_dir) / created_at.strftime('%Y%m%dT%H%M%SZ')
+    directory.mkdir(parents=True, exist_ok=False)
+
+    kind = 'incremental' if incremental else 'full'
+    started = time.monotonic()
+    pool = await asyncpg.create_pool(DATABASE_URL, min_size=1, max_size=jobs + 1)
+    try:
+        if not tables:
+            async with pool.acquire() as conn:
+                tables = await list_tables(conn)
+        print(f"💾 Writing {kind} backup of {len(tables)} tables to {directory}")
+        # Hold the exporting transaction open until every table has been copied
+        async with pool.acquire() as coordinator:
+            async with coordinator.transaction(isolation='repeatable_read', readonly=True):
+                snapshot, watermark = await coordinator.fetchrow(
+                    "SELECT pg_export_snapshot(), now() AT TIME ZONE 'utc'"
+                )
+                semaphore = asyncio.Semaphore(jobs)
+
+                async def run(table):
+                    async with semaphore:
+                        return table, await backup_table(pool, snapshot, directory, table, part_size, since)
+
+                results = dict(await asyncio.gather(*(run(table) for table in tables)))
+    finally:
+        await pool.close()
+
+    manifest = {
+        'type': kind,
+        'format': 'csv',
+        'compression': 'gzip',
+        'created_at': created_at.isoformat(),
+        'watermark': watermark.isoformat(),
+        'parent': str(parent.resolve()) if parent else None,
+        'since': since.isoformat() if since else None,
+        'tables': {table: results[table] for table in tables},
+    }
+    with open(directory / MANIFEST_NAME, 'w') as f:
+        json.dump(manifest, f, indent=2)
+
+    seconds = time.monotonic() - started
+    nbytes = sum(entry['bytes'] for entry in results.values())
+    rows = sum(entry['rows'] for entry in results.values())
+    print(f"🎉 Backup completed in {seconds:.1f}s ({_format_rate(nbytes, rows, seconds)})")
+    return directory
+
+
+async def _read_parts(directory, parts):
+    """Yield uncompressed COPY data of all parts in order, verifying checksums"""
+    for part in parts:
+        digest = hashlib.sha256()
+        f = await asyncio.to_thread(gzip.open, directory / part['file'], 'rb')
+        try:
+            while True:
+                block = await asyncio.to_thread(f.read, READ_BLOCK_SIZE)
+                if not block:
+                    break
+                digest.update(block)
+                yield block
+        finally:
+            f.close()
+        if digest.hexdigest() != part['sha256']:
+            raise ValueError(f"Checksum mismatch in {part['file']}")
+
+
+async def restore_table(pool, directory, table, entry):
+    """Load one table from its part files in a single transaction"""
+    started = time.monotonic()
+    async with pool.acquire() as conn:
+        async with conn.transaction():
+            status = await conn.copy_to_table(
+                table, source=_read_parts(directory, entry['parts']),
+                columns=entry['columns'], format='csv'
+            )
+            await _sync_sequences(conn, table)
+    rows = _copy_row_count(status)
+    seconds = time.monotonic() - started
+    print(f"   ✅ {table}: {rows} rows ({_format_rate(entry['bytes'], rows, seconds)})")
+    return rows
+
+
+async def merge_table(pool, directory, table, entry):
+    """Apply one table of an incremental backup: upsert changed rows, drop deleted ones
+
+    Rows are deleted when missing from the id list, or for a `complete` entry
+    from the dumped rows themselves.
+    """
+    started = time.monotonic()
+    columns = ', '.join(entry['columns'])
+    async with pool.acquire() as conn:
+        key_columns = await primary_key_columns(conn, table)
+        updates = ', '.join(
+            f'{column} = EXCLUDED.{column}' for column in entry['columns'] if column not in key_columns
+        )
+        async with conn.transaction():
+            await conn.execute(f'CREATE TEMP TABLE _restore_rows (LIKE {table} INCLUDING DEFAULTS) ON COMMIT DROP')
+            status = await conn.copy_to_table(
+                '_restore_rows', source=_read_parts(directory, entry['parts']),
+                columns=entry['columns'], format='csv'
+            )
+            await conn.execute(f'''
+                INSERT INTO {table} ({columns}) SELECT {columns} FROM _restore_rows
+                ON CONFLICT ({', '.join(key_columns)}) {f'DO UPDATE SET {updates}' if updates else 'DO NOTHING'}
+            ''')
+            if entry.get('id_parts'):
+                await conn.execute(f'CREATE TEMP TABLE _restore_ids ON COMMIT DROP AS SELECT id FROM {table} WITH NO DATA')
+                await conn.copy_to_table(
+                    '_restore_ids', source=_read_parts(directory, entry['id_parts']), format='csv'
+                )
+                await conn.execute(f'''
+                    DELETE FROM {table} t
+                    WHERE NOT EXISTS (SELECT 1 FROM _restore_ids r WHERE r.id = t.id)
+                ''')
+            elif entry.get('complete'):
+                keys = ', '.join(key_columns)
+                await conn.execute(f'''
+                    DELETE FROM {table} t
+                    WHERE ({', '.join(f't.{column}' for column in key_columns)}) NOT IN (SELECT {keys} FROM _restore_rows)
+                ''')
+            await _sync_sequences(conn, table)
+    rows = _copy_row_count(status)
+    seconds = time.monotonic() - started
+    print(f"   ✅ {table}: {rows} changed rows ({_format_rate(entry['bytes'], rows, seconds)})")
+    return rows
+
+
+async def _outside_dependents(conn, tables):
+    """Tables outside `tables` with foreign keys into them, as (dependent, referenced)"""
+    rows = await conn.fetch('''
+        SELECT DISTINCT c.conrelid::regclass::text AS dependent, c.confrelid::regclass::text AS referenced
+        FROM pg_constraint c
+        WHERE c.contype = 'f'
+          AND c.conparentid = 0  -- partitions inherit their parent's constraints
+          AND c.confrelid = ANY($1::regclass[])
+          AND NOT c.conrelid = ANY($1::regclass[])
+        ORDER BY 1, 2
+    ''', tables)
+    return [(row['dependent'], row['referenced']) for row in rows]
+
+
+async def truncate_tables(conn, tables, cascade=False):
+    """Empty tables before a full restore.
+
+    Tables that reference the selection but are not part of it would make the
+    TRUNCATE fail. They are only emptied too (CASCADE) when `cascade` is set;
+    otherwise the restore is refused before anything is changed.
+    """
+    dependents = await _outside_dependents(conn, tables)
+    if dependents and not cascade:
+        raise ValueError(
+            "Cannot truncate " + ', '.join(tables) + "; referenced by "
+            + ', '.join(f'{dependent} -> {referenced}' for dependent, referenced in dependents)
+            + ". Restore those tables too, or pass --cascade to empty them."
+        )
+    if dependents:
+        print("   ⚠️  --cascade also empties " + ', '.join(sorted({dependent for dependent, _ in dependents})))
+    await conn.execute(f"TRUNCATE {', '.join(tables)}" + (' CASCADE' if dependents else ''))
+
+
+def _backup_chain(directory):
+    """[full, increment, ..., directory] for a backup directory"""
+    chain = [Path(directory)]
+    manifest = _read_manifest(directory)
+    while manifest['type'] == 'incremental':
+        chain.insert(0, Path(manifest['parent']))
+        manifest = _read_manifest(chain[0])
+    return chain
+
+
+async def restore(backup_dir, tables=None, jobs=DEFAULT_JOBS, truncate=False, cascade=False):
+    """Restore tables from a backup directory, in parallel per table.
+
+    An incremental backup is restored by replaying its base and every increment.
+    """
+    chain = _backup_chain(backup_dir)
+    print(f"♻️  Restoring {len(chain)} backup(s) ending at {backup_dir}")
+    started = time.monotonic()
+    rows = 0
+    nbytes = 0
+    pool = await asyncpg.create_pool(DATABASE_URL, min_size=1, max_size=jobs)
+    try:
+        for directory in chain:
+            manifest = _read_manifest(directory)
+            selected = [table for table in manifest['tables'] if not tables or table in tables]
+            print(f"   📂 {directory.name} ({manifest['type']})")
+
+            if truncate and manifest['type'] == 'full':
+                async with pool.acquire() as conn:
+                    await truncate_tables(conn, selected, cascade)
+
+            load = restore_table if manifest['type'] == 'full' else merge_table
+            semaphore = asyncio.Semaphore(jobs)
+
+            async def run(table):
+                async with semaphore:
+                    return await load(pool, directory, table, manifest['tables'][table])
+
+            # Referenced tables are loaded before the tables pointing at them
+            async with pool.acquire() as conn:
+                levels = await _dependency_levels(conn, selected)
+            for level in levels:
+                rows += sum(await asyncio.gather(*(run(table) for table in level)))
+            nbytes += sum(manifest['tables'][table]['bytes'] for table in selected)
+    finally:
+        await pool.close()
+
+    seconds = time.monotonic() - started
+    print(f"🎉 Restore completed in {seconds:.1f}s ({_format_rate(nbytes, rows, seconds)})")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    backup_parser = subparsers.add_parser('backup', help='Dump tables to compressed part files')
+    backup_parser.add_argument('--out', default='backups', help='Parent directory for backups')
+    backup_parser.add_argument('--table', action='append', help='Table to dump (repeatable, default: all)')
+    backup_parser.add_argument('--part-size', type=int, default=DEFAULT_PART_SIZE,
+                               help='Uncompressed bytes per part file')
+    backup_parser.add_argument('--jobs', type=int, default=DEFAULT_JOBS)
+    backup_parser.add_argument('--incremental', action='store_true',
+                               help='Only dump rows changed since the parent backup')
+    backup_parser.add_argument('--parent', help='Parent backup directory (default: latest in --out)')
+
+    restore_parser = subparsers.add_parser('restore', help='Load tables from a backup directory')
+    restore_parser.add_argument('backup_dir')
+    restore_parser.add_argument('--table', action='append', help='Table to restore (repeatable, default: all)')
+    restore_parser.add_argument('--jobs', type=int, default=DEFAULT_JOBS)
+    restore_parser.add_argument('--truncate', action='store_true',
+                                help='Empty the tables before loading')
+    restore_parser.add_argument('--cascade', action='store_true',
+                                help='With --truncate, also empty tables that reference the restored ones')
+
+    args = parser.parse_args()
+    if args.command == 'backup':
+        asyncio.run(backup(args.out, args.table, args.part_size, args.jobs, args.incremental, args.parent))
+    else:
+        asyncio.run(restore(args.backup_dir, args.table, args.jobs, args.truncate, args.cascade))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""
+Change log of reference data (hotlines, map_locations) for delta sync
+
+Admin endpoints call record_change() in the same transaction as their write,
+so the log holds exactly the committed changes. Writers serialize on an
+advisory lock before taking a sequence number, which makes sequence order equal
+commit order: a client that has seen seq N can never later miss a change < N.
+
+Old entries are compacted away by a periodic task; clients whose position is
+older than the compaction point get a full snapshot instead of deltas.
+"""
+import json
+from datetime import datetime, timezone, timedelta
+
+
+REFERENCE_TABLES = ('hotlines', 'map_locations')
+# Arbitrary application-wide advisory lock key for change log writers
+REFERENCE_CHANGES_LOCK_KEY = 7_150_003
+CHANGE_RETENTION = timedelta(days=30)
+MAX_CHANGES_PER_PAGE = 1000
+
+
+async def record_change(conn, table, op, row_id, row=None):
+    """Log an insert, update or delete; call inside the writing transaction"""
+    await conn.execute('SELECT pg_advisory_xact_lock($1)', REFERENCE_CHANGES_LOCK_KEY)
+    return await conn.fetchval('''
+        INSERT INTO reference_changes (table_name, op, row_id, data)
+        VALUES ($1, $2, $3, $4)
+        RETURNING seq
+    ''', table, op, str(row_id), json.dumps(row, default=str) if row is not None else None)
+
+
+async def compacted_through(conn):
+    """Highest sequence number removed by compaction (0 if none)"""
+    return await conn.fetchval('SELECT COALESCE(MAX(through_seq), 0) FROM reference_changes_compaction')
+
+
+async def changes_since(conn, since, limit=MAX_CHANGES_PER_PAGE):
+    """Ordered changes after `since`, or None when the log no longer reaches back that far"""
+    if since < await compacted_through(conn):
+        return None
+    rows = await conn.fetch('''
+        SELECT seq, table_name, op, row_id, data, changed_at
+        FROM reference_changes
+        WHERE seq > $1
+        ORDER BY seq
+        LIMIT $2
+    ''', since, limit)
+    return [
+        {
+            'seq': row['seq'],
+            'table': row['table_name'],
+            'op': row['op'],
+            'id': row['row_id'],
+            'row': json.loads(row['data']) if isinstance(row['data'], str) else row['data'],
+            'changed_at': row['changed_at'],
+        }
+        for row in rows
+    ]
+
+
+async def high_water_mark(conn):
+    return await conn.fetchval('''
+        SELECT GREATEST(
+            (SELECT COALESCE(MAX(seq), 0) FROM reference_changes),
+            (SELECT COALESCE(MAX(through_seq), 0) FROM reference_changes_compaction)
+        )
+    ''')
+
+
+async def compact_changes(conn, retention=CHANGE_RETENTION):
+    """Delete entries older than `retention` and remember how far the log was cut"""
+    cutoff = datetime.now(timezone.utc).replace(tzinfo=None) - retention
+    async with conn.transaction():
+        through = await conn.fetchval(
+            'SELECT MAX(seq) FROM reference_changes WHERE changed_at < $1', cutoff
+        )
+        if through is None:
+            return 0
+        result = await conn.execute('DELETE FROM reference_changes WHERE seq <= $1', through)
+        await conn.execute('''
+            INSERT INTO reference_changes_compaction (singleton, through_seq) VALUES (TRUE, $1)
+            ON CONFLICT (singleton) DO UPDATE SET through_seq = GREATEST(reference_changes_compaction.through_seq, $1)
+        ''', through)
+    return int(result.split()[-1])
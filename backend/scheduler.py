@@ -0,0 +1,274 @@
+"""
+Periodic task scheduler with leader election across workers
+
+Every uvicorn worker runs a Scheduler, but only the one holding a session-level
+PostgreSQL advisory lock (the leader) executes tasks, so each task runs once
+per cluster tick. If the leader dies its connection closes, the lock is
+released and another worker takes over on its next tick.
+
+Schedules are in UTC. Interval schedules are aligned to the epoch, so a
+failover does not shift or repeat ticks.
+"""
+import asyncio
+import logging
+import time
+from datetime import datetime, timezone, timedelta
+
+import asyncpg
+
+
+# Arbitrary application-wide advisory lock key for scheduler leadership
+SCHEDULER_LOCK_KEY = 7_150_002
+TICK_SECONDS = 1.0
+
+logger = logging.getLogger(__name__)
+
+
+def _utcnow():
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+class Interval:
+    """Run every N seconds, aligned to multiples of N since the epoch"""
+
+    def __init__(self, seconds=0, minutes=0, hours=0):
+        self.seconds = seconds + minutes * 60 + hours * 3600
+        if self.seconds <= 0:
+            raise ValueError("Interval must be positive")
+
+    def next_after(self, moment):
+        epoch = moment.replace(tzinfo=timezone.utc).timestamp()
+        slot = (int(epoch) // self.seconds + 1) * self.seconds
+        return datetime.fromtimestamp(slot, timezone.utc).replace(tzinfo=None)
+
+    def __repr__(self):
+        return f'every {self.seconds}s'
+
+
+class Cron:
+    """Five-field cron expression: minute hour day-of-month month day-of-week.
+
+    Supports *, lists, ranges and steps (e.g. "*/15 2-5 * * 1,3"). Day-of-week
+    0 and 7 are Sunday. As in cron, when both day fields are restricted a day
+    matches if either matches.
+    """
+
+    RANGES = [(0, 59), (0, 23), (1, 31), (1, 12), (0, 7)]
+
+    def __init__(self, expression):
+        fields = expression.split()
+        if len(fields) != 5:
+            raise ValueError(f"Cron expression needs 5 fields: {expression!r}")
+        self.expression = expression
+        self.minutes, self.hours, self.days, self.months, weekdays = (
+            self._parse(field, low, high) for field, (low, high) in zip(fields, self.RANGES)
+        )
+        self.weekdays = {day % 7 for day in weekdays}
+        self.any_day = fields[2] == '*'
+        self.any_weekday = fields[4] == '*'
+
+    @staticmethod
+    def _parse(field, low, high):
+        values = set()
+        for part in field.split(','):
+            spec, _, step = part.partition('/')
+            if spec == '*':
+                start, end = low, high
+            elif '-' in spec:
+                start, end = (int(value) for value in spec.split('-'))
+            else:
+                start = end = int(spec)
+                if step:
+                    end = high
+            if start < low or end > high or start > end:
+                raise ValueError(f"Cron field {field!r} out of range {low}-{high}")
+            values.update(range(start, end + 1, int(step) if step else 1))
+        return values
+
+    def _day_matches(self, moment):
+        day_ok = moment.day in self.days
+        # cron weekdays count from Sunday = 0, Python's from Monday = 0
+        weekday_ok = (moment.weekday() + 1) % 7 in self.weekdays
+        if self.any_day:
+            return weekday_ok
+        if self.any_weekday:
+            return day_ok
+        return day_ok or weekday_ok
+
+    def next_after(self, moment):
+        candidate = moment.replace(second=0, microsecond=0) + timedelta(minutes=1)
+        limit = candidate + timedelta(days=366 * 5)
+        while candidate < limit:
+            if candidate.month not in self.months:
+                month = candidate.month % 12 + 1
+                year = candidate.year + (1 if month == 1 else 0)
+                candidate = candidate.replace(year=year, month=month, day=1, hour=0, minute=0)
+            elif not self._day_matches(candidate):
+                candidate = candidate.replace(hour=0, minute=0) + timedelta(days=1)
+            elif candidate.hour not in self.hours:
+                candidate = candidate.replace(minute=0) + timedelta(hours=1)
+            elif candidate.minute not in self.minutes:
+                candidate += timedelta(minutes=1)
+            else:
+                return candidate
+        raise ValueError(f"Cron expression never fires: {self.expression!r}")
+
+    def __repr__(self):
+        return f'cron {self.expression!r}'
+
+
+class PeriodicTask:
+    """A named coroutine function with its schedule and run metrics"""
+
+    def __init__(self, name, schedule, fn):
+        self.name = name
+        self.schedule = schedule
+        self.fn = fn
+        self.next_run = None
+        self.running = None
+        self.runs = 0
+        self.failures = 0
+        self.last_started_at = None
+        self.last_duration = None
+        self.total_duration = 0.0
+        self.last_error = None
+
+    def metrics(self):
+        return {
+            'name': self.name,
+            'schedule': repr(self.schedule),
+            'next_run': self.next_run,
+            'running': self.running is not None and not self.running.done(),
+            'runs': self.runs,
+            'failures': self.failures,
+            'last_started_at': self.last_started_at,
+            'last_duration_seconds': self.last_duration,
+            'avg_duration_seconds': self.total_duration / self.runs if self.runs else None,
+            'last_error': self.last_error,
+        }
+
+
+class Scheduler:
+    """Runs registered periodic tasks on the elected leader worker"""
+
+    def __init__(self, dsn, pool_getter=None, lock_key=SCHEDULER_LOCK_KEY, tick=TICK_SECONDS):
+        self.dsn = dsn
+        self.pool_getter = pool_getter
+        self.lock_key = lock_key
+        self.tick = tick
+        self.tasks = {}
+        self.is_leader = False
+        self._conn = None
+        self._loop_task = None
+
+    def add(self, name, schedule, fn):
+        """Register `fn` (an async function without arguments) under `name`"""
+        self.tasks[name] = PeriodicTask(name, schedule, fn)
+
+    async def start(self):
+        self._loop_task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._loop_task:
+            self._loop_task.cancel()
+            try:
+                await self._loop_task
+            except asyncio.CancelledError:
+                pass
+        running = [task.running for task in self.tasks.values() if task.running and not task.running.done()]
+        if running:
+            await asyncio.wait(running, timeout=30)
+        await self._release()
+
+    def metrics(self):
+        return {
+            'is_leader': self.is_leader,
+            'tasks': [task.metrics() for task in self.tasks.values()],
+        }
+
+    async def _run(self):
+        while True:
+            try:
+                if self.is_leader:
+                    await self._conn.fetchval('SELECT 1')
+                else:
+                    await self._try_acquire()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                if self.is_leader:
+                    logger.warning("Lost scheduler leadership: %s", e)
+                await self._release()
+
+            if self.is_leader:
+                self._run_due(_utcnow())
+            await asyncio.sleep(self.tick)
+
+    async def _try_acquire(self):
+        if self._conn is None or self._conn.is_closed():
+            self._conn = await asyncpg.connect(self.dsn)
+        if await self._conn.fetchval('SELECT pg_try_advisory_lock($1)', self.lock_key):
+            self.is_leader = True
+            now = _utcnow()
+            for task in self.tasks.values():
+                task.next_run = task.schedule.next_after(now)
+            logger.info("Elected scheduler leader for %d tasks", len(self.tasks))
+
+    async def _release(self):
+        self.is_leader = False
+        if self._conn is not None and not self._conn.is_closed():
+            # Closing the session releases the advisory lock
+            await self._conn.close()
+        self._conn = None
+
+    def _run_due(self, now):
+        for task in self.tasks.values():
+            if task.next_run is None or task.next_run > now:
+                continue
+            task.next_run = task.schedule.next_after(now)
+            if task.running is not None and not task.running.done():
+                logger.warning("Skipping %s: previous run still in progress", task.name)
+                continue
+            task.running = asyncio.create_task(self._execute(task))
+
+    async def _execute(self, task):
+        task.last_started_at = _utcnow()
+        started = time.monotonic()
+        error = None
+        try:
+            await task.fn()
+        except Exception as e:
+            error = f'{type(e).__name__}: {e}'
+            logger.exception("Periodic task %s failed", task.name)
+        duration = time.monotonic() - started
+
+        task.runs += 1
+        task.total_duration += duration
+        task.last_duration = duration
+        task.last_error = error
+        if error:
+            task.failures += 1
+        await self._record_run(task, duration, error)
+
+    async def _record_run(self, task, duration, error):
+        """Persist run metrics so any worker can report them"""
+        if self.pool_getter is None:
+            return
+        try:
+            pool = await self.pool_getter()
+            async with pool.acquire() as conn:
+                await conn.execute('''
+                    INSERT INTO scheduled_task_runs
+                        (name, last_started_at, last_duration_ms, last_error, runs, failures, updated_at)
+                    VALUES ($1, $2, $3, $4, 1, $5, $6)
+                    ON CONFLICT (name) DO UPDATE SET
+                        last_started_at = EXCLUDED.last_started_at,
+                        last_duration_ms = EXCLUDED.last_duration_ms,
+                        last_error = EXCLUDED.last_error,
+                        runs = scheduled_task_runs.runs + 1,
+                        failures = scheduled_task_runs.failures + EXCLUDED.failures,
+                        updated_at = EXCLUDED.updated_at
+                ''', task.name, task.last_started_at, duration * 1000, error,
+                   1 if error else 0, _utcnow())
+        except Exception as e:
+            logger.warning("Recording run of %s failed: %s", task.name, e)
@@ -0,0 +1,234 @@
+"""
+Idempotent schema upgrades for the Neon PostgreSQL database
+
+The base tables are created by migrate_to_neon.py. Everything added afterwards is
+listed here as IF NOT EXISTS statements and applied on every startup, serialized
+across workers with an advisory lock.
+"""
+
+# Arbitrary application-wide advisory lock key for schema changes
+SCHEMA_LOCK_KEY = 7_150_001
+
+SCHEMA_STATEMENTS = [
+    # Checkpoint and lag metrics of the MongoDB -> PostgreSQL replicator
+    '''
+    CREATE TABLE IF NOT EXISTS replication_state (
+        source VARCHAR(50) PRIMARY KEY,
+        position JSONB,
+        last_event_at TIMESTAMP,
+        lag_seconds FLOAT,
+        events_applied BIGINT DEFAULT 0,
+        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+    ''',
+    # MongoDB _id -> row id, needed to apply deletes (which only carry _id)
+    '''
+    CREATE TABLE IF NOT EXISTS replication_id_map (
+        collection VARCHAR(100) NOT NULL,
+        mongo_id VARCHAR(64) NOT NULL,
+        row_id VARCHAR(255) NOT NULL,
+        PRIMARY KEY (collection, mongo_id)
+    )
+    ''',
+    # Change tracking for incremental backups. Explicit updated_at writes win,
+    # so restores keep the original values.
+    '''
+    CREATE OR REPLACE FUNCTION touch_updated_at() RETURNS trigger AS $$
+    BEGIN
+        IF NEW.updated_at IS NOT DISTINCT FROM OLD.updated_at THEN
+            NEW.updated_at := now() AT TIME ZONE 'utc';
+        END IF;
+        RETURN NEW;
+    END;
+    $$ LANGUAGE plpgsql
+    ''',
+    # Existing incidents start from their creation time
+    '''
+    DO $$
+    BEGIN
+        IF NOT EXISTS (
+            SELECT 1 FROM information_schema.columns
+            WHERE table_name = 'incidents' AND column_name = 'updated_at'
+        ) THEN
+            ALTER TABLE incidents ADD COLUMN updated_at TIMESTAMP;
+            UPDATE incidents SET updated_at = created_at;
+            ALTER TABLE incidents ALTER COLUMN updated_at SET DEFAULT (now() AT TIME ZONE 'utc');
+        END IF;
+    END $$
+    ''',
+    "ALTER TABLE hotlines ADD COLUMN IF NOT EXISTS updated_at TIMESTAMP DEFAULT (now() AT TIME ZONE 'utc')",
+    "ALTER TABLE map_locations ADD COLUMN IF NOT EXISTS updated_at TIMESTAMP DEFAULT (now() AT TIME ZONE 'utc')",
+    *[
+        statement
+        for table in ('incidents', 'hotlines', 'map_locations', 'emergency_plans', 'checklists')
+        for statement in (
+            f'CREATE INDEX IF NOT EXISTS idx_{table}_updated_at ON {table} (updated_at)',
+            f'''
+            CREATE OR REPLACE TRIGGER {table}_touch_updated_at
+            BEFORE UPDATE ON {table}
+            FOR EACH ROW EXECUTE FUNCTION touch_updated_at()
+            ''',
+        )
+    ],
+    'CREATE INDEX IF NOT EXISTS idx_status_checks_timestamp ON status_checks (timestamp)',
+    # Ids of live incident feed events
+    'CREATE SEQUENCE IF NOT EXISTS incident_event_seq',
+    # Background job queue (job_queue.py)
+    '''
+    CREATE TABLE IF NOT EXISTS jobs (
+        id BIGSERIAL PRIMARY KEY,
+        kind VARCHAR(100) NOT NULL,
+        payload JSONB NOT NULL DEFAULT '{}',
+        status VARCHAR(20) NOT NULL DEFAULT 'queued',
+        attempts INTEGER NOT NULL DEFAULT 0,
+        max_attempts INTEGER NOT NULL DEFAULT 5,
+        run_at TIMESTAMP NOT NULL DEFAULT (now() AT TIME ZONE 'utc'),
+        locked_at TIMESTAMP,
+        locked_by VARCHAR(255),
+        last_error TEXT,
+        created_at TIMESTAMP NOT NULL DEFAULT (now() AT TIME ZONE 'utc'),
+        finished_at TIMESTAMP
+    )
+    ''',
+    "CREATE INDEX IF NOT EXISTS idx_jobs_ready ON jobs (run_at) WHERE status = 'queued'",
+    "CREATE INDEX IF NOT EXISTS idx_jobs_running ON jobs (locked_at) WHERE status = 'running'",
+    "CREATE INDEX IF NOT EXISTS idx_jobs_finished ON jobs (finished_at) WHERE status = 'done'",
+    # Last run of each periodic task, written by the scheduler leader
+    '''
+    CREATE TABLE IF NOT EXISTS scheduled_task_runs (
+        name VARCHAR(100) PRIMARY KEY,
+        last_started_at TIMESTAMP,
+        last_duration_ms FLOAT,
+        last_error TEXT,
+        runs BIGINT NOT NULL DEFAULT 0,
+        failures BIGINT NOT NULL DEFAULT 0,
+        updated_at TIMESTAMP
+    )
+    ''',
+    # One plan and one checklist per user, saved with optimistic versioning.
+    # Duplicates left by racing saves are removed first, keeping the newest.
+    *[
+        statement
+        for table in ('emergency_plans', 'checklists')
+        for statement in (
+            f'ALTER TABLE {table} ADD COLUMN IF NOT EXISTS version BIGINT NOT NULL DEFAULT 1',
+            f'''
+            DO $$
+            BEGIN
+                IF to_regclass('idx_{table}_user_id') IS NULL THEN
+                    DELETE FROM {table} USING (
+                        SELECT id, row_number() OVER (
+                            PARTITION BY user_id ORDER BY updated_at DESC NULLS LAST, id
+                        ) AS rank
+                        FROM {table}
+                    ) ranked
+                    WHERE {table}.id = ranked.id AND ranked.rank > 1;
+                    CREATE UNIQUE INDEX idx_{table}_user_id ON {table} (user_id);
+                END IF;
+            END $$
+            ''',
+        )
+    ],
+    # Recent changes of plans and checklists, so clients can catch up with deltas
+    '''
+    CREATE TABLE IF NOT EXISTS user_document_deltas (
+        document VARCHAR(50) NOT NULL,
+        user_id VARCHAR(255) NOT NULL,
+        version BIGINT NOT NULL,
+        patch_type VARCHAR(20) NOT NULL,
+        patch JSONB NOT NULL,
+        created_at TIMESTAMP NOT NULL DEFAULT (now() AT TIME ZONE 'utc'),
+        PRIMARY KEY (document, user_id, version)
+    )
+    ''',
+    # Change log of hotlines and map_locations for delta sync (reference_changes.py)
+    '''
+    CREATE TABLE IF NOT EXISTS reference_changes (
+        seq BIGSERIAL PRIMARY KEY,
+        table_name VARCHAR(50) NOT NULL,
+        op VARCHAR(10) NOT NULL,
+        row_id VARCHAR(255) NOT NULL,
+        data JSONB,
+        changed_at TIMESTAMP NOT NULL DEFAULT (now() AT TIME ZONE 'utc')
+    )
+    ''',
+    'CREATE INDEX IF NOT EXISTS idx_reference_changes_changed_at ON reference_changes (changed_at)',
+    '''
+    CREATE TABLE IF NOT EXISTS reference_changes_compaction (
+        singleton BOOLEAN PRIMARY KEY DEFAULT TRUE CHECK (singleton),
+        through_seq BIGINT NOT NULL
+    )
+    ''',
+    # Ingested typhoon bulletins, newest first by issue time (typhoon_feed.py)
+    '''
+    CREATE TABLE IF NOT EXISTS typhoon_bulletins (
+        bulletin_id VARCHAR(100) PRIMARY KEY,
+        source VARCHAR(50) NOT NULL,
+        name VARCHAR(255) NOT NULL,
+        issued_at TIMESTAMP NOT NULL,
+        data JSONB NOT NULL,
+        fetched_at TIMESTAMP NOT NULL DEFAULT (now() AT TIME ZONE 'utc')
+    )
+    ''',
+    'CREATE INDEX IF NOT EXISTS idx_typhoon_bulletins_issued_at ON typhoon_bulletins (issued_at DESC)',
+    # Barangay containing the incident location (spatial_index.py), NULL if none
+    'ALTER TABLE incidents ADD COLUMN IF NOT EXISTS barangay VARCHAR(255)',
+    'CREATE INDEX IF NOT EXISTS idx_incidents_barangay ON incidents (barangay, created_at)',
+    # Geohash of the incident location (geohash.py). Byte-order collation so
+    # prefix ranges match the btree order; the included columns let map
+    # viewport queries run as index-only scans.
+    'ALTER TABLE incidents ADD COLUMN IF NOT EXISTS geohash VARCHAR(12) COLLATE "C"',
+    '''
+    CREATE INDEX IF NOT EXISTS idx_incidents_geohash ON incidents (geohash, created_at)
+    INCLUDE (id, latitude, longitude, incident_type, status)
+    ''',
+    'CREATE INDEX IF NOT EXISTS idx_incidents_type_created_at ON incidents (incident_type, created_at)',
+    # When the incident was last marked resolved, for image archival
+    # (image_archive.py). Set by trigger so every writer (API, replicator)
+    # records it; explicit values, e.g. from a restore, are kept. Incidents
+    # already resolved start from their last update.
+    '''
+    DO $$
+    BEGIN
+        IF NOT EXISTS (
+            SELECT 1 FROM information_schema.columns
+            WHERE table_name = 'incidents' AND column_name = 'resolved_at'
+        ) THEN
+            ALTER TABLE incidents ADD COLUMN resolved_at TIMESTAMP;
+            -- A backfill is not a change; keep updated_at for incremental backups
+            ALTER TABLE incidents DISABLE TRIGGER incidents_touch_updated_at;
+            UPDATE incidents SET resolved_at = updated_at WHERE status = 'resolved';
+            ALTER TABLE incidents ENABLE TRIGGER incidents_touch_updated_at;
+        END IF;
+    END $$
+    ''',
+    '''
+    CREATE OR REPLACE FUNCTION set_resolved_at() RETURNS trigger AS $$
+    BEGIN
+        IF NEW.status IS DISTINCT FROM 'resolved' THEN
+            NEW.resolved_at := NULL;
+        ELSIF TG_OP = 'INSERT' THEN
+            NEW.resolved_at := COALESCE(NEW.resolved_at, now() AT TIME ZONE 'utc');
+        ELSIF OLD.status IS DISTINCT FROM 'resolved' AND NEW.resolved_at IS NOT DISTINCT FROM OLD.resolved_at THEN
+            NEW.resolved_at := now() AT TIME ZONE 'utc';
+        END IF;
+        RETURN NEW;
+    END;
+    $$ LANGUAGE plpgsql
+    ''',
+    '''
+    CREATE OR REPLACE TRIGGER incidents_set_resolved_at
+    BEFORE INSERT OR UPDATE ON incidents
+    FOR EACH ROW EXECUTE FUNCTION set_resolved_at()
+    ''',
+    'CREATE INDEX IF NOT EXISTS idx_incidents_resolved_at ON incidents (resolved_at) WHERE status = \'resolved\'',
+    'CREATE INDEX IF NOT EXISTS idx_incidents_created_at ON incidents (created_at)',
+]
+
+
+async def ensure_schema(conn):
+    """Apply all schema upgrades in one transaction"""
+    async with conn.transaction():
+        await conn.execute('SELECT pg_advisory_xact_lock($1)', SCHEMA_LOCK_KEY)
+        for statement in SCHEMA_STATEMENTS:
+            await conn.execute(statement)
@@ -1,4 +1,7 @@
-from fastapi import FastAPI, APIRouter, HTTPException, Depends
+from fastapi import FastAPI, APIRouter, HTTPException, Depends, Request, Response, Header
+from fastapi.responses import StreamingResponse, JSONResponse
+from fastapi.encoders import jsonable_encoder
+from fastapi.security import HTTPAuthorizationCredentials
 from dotenv import load_dotenv
 from starlette.middleware.cors import CORSMiddleware
 import os
@@ -9,9 +12,34 @@ from typing import List, Optional
 import uuid
 from datetime import datetime, timezone, timedelta
 import json
+import csv
+import io
+import asyncio
+import hashlib
 from auth_utils import get_password_hash, verify_password, create_access_token
-from auth_middleware import get_current_user, get_current_user_optional
-from database import get_pool, record_to_dict, records_to_list, close_pool
+from auth_middleware import get_current_user, get_current_user_optional, security, user_id_from_credentials
+from database import get_pool, record_to_dict, records_to_list, close_pool, DATABASE_DIRECT_URL
+from schema import ensure_schema
+from incident_feed import IncidentFeed, publish_incident_event
+from job_queue import enqueue
+from image_archive import parse_images, rehydrate_images
+from json_patch import (
+    apply_json_patch, apply_merge_patch, JsonPatchError, JsonPatchTestFailed,
+    JSON_PATCH_MEDIA_TYPE, MERGE_PATCH_MEDIA_TYPE,
+)
+from scheduler import Scheduler, Interval, Cron
+from write_behind import WriteBehindBuffer, BufferFull
+from batch import run_batch, MAX_BATCH_REQUESTS
+from singleflight import SingleFlight
+from typhoon_feed import BulletinSnapshot, latest_bulletin, bulletin_history, bulletin_to_api, TYPHOON_POLL_SECONDS
+from typhoon_impact import compute_impact, ImpactCache
+from barangays import load_barangays
+from spatial_index import barangay_index
+from geohash import encode as geohash_encode, cover as geohash_cover, prefix_ranges
+from hazard_layers import load_hazard_layers, tile_json, valid_tile
+from reference_changes import record_change, changes_since, high_water_mark, MAX_CHANGES_PER_PAGE
+from compression import CompressionMiddleware, DecompressionMiddleware, PrecompressedJSON, etag_matches, FAST
+import tasks
 
 
 ROOT_DIR = Path(__file__).parent
@@ -30,6 +58,24 @@ app = FastAPI()
 # Create a router with the /api prefix
 api_router = APIRouter(prefix="/api")
 
+# Live incident events for admin dashboards (one listener connection per worker)
+incident_feed = IncidentFeed(DATABASE_DIRECT_URL)
+SSE_HEARTBEAT_SECONDS = 15
+
+# Periodic tasks; every worker runs the scheduler but only the elected leader executes
+scheduler = Scheduler(DATABASE_DIRECT_URL, pool_getter=get_pool)
+scheduler.add("jobs.purge_finished", Interval(hours=1), tasks.purge_finished_jobs)
+scheduler.add("partitions.maintain", Cron("15 0 * * *"), tasks.maintain_time_partitions)
+scheduler.add("images.archive", Cron("45 1 * * *"), tasks.schedule_image_archival)
+scheduler.add("reference_changes.compact", Cron("30 2 * * *"), tasks.compact_reference_changes)
+scheduler.add("typhoon.ingest", Interval(seconds=TYPHOON_POLL_SECONDS), tasks.ingest_typhoon_bulletin)
+
+# Concurrent identical public reads share one computation (see _coalesced_json)
+read_flights = SingleFlight()
+
+# Device heartbeats are written in batches so pings never hold pool connections
+status_buffer = WriteBehindBuffer(get_pool, "status_checks", ["id", "client_name", "timestamp"])
+
 
 # Define Models
 class StatusCheck(BaseModel):
@@ -71,6 +117,7 @@ class IncidentReport(BaseModel):
     images: List[IncidentImage] = []
     internal_notes: str = ""
     status: str = "new"  # new / in-progress / resolved
+    barangay: Optional[str] = None
     created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
 
 class IncidentReportCreate(BaseModel):
@@ -219,12 +266,49 @@ class ChecklistResponse(BaseModel):
     updated_at: datetime
 
 
+class BatchItem(BaseModel):
+    path: str
+    id: Optional[str] = None
+    headers: Optional[dict] = None
+
+
+class BatchRequest(BaseModel):
+    requests: List[BatchItem]
+
+
 # Root endpoint
 @api_router.get("/")
 async def root():
     return {"message": "MDRRMO Pio Duran Emergency App API"}
 
 
+@api_router.post("/batch")
+async def batch_get(
+    payload: BatchRequest,
+    request: Request,
+    current_user: Optional[dict] = Depends(get_current_user_optional),
+):
+    """Run several GET requests in one round trip.
+
+    Sub-requests go through the app in-process and concurrently; the caller is
+    authenticated once and shared with every sub-request.
+    """
+    if not payload.requests:
+        raise HTTPException(status_code=400, detail="No requests in batch")
+    if len(payload.requests) > MAX_BATCH_REQUESTS:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_BATCH_REQUESTS} requests per batch")
+
+    shared_headers = {"accept": "application/json"}
+    if request.headers.get("authorization"):
+        shared_headers["authorization"] = request.headers["authorization"]
+    state = {"current_user": current_user} if current_user else {}
+
+    responses = await run_batch(
+        request.app, request.scope, [item.model_dump() for item in payload.requests], shared_headers, state
+    )
+    return {"responses": responses}
+
+
 # ============ AUTHENTICATION ENDPOINTS ============
 
 @api_router.post("/auth/register", response_model=Token)
@@ -358,10 +442,51 @@ async def admin_bootstrap(payload: AdminBootstrapRequest):
         return Token(access_token=access_token, user=user_response)
 
 
-@api_router.get("/admin/incidents")
-async def admin_list_incidents(
+def _parse_bbox(bbox: str):
+    """(min_lon, min_lat, max_lon, max_lat) from "minLon,minLat,maxLon,maxLat" """
+    try:
+        min_lon, min_lat, max_lon, max_lat = (float(part) for part in bbox.split(","))
+    except ValueError:
+        raise HTTPException(status_code=400, detail="bbox must be minLon,minLat,maxLon,maxLat")
+    if not (-180 <= min_lon <= max_lon <= 180 and -90 <= min_lat <= max_lat <= 90):
+        raise HTTPException(status_code=400, detail="bbox is out of range or inverted")
+    return min_lon, min_lat, max_lon, max_lat
+
+
+def _utc_naive(moment: Optional[datetime]) -> Optional[datetime]:
+    if moment is not None and moment.tzinfo:
+        return moment.astimezone(timezone.utc).replace(tzinfo=None)
+    return moment
+
+
+def _incident_filter_params(
     status: Optional[str] = None,
     q: Optional[str] = None,
+    barangay: Optional[str] = None,
+    incident_type: Optional[str] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    bbox: Optional[str] = None,
+) -> dict:
+    """Query parameters shared by the incident list endpoints"""
+    return {
+        "status": status,
+        "q": q,
+        "barangay": barangay,
+        "incident_type": incident_type,
+        "since": _utc_naive(since),
+        "until": _utc_naive(until),
+        "bbox": _parse_bbox(bbox) if bbox else None,
+    }
+
+
+# Upper bound of markers returned for one map viewport
+MAX_INCIDENT_POINTS = 5000
+
+
+@api_router.get("/admin/incidents")
+async def admin_list_incidents(
+    filters: dict = Depends(_incident_filter_params),
     current_user: dict = Depends(get_current_user),
 ):
     _require_admin(current_user)
@@ -369,16 +494,7 @@ async def admin_list_incidents(
     pool = await get_pool()
     async with pool.acquire() as conn:
         query = "SELECT * FROM incidents"
-        params = []
-        conditions = []
-        
-        if status:
-            conditions.append(f"status = ${len(params) + 1}")
-            params.append(status)
-        
-        if q:
-            conditions.append(f"(incident_type ILIKE ${len(params) + 1} OR description ILIKE ${len(params) + 1} OR reporter_phone ILIKE ${len(params) + 1})")
-            params.append(f"%{q}%")
+        conditions, params = _incident_filters(**filters)
         
         if conditions:
             query += " WHERE " + " AND ".join(conditions)
@@ -389,6 +505,163 @@ async def admin_list_incidents(
         return {"incidents": records_to_list(incidents)}
 
 
+@api_router.get("/admin/incidents/export")
+async def admin_export_incidents(
+    format: str = "ndjson",
+    filters: dict = Depends(_incident_filter_params),
+    include_images: bool = False,
+    current_user: dict = Depends(get_current_user),
+):
+    """Stream all matching incidents as CSV or NDJSON (admin only).
+
+    Rows are read through a server-side cursor, so memory use stays constant
+    regardless of how many incidents are exported.
+    """
+    _require_admin(current_user)
+    if format not in {"csv", "ndjson"}:
+        raise HTTPException(status_code=400, detail="format must be csv or ndjson")
+
+    columns = INCIDENT_EXPORT_COLUMNS + (["images"] if include_images else [])
+    conditions, params = _incident_filters(**filters)
+    query = f"SELECT {', '.join(columns)} FROM incidents"
+    if conditions:
+        query += " WHERE " + " AND ".join(conditions)
+    query += " ORDER BY created_at DESC"
+
+    pool = await get_pool()
+
+    async def export_chunks():
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        if format == "csv":
+            writer.writerow(columns)
+        rows = 0
+        async with pool.acquire() as conn:
+            async with conn.transaction(readonly=True):
+                async for record in conn.cursor(query, *params, prefetch=EXPORT_BATCH_SIZE):
+                    row = dict(record)
+                    if format == "csv":
+                        writer.writerow([
+                            value.isoformat() if isinstance(value, datetime) else value
+                            for value in row.values()
+                        ])
+                    else:
+                        if isinstance(row.get("images"), str):
+                            row["images"] = json.loads(row["images"])
+                        buffer.write(json.dumps(row, default=str))
+                        buffer.write("\n")
+                    rows += 1
+                    if rows % EXPORT_BATCH_SIZE == 0:
+                        yield buffer.getvalue()
+                        buffer.seek(0)
+                        buffer.truncate()
+        yield buffer.getvalue()
+
+    filename = f"incidents-{datetime.now(timezone.utc).strftime('%Y%m%d-%H%M%S')}.{format}"
+    return StreamingResponse(
+        export_chunks(),
+        media_type="text/csv" if format == "csv" else "application/x-ndjson",
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
+
+
+@api_router.get("/admin/incidents/barangays")
+async def admin_incident_barangay_counts(
+    filters: dict = Depends(_incident_filter_params),
+    current_user: dict = Depends(get_current_user),
+):
+    """Number of matching incidents per barangay; `barangay` null counts untagged ones"""
+    _require_admin(current_user)
+    conditions, params = _incident_filters(**{**filters, "barangay": None})
+    query = "SELECT barangay, COUNT(*) AS count FROM incidents"
+    if conditions:
+        query += " WHERE " + " AND ".join(conditions)
+    query += " GROUP BY barangay ORDER BY count DESC, barangay"
+
+    pool = await get_pool()
+    async with pool.acquire() as conn:
+        counts = await conn.fetch(query, *params)
+    return {"barangays": records_to_list(counts), "boundaries_loaded": len(barangay_index())}
+
+
+@api_router.get("/admin/incidents/points")
+async def admin_incident_points(
+    filters: dict = Depends(_incident_filter_params),
+    limit: int = MAX_INCIDENT_POINTS,
+    current_user: dict = Depends(get_current_user),
+):
+    """Incident markers inside a map viewport (`bbox` is required).
+
+    Only columns held in the geohash index are returned, so viewport queries
+    without text or barangay filters can be answered by index-only scans.
+    """
+    _require_admin(current_user)
+    if not filters["bbox"]:
+        raise HTTPException(status_code=400, detail="bbox is required")
+
+    conditions, params = _incident_filters(**filters)
+    params.append(max(1, min(limit, MAX_INCIDENT_POINTS)))
+    query = (
+        "SELECT id, latitude, longitude, incident_type, status, created_at FROM incidents"
+        f" WHERE {' AND '.join(conditions)} ORDER BY created_at DESC LIMIT ${len(params)}"
+    )
+
+    pool = await get_pool()
+    async with pool.acquire() as conn:
+        points = await conn.fetch(query, *params)
+    return {"points": records_to_list(points), "truncated": len(points) == params[-1]}
+
+
+@api_router.post("/admin/incidents/tags/backfill")
+async def admin_backfill_incident_tags(
+    retag: bool = False,
+    current_user: dict = Depends(get_current_user),
+):
+    """Queue barangay and geohash tagging of untagged incidents (all incidents with `retag`)"""
+    _require_admin(current_user)
+
+    pool = await get_pool()
+    async with pool.acquire() as conn:
+        job_id = await enqueue(conn, "incident.tag_locations", {"retag": retag})
+    return {"job_id": job_id}
+
+
+@api_router.get("/admin/incidents/stream")
+async def admin_incident_stream(
+    request: Request,
+    current_user: dict = Depends(get_current_user),
+):
+    """Server-Sent Events feed of incident changes (admin only).
+
+    Reconnecting clients send Last-Event-ID to replay what they missed; a
+    `reset` event means the gap is too large and the list should be reloaded.
+    """
+    _require_admin(current_user)
+    subscription = incident_feed.subscribe(request.headers.get("last-event-id"))
+
+    async def events():
+        try:
+            yield "retry: 3000\n\n"
+            while True:
+                # Too slow to keep up: close so the client resumes from its last id
+                if subscription.lagged and subscription.queue.empty():
+                    break
+                try:
+                    event = await asyncio.wait_for(subscription.queue.get(), SSE_HEARTBEAT_SECONDS)
+                except asyncio.TimeoutError:
+                    yield ": keep-alive\n\n"
+                    continue
+                yield f"id: {event['id']}\nevent: {event['op']}\ndata: {json.dumps(event['incident'])}\n\n"
+        finally:
+            incident_feed.unsubscribe(subscription)
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
 @api_router.get("/admin/incidents/{incident_id}")
 async def admin_get_incident(
     incident_id: str,
@@ -436,7 +709,41 @@ async def admin_update_incident(
     query = f"UPDATE incidents SET {', '.join(update_fields)} WHERE id = ${param_idx} RETURNING *"
     
     async with pool.acquire() as conn:
-        incident = await conn.fetchrow(query, *params)
+        async with conn.transaction():
+            incident = await conn.fetchrow(query, *params)
+            if not incident:
+                raise HTTPException(status_code=404, detail="Incident not found")
+            await publish_incident_event(conn, "updated", dict(incident))
+        return {"incident": record_to_dict(incident)}
+
+
+@api_router.post("/admin/incidents/{incident_id}/images/rehydrate")
+async def admin_rehydrate_incident_images(
+    incident_id: str,
+    current_user: dict = Depends(get_current_user),
+):
+    """Bring archived image payloads back into the incident row"""
+    _require_admin(current_user)
+    pool = await get_pool()
+
+    async with pool.acquire() as conn:
+        images = await conn.fetchval("SELECT images FROM incidents WHERE id = $1", incident_id)
+    if images is None:
+        raise HTTPException(status_code=404, detail="Incident not found")
+
+    images = parse_images(images)
+    if not any(image.get('archived') for image in images):
+        return await admin_get_incident(incident_id, current_user)
+    try:
+        restored = await asyncio.to_thread(rehydrate_images, images)
+    except FileNotFoundError:
+        raise HTTPException(status_code=410, detail="Archived image file is missing")
+
+    async with pool.acquire() as conn:
+        incident = await conn.fetchrow(
+            "UPDATE incidents SET images = $2 WHERE id = $1 RETURNING *",
+            incident_id, json.dumps(restored)
+        )
         if not incident:
             raise HTTPException(status_code=404, detail="Incident not found")
         return {"incident": record_to_dict(incident)}
@@ -451,9 +758,11 @@ async def admin_delete_incident(
     pool = await get_pool()
     
     async with pool.acquire() as conn:
-        result = await conn.execute("DELETE FROM incidents WHERE id = $1", incident_id)
-        if result == "DELETE 0":
-            raise HTTPException(status_code=404, detail="Incident not found")
+        async with conn.transaction():
+            result = await conn.execute("DELETE FROM incidents WHERE id = $1", incident_id)
+            if result == "DELETE 0":
+                raise HTTPException(status_code=404, detail="Incident not found")
+            await publish_incident_event(conn, "deleted", {"id": incident_id})
         return {"ok": True}
 
 
@@ -479,12 +788,13 @@ async def admin_create_hotline(
     hotline_id = str(uuid.uuid4())
     
     async with pool.acquire() as conn:
-        await conn.execute('''
-            INSERT INTO hotlines (id, label, number, category)
-            VALUES ($1, $2, $3, $4)
-        ''', hotline_id, payload.label, payload.number, payload.category)
-        
-        hotline = await conn.fetchrow("SELECT * FROM hotlines WHERE id = $1", hotline_id)
+        async with conn.transaction():
+            hotline = await conn.fetchrow('''
+                INSERT INTO hotlines (id, label, number, category)
+                VALUES ($1, $2, $3, $4)
+                RETURNING *
+            ''', hotline_id, payload.label, payload.number, payload.category)
+            await record_change(conn, "hotlines", "insert", hotline_id, dict(hotline))
         return {"hotline": record_to_dict(hotline)}
 
 
@@ -498,14 +808,15 @@ async def admin_update_hotline(
     pool = await get_pool()
     
     async with pool.acquire() as conn:
-        result = await conn.execute('''
-            UPDATE hotlines SET label = $1, number = $2, category = $3 WHERE id = $4
-        ''', payload.label, payload.number, payload.category, hotline_id)
-        
-        if result == "UPDATE 0":
-            raise HTTPException(status_code=404, detail="Hotline not found")
-        
-        hotline = await conn.fetchrow("SELECT * FROM hotlines WHERE id = $1", hotline_id)
+        async with conn.transaction():
+            hotline = await conn.fetchrow('''
+                UPDATE hotlines SET label = $1, number = $2, category = $3 WHERE id = $4
+                RETURNING *
+            ''', payload.label, payload.number, payload.category, hotline_id)
+            
+            if not hotline:
+                raise HTTPException(status_code=404, detail="Hotline not found")
+            await record_change(conn, "hotlines", "update", hotline_id, dict(hotline))
         return {"hotline": record_to_dict(hotline)}
 
 
@@ -518,9 +829,11 @@ async def admin_delete_hotline(
     pool = await get_pool()
     
     async with pool.acquire() as conn:
-        result = await conn.execute("DELETE FROM hotlines WHERE id = $1", hotline_id)
-        if result == "DELETE 0":
-            raise HTTPException(status_code=404, detail="Hotline not found")
+        async with conn.transaction():
+            result = await conn.execute("DELETE FROM hotlines WHERE id = $1", hotline_id)
+            if result == "DELETE 0":
+                raise HTTPException(status_code=404, detail="Hotline not found")
+            await record_change(conn, "hotlines", "delete", hotline_id)
         return {"ok": True}
 
 
@@ -563,17 +876,18 @@ async def admin_create_location(
     
     pool = await get_pool()
     async with pool.acquire() as conn:
-        # Get the next ID
-        last_id = await conn.fetchval("SELECT MAX(id) FROM map_locations")
-        next_id = (last_id + 1) if last_id else 1
-        
-        await conn.execute('''
-            INSERT INTO map_locations (id, type, name, address, lat, lng, capacity, services, hotline)
-            VALUES ($1, $2, $3, $4, $5, $6, $7, $8, $9)
-        ''', next_id, payload.type, payload.name, payload.address, payload.lat, payload.lng,
-           payload.capacity, payload.services, payload.hotline)
-        
-        location = await conn.fetchrow("SELECT * FROM map_locations WHERE id = $1", next_id)
+        async with conn.transaction():
+            # Get the next ID
+            last_id = await conn.fetchval("SELECT MAX(id) FROM map_locations")
+            next_id = (last_id + 1) if last_id else 1
+            
+            location = await conn.fetchrow('''
+                INSERT INTO map_locations (id, type, name, address, lat, lng, capacity, services, hotline)
+                VALUES ($1, $2, $3, $4, $5, $6, $7, $8, $9)
+                RETURNING *
+            ''', next_id, payload.type, payload.name, payload.address, payload.lat, payload.lng,
+               payload.capacity, payload.services, payload.hotline)
+            await record_change(conn, "map_locations", "insert", next_id, dict(location))
         return {"location": record_to_dict(location)}
 
 
@@ -641,9 +955,11 @@ async def admin_update_location(
     query = f"UPDATE map_locations SET {', '.join(update_fields)} WHERE id = ${param_idx} RETURNING *"
     
     async with pool.acquire() as conn:
-        location = await conn.fetchrow(query, *params)
-        if not location:
-            raise HTTPException(status_code=404, detail="Location not found")
+        async with conn.transaction():
+            location = await conn.fetchrow(query, *params)
+            if not location:
+                raise HTTPException(status_code=404, detail="Location not found")
+            await record_change(conn, "map_locations", "update", location_id, dict(location))
         return {"location": record_to_dict(location)}
 
 
@@ -657,12 +973,53 @@ async def admin_delete_location(
     pool = await get_pool()
     
     async with pool.acquire() as conn:
-        result = await conn.execute("DELETE FROM map_locations WHERE id = $1", location_id)
-        if result == "DELETE 0":
-            raise HTTPException(status_code=404, detail="Location not found")
+        async with conn.transaction():
+            result = await conn.execute("DELETE FROM map_locations WHERE id = $1", location_id)
+            if result == "DELETE 0":
+                raise HTTPException(status_code=404, detail="Location not found")
+            await record_change(conn, "map_locations", "delete", location_id)
         return {"ok": True}
 
 
+# ============ ADMIN REPLICATION ENDPOINTS ============
+
+@api_router.get("/admin/replication")
+async def admin_replication_status(current_user: dict = Depends(get_current_user)):
+    """Lag and checkpoint of the MongoDB -> PostgreSQL replicator (admin only)"""
+    _require_admin(current_user)
+    pool = await get_pool()
+
+    async with pool.acquire() as conn:
+        states = await conn.fetch(
+            "SELECT source, last_event_at, lag_seconds, events_applied, updated_at FROM replication_state ORDER BY source"
+        )
+    return {"replication": records_to_list(states)}
+
+
+@api_router.get("/admin/jobs")
+async def admin_job_stats(current_user: dict = Depends(get_current_user)):
+    """Background job counts per kind and status (admin only)"""
+    _require_admin(current_user)
+    pool = await get_pool()
+
+    async with pool.acquire() as conn:
+        stats = await conn.fetch(
+            "SELECT kind, status, COUNT(*) AS count, MIN(run_at) AS oldest_run_at FROM jobs GROUP BY kind, status ORDER BY kind, status"
+        )
+    return {"jobs": records_to_list(stats)}
+
+
+@api_router.get("/admin/scheduler")
+async def admin_scheduler_status(current_user: dict = Depends(get_current_user)):
+    """Periodic task schedule of this worker and last runs cluster-wide (admin only)"""
+    _require_admin(current_user)
+    pool = await get_pool()
+
+    async with pool.acquire() as conn:
+        runs = await conn.fetch("SELECT * FROM scheduled_task_runs ORDER BY name")
+    return {"worker": scheduler.metrics(), "runs": records_to_list(runs)}
+
+
 # ============ ADMIN HELPERS ============
 
 def _require_admin(current_user: dict):
@@ -670,6 +1027,75 @@ def _require_admin(current_user: dict):
         raise HTTPException(status_code=403, detail="Admin access required")
 
 
+# Incident columns included in exports; images are opt-in because of their size
+INCIDENT_EXPORT_COLUMNS = [
+    "id", "incident_type", "date", "time", "latitude", "longitude", "description",
+    "reporter_phone", "internal_notes", "status", "barangay", "created_at", "updated_at",
+]
+EXPORT_BATCH_SIZE = 500
+
+
+def _incident_filters(
+    status: Optional[str],
+    q: Optional[str],
+    barangay: Optional[str] = None,
+    incident_type: Optional[str] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    bbox: Optional[tuple] = None,
+):
+    """Build WHERE conditions and params shared by the admin incident list and export."""
+    conditions = []
+    params = []
+
+    if status:
+        conditions.append(f"status = ${len(params) + 1}")
+        params.append(status)
+
+    if barangay:
+        conditions.append(f"barangay = ${len(params) + 1}")
+        params.append(barangay)
+
+    if incident_type:
+        conditions.append(f"incident_type = ${len(params) + 1}")
+        params.append(incident_type)
+
+    if since:
+        conditions.append(f"created_at >= ${len(params) + 1}")
+        params.append(since)
+
+    if until:
+        conditions.append(f"created_at < ${len(params) + 1}")
+        params.append(until)
+
+    if bbox:
+        # Geohash ranges select the candidate cells through the index; the
+        # exact coordinates trim the cover down to the box. Incidents not yet
+        # tagged (replicated, or awaiting the startup backfill) are checked by
+        # coordinates alone.
+        min_lon, min_lat, max_lon, max_lat = bbox
+        ranges = ["geohash IS NULL"]
+        for low, high in prefix_ranges(geohash_cover(min_lat, min_lon, max_lat, max_lon)):
+            params.append(low)
+            if high is None:
+                ranges.append(f"geohash >= ${len(params)}")
+            else:
+                params.append(high)
+                ranges.append(f"(geohash >= ${len(params) - 1} AND geohash < ${len(params)})")
+        conditions.append(f"({' OR '.join(ranges)})")
+        params.extend([min_lat, max_lat, min_lon, max_lon])
+        conditions.append(
+            f"latitude BETWEEN ${len(params) - 3} AND ${len(params) - 2} "
+            f"AND longitude BETWEEN ${len(params) - 1} AND ${len(params)}"
+        )
+
+    if q:
+        conditions.append(f"(incident_type ILIKE ${len(params) + 1} OR description ILIKE ${len(params) + 1} OR reporter_phone ILIKE ${len(params) + 1})")
+        params.append(f"%{q}%")
+
+    return conditions, params
+
+
 async def _ensure_hotlines_seeded():
     """Seed DB hotlines from the existing default list if none exist yet."""
     pool = await get_pool()
@@ -788,6 +1214,8 @@ async def _normalize_incident_create_payload(payload: IncidentReportCreate) -> d
         "reporter_phone": reporter_phone,
         "internal_notes": "",
         "status": "new",
+        "barangay": barangay_index().locate(float(lat), float(lng)),
+        "geohash": geohash_encode(float(lat), float(lng)),
         "created_at": datetime.now(timezone.utc),
     }
 
@@ -795,48 +1223,287 @@ async def _normalize_incident_create_payload(payload: IncidentReportCreate) -> d
 
 # ============ USER-SPECIFIC DATA ENDPOINTS ============
 
+def _parse_if_match(if_match: Optional[str]) -> Optional[int]:
+    """Expected version from an If-Match header ("3", W/"3" or 3); None for absent or *"""
+    if if_match is None or if_match.strip() == "*":
+        return None
+    value = if_match.strip()
+    if value.startswith("W/"):
+        value = value[2:]
+    try:
+        return int(value.strip('"'))
+    except ValueError:
+        raise HTTPException(status_code=400, detail="If-Match must be a version number")
+
+
+def _version_etag(version: int) -> str:
+    return f'"{version}"'
+
+
+# Per-user documents: table -> JSONB data column
+USER_DOCUMENTS = {"emergency_plans": "plan_data", "checklists": "checklist_data"}
+# Deltas kept per document; clients further behind refetch the whole document
+USER_DOCUMENT_DELTA_HISTORY = 100
+
+PATCH_TYPES = {JSON_PATCH_MEDIA_TYPE: "json-patch", MERGE_PATCH_MEDIA_TYPE: "merge-patch"}
+
+
+def _record_delta_sql(table: str, source: str) -> str:
+    """CTEs logging the patch applied by CTE `source` ($2 user, $5/$6 patch) and pruning old deltas"""
+    return f'''
+        delta AS (
+            INSERT INTO user_document_deltas (document, user_id, version, patch_type, patch)
+            SELECT '{table}', $2, version, $5::varchar, $6::jsonb FROM {source}
+        ),
+        pruned AS (
+            DELETE FROM user_document_deltas
+            WHERE document = '{table}' AND user_id = $2
+              AND version <= (SELECT version FROM {source}) - {USER_DOCUMENT_DELTA_HISTORY}
+        )
+    '''
+
+
+async def _save_user_document(conn, table: str, user_id: str, data, expected_version: Optional[int]):
+    """Insert or update the user's single row in one round trip.
+
+    The version increases on every save. A whole-document save is not logged
+    as a delta; it clears the document's delta log instead, so clients behind
+    it get a 410 from the deltas endpoint and refetch the document. Returns
+    None when `expected_version` is given and no longer matches the stored row.
+    """
+    data_column = USER_DOCUMENTS[table]
+    return await conn.fetchrow(f'''
+        WITH saved AS (
+            INSERT INTO {table} (id, user_id, {data_column}, updated_at, version)
+            VALUES ($1, $2, $3, $4, 1)
+            ON CONFLICT (user_id) DO UPDATE SET
+                {data_column} = EXCLUDED.{data_column},
+                updated_at = EXCLUDED.updated_at,
+                version = {table}.version + 1
+            WHERE $5::bigint IS NULL OR {table}.version = $5
+            RETURNING id, updated_at, version
+        ),
+        cleared AS (
+            DELETE FROM user_document_deltas
+            WHERE document = '{table}' AND user_id = $2 AND EXISTS (SELECT 1 FROM saved)
+        )
+        SELECT * FROM saved
+    ''', str(uuid.uuid4()), user_id, json.dumps(data), to_naive_datetime(datetime.now(timezone.utc)),
+        expected_version)
+
+
+async def _patch_user_document(conn, table: str, user_id: str, patch_type: str, patch, expected_version: int):
+    """Apply a JSON Patch or merge patch to the user's document in one transaction.
+
+    Returns None when the stored version is not `expected_version`.
+    """
+    data_column = USER_DOCUMENTS[table]
+    async with conn.transaction():
+        row = await conn.fetchrow(
+            f"SELECT {data_column}, version FROM {table} WHERE user_id = $1 FOR UPDATE", user_id
+        )
+        if not row:
+            raise HTTPException(status_code=404, detail="Nothing saved yet to patch")
+        if row["version"] != expected_version:
+            return None
+
+        current = row[data_column]
+        current = json.loads(current) if isinstance(current, str) else current
+        try:
+            if patch_type == "merge-patch":
+                data = apply_merge_patch(current, patch)
+            else:
+                data = apply_json_patch(current, patch)
+        except JsonPatchTestFailed as e:
+            raise HTTPException(status_code=409, detail=str(e))
+        except JsonPatchError as e:
+            raise HTTPException(status_code=422, detail=str(e))
+        if type(data) is not type(current):
+            raise HTTPException(status_code=422, detail=f"Patch must keep {data_column} {'an array' if isinstance(current, list) else 'an object'}")
+
+        return await conn.fetchrow(f'''
+            WITH saved AS (
+                UPDATE {table} SET {data_column} = $3, updated_at = $4, version = version + 1
+                WHERE user_id = $2 AND version = $1
+                RETURNING id, updated_at, version
+            ),
+            {_record_delta_sql(table, "saved")}
+            SELECT * FROM saved
+        ''', expected_version, user_id, json.dumps(data), to_naive_datetime(datetime.now(timezone.utc)),
+            patch_type, json.dumps(patch))
+
+
+async def _read_patch(request: Request):
+    """Patch type and body of a PATCH request, chosen by its Content-Type"""
+    content_type = request.headers.get("content-type", "").split(";")[0].strip().lower()
+    patch_type = PATCH_TYPES.get(content_type)
+    if patch_type is None:
+        raise HTTPException(
+            status_code=415,
+            detail=f"Use {JSON_PATCH_MEDIA_TYPE} or {MERGE_PATCH_MEDIA_TYPE}",
+            headers={"Accept-Patch": ", ".join(PATCH_TYPES)},
+        )
+    try:
+        return patch_type, await request.json()
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Patch body is not valid JSON")
+
+
+async def _apply_user_document_patch(request: Request, response: Response, table: str, user_id: str, if_match: Optional[str]):
+    """Shared body of the PATCH endpoints; returns the new version"""
+    expected_version = _parse_if_match(if_match)
+    if expected_version is None:
+        raise HTTPException(status_code=428, detail="PATCH requires an If-Match version")
+    patch_type, patch = await _read_patch(request)
+    pool = await get_pool()
+
+    async with pool.acquire() as conn:
+        saved = await _patch_user_document(conn, table, user_id, patch_type, patch, expected_version)
+    if not saved:
+        raise HTTPException(status_code=409, detail="Document was changed on another device")
+
+    response.headers["ETag"] = _version_etag(saved["version"])
+    return {
+        "version": saved["version"],
+        "updated_at": saved["updated_at"].replace(tzinfo=timezone.utc).isoformat(),
+    }
+
+
+async def _user_document_deltas(table: str, user_id: str, since: int):
+    """Deltas from version `since` to the current one, oldest first.
+
+    410 unless every version in between is in the log (pruned, or replaced by
+    a whole-document save).
+    """
+    pool = await get_pool()
+
+    async with pool.acquire() as conn:
+        current = await conn.fetchval(f"SELECT version FROM {table} WHERE user_id = $1", user_id)
+        rows = await conn.fetch('''
+            SELECT version, patch_type, patch FROM user_document_deltas
+            WHERE document = $1 AND user_id = $2 AND version > $3
+            ORDER BY version
+        ''', table, user_id, since)
+    if current is None:
+        raise HTTPException(status_code=404, detail="Nothing saved yet")
+    if since > current or [row["version"] for row in rows] != list(range(since + 1, current + 1)):
+        raise HTTPException(status_code=410, detail="Deltas are no longer available, fetch the whole document")
+
+    deltas = []
+    for row in rows:
+        delta = dict(row)
+        if isinstance(delta["patch"], str):
+            delta["patch"] = json.loads(delta["patch"])
+        deltas.append(delta)
+    return {"version": deltas[-1]["version"] if deltas else since, "deltas": deltas}
+
+
+@api_router.get("/user/state")
+async def get_user_state(
+    request: Request,
+    credentials: HTTPAuthorizationCredentials = Depends(security)
+):
+    """User, emergency plan and checklist in one request (app start).
+
+    Authenticates once and reads everything with a single query. The ETag
+    combines both document versions with a digest of the profile, so an
+    unchanged state costs a 304.
+    """
+    user_id = user_id_from_credentials(credentials)
+    pool = await get_pool()
+
+    async with pool.acquire() as conn:
+        row = await conn.fetchrow('''
+            SELECT u.id, u.email, u.full_name, u.phone, u.is_admin, u.created_at,
+                   p.id AS plan_id, p.plan_data, p.updated_at AS plan_updated_at, p.version AS plan_version,
+                   c.id AS checklist_id, c.checklist_data, c.updated_at AS checklist_updated_at,
+                   c.version AS checklist_version
+            FROM users u
+            LEFT JOIN emergency_plans p ON p.user_id = u.id
+            LEFT JOIN checklists c ON c.user_id = u.id
+            WHERE u.id = $1
+        ''', user_id)
+    if row is None:
+        raise HTTPException(status_code=401, detail="User not found", headers={"WWW-Authenticate": "Bearer"})
+
+    user = User(**{key: row[key] for key in ("id", "email", "full_name", "phone", "is_admin", "created_at")})
+    user_digest = hashlib.sha1(user.model_dump_json().encode()).hexdigest()[:12]
+    etag = f'"{row["plan_version"] or 0}.{row["checklist_version"] or 0}.{user_digest}"'
+    # Browsers revalidate with If-None-Match on every load
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+
+    state = {"user": user.model_dump(), "plan": None, "checklist": None}
+    for key, table in (("plan", "emergency_plans"), ("checklist", "checklists")):
+        if row[f"{key}_id"] is None:
+            continue
+        data_column = USER_DOCUMENTS[table]
+        data = row[data_column]
+        state[key] = {
+            "id": row[f"{key}_id"],
+            "user_id": user_id,
+            data_column: json.loads(data) if isinstance(data, str) else data,
+            "updated_at": row[f"{key}_updated_at"],
+            "version": row[f"{key}_version"],
+        }
+    return JSONResponse(jsonable_encoder(state), headers=headers)
+
+
 @api_router.post("/user/emergency-plan")
 async def save_emergency_plan(
     plan: EmergencyPlanSave,
+    response: Response,
+    if_match: Optional[str] = Header(None),
     current_user: dict = Depends(get_current_user)
 ):
-    """Save or update user's emergency plan"""
+    """Save or update user's emergency plan; If-Match rejects lost updates with 409"""
+    expected_version = _parse_if_match(if_match)
     pool = await get_pool()
     
     async with pool.acquire() as conn:
-        # Check if plan already exists
-        existing_plan = await conn.fetchrow(
-            "SELECT id FROM emergency_plans WHERE user_id = $1",
-            current_user["id"]
+        saved = await _save_user_document(
+            conn, "emergency_plans", current_user["id"], plan.plan_data, expected_version
         )
-        
-        plan_id = existing_plan["id"] if existing_plan else str(uuid.uuid4())
-        updated_at = datetime.now(timezone.utc)
-        
-        if existing_plan:
-            await conn.execute('''
-                UPDATE emergency_plans SET plan_data = $1, updated_at = $2
-                WHERE user_id = $3
-            ''', json.dumps(plan.plan_data), to_naive_datetime(updated_at), current_user["id"])
-        else:
-            await conn.execute('''
-                INSERT INTO emergency_plans (id, user_id, plan_data, updated_at)
-                VALUES ($1, $2, $3, $4)
-            ''', plan_id, current_user["id"], json.dumps(plan.plan_data), to_naive_datetime(updated_at))
-        
-        return {
-            "message": "Emergency plan saved successfully",
-            "plan": {
-                "id": plan_id,
-                "user_id": current_user["id"],
-                "plan_data": plan.plan_data,
-                "updated_at": updated_at.isoformat()
-            }
+    if not saved:
+        raise HTTPException(status_code=409, detail="Emergency plan was changed on another device")
+    
+    response.headers["ETag"] = _version_etag(saved["version"])
+    return {
+        "message": "Emergency plan saved successfully",
+        "plan": {
+            "id": saved["id"],
+            "user_id": current_user["id"],
+            "plan_data": plan.plan_data,
+            "updated_at": saved["updated_at"].replace(tzinfo=timezone.utc).isoformat(),
+            "version": saved["version"]
         }
+    }
+
+
+@api_router.patch("/user/emergency-plan")
+async def patch_emergency_plan(
+    request: Request,
+    response: Response,
+    if_match: Optional[str] = Header(None),
+    current_user: dict = Depends(get_current_user)
+):
+    """Apply a JSON Patch or merge patch to the user's emergency plan"""
+    return await _apply_user_document_patch(request, response, "emergency_plans", current_user["id"], if_match)
+
+
+@api_router.get("/user/emergency-plan/deltas")
+async def get_emergency_plan_deltas(
+    since: int,
+    current_user: dict = Depends(get_current_user)
+):
+    """Changes to the user's emergency plan after version `since`"""
+    return await _user_document_deltas("emergency_plans", current_user["id"], since)
 
 
 @api_router.get("/user/emergency-plan")
 async def get_emergency_plan(
+    response: Response,
     current_user: dict = Depends(get_current_user)
 ):
     """Get user's emergency plan"""
@@ -856,51 +1523,64 @@ async def get_emergency_plan(
         if isinstance(plan_dict.get('plan_data'), str):
             plan_dict['plan_data'] = json.loads(plan_dict['plan_data'])
         
+        response.headers["ETag"] = _version_etag(plan_dict["version"])
         return {"plan": plan_dict}
 
 
 @api_router.post("/user/checklist")
 async def save_checklist(
     checklist: ChecklistSave,
+    response: Response,
+    if_match: Optional[str] = Header(None),
     current_user: dict = Depends(get_current_user)
 ):
-    """Save or update user's checklist progress"""
+    """Save or update user's checklist progress; If-Match rejects lost updates with 409"""
+    expected_version = _parse_if_match(if_match)
     pool = await get_pool()
     
     async with pool.acquire() as conn:
-        # Check if checklist already exists
-        existing_checklist = await conn.fetchrow(
-            "SELECT id FROM checklists WHERE user_id = $1",
-            current_user["id"]
+        saved = await _save_user_document(
+            conn, "checklists", current_user["id"], checklist.checklist_data, expected_version
         )
-        
-        checklist_id = existing_checklist["id"] if existing_checklist else str(uuid.uuid4())
-        updated_at = datetime.now(timezone.utc)
-        
-        if existing_checklist:
-            await conn.execute('''
-                UPDATE checklists SET checklist_data = $1, updated_at = $2
-                WHERE user_id = $3
-            ''', json.dumps(checklist.checklist_data), to_naive_datetime(updated_at), current_user["id"])
-        else:
-            await conn.execute('''
-                INSERT INTO checklists (id, user_id, checklist_data, updated_at)
-                VALUES ($1, $2, $3, $4)
-            ''', checklist_id, current_user["id"], json.dumps(checklist.checklist_data), to_naive_datetime(updated_at))
-        
-        return {
-            "message": "Checklist saved successfully",
-            "checklist": {
-                "id": checklist_id,
-                "user_id": current_user["id"],
-                "checklist_data": checklist.checklist_data,
-                "updated_at": updated_at.isoformat()
-            }
+    if not saved:
+        raise HTTPException(status_code=409, detail="Checklist was changed on another device")
+    
+    response.headers["ETag"] = _version_etag(saved["version"])
+    return {
+        "message": "Checklist saved successfully",
+        "checklist": {
+            "id": saved["id"],
+            "user_id": current_user["id"],
+            "checklist_data": checklist.checklist_data,
+            "updated_at": saved["updated_at"].replace(tzinfo=timezone.utc).isoformat(),
+            "version": saved["version"]
         }
+    }
+
+
+@api_router.patch("/user/checklist")
+async def patch_checklist(
+    request: Request,
+    response: Response,
+    if_match: Optional[str] = Header(None),
+    current_user: dict = Depends(get_current_user)
+):
+    """Apply a JSON Patch or merge patch to the user's checklist"""
+    return await _apply_user_document_patch(request, response, "checklists", current_user["id"], if_match)
+
+
+@api_router.get("/user/checklist/deltas")
+async def get_checklist_deltas(
+    since: int,
+    current_user: dict = Depends(get_current_user)
+):
+    """Changes to the user's checklist after version `since`"""
+    return await _user_document_deltas("checklists", current_user["id"], since)
 
 
 @api_router.get("/user/checklist")
 async def get_user_checklist(
+    response: Response,
     current_user: dict = Depends(get_current_user)
 ):
     """Get user's checklist progress"""
@@ -920,6 +1600,7 @@ async def get_user_checklist(
         if isinstance(checklist_dict.get('checklist_data'), str):
             checklist_dict['checklist_data'] = json.loads(checklist_dict['checklist_data'])
         
+        response.headers["ETag"] = _version_etag(checklist_dict["version"])
         return {"checklist": checklist_dict}
 
 
@@ -928,41 +1609,59 @@ async def get_user_checklist(
 # Status endpoints
 @api_router.post("/status", response_model=StatusCheck)
 async def create_status_check(input: StatusCheckCreate):
-    pool = await get_pool()
-    
+    """Record a status ping; the row is written asynchronously in a batch"""
     status_obj = StatusCheck(client_name=input.client_name)
     # Convert timezone-aware datetime to timezone-naive for PostgreSQL
     timestamp = status_obj.timestamp.replace(tzinfo=None) if status_obj.timestamp.tzinfo else status_obj.timestamp
     
-    async with pool.acquire() as conn:
-        await conn.execute('''
-            INSERT INTO status_checks (id, client_name, timestamp)
-            VALUES ($1, $2, $3)
-        ''', status_obj.id, status_obj.client_name, timestamp)
+    try:
+        await status_buffer.add((status_obj.id, status_obj.client_name, timestamp))
+    except BufferFull:
+        raise HTTPException(status_code=503, detail="Too many status checks, retry later", headers={"Retry-After": "1"})
     
     return status_obj
 
+# Only this recent window is listed, so the query touches the newest partitions
+STATUS_CHECK_WINDOW = timedelta(days=7)
+
+
 @api_router.get("/status", response_model=List[StatusCheck])
 async def get_status_checks():
     pool = await get_pool()
+    since = datetime.now(timezone.utc).replace(tzinfo=None) - STATUS_CHECK_WINDOW
     
     async with pool.acquire() as conn:
-        status_checks = await conn.fetch("SELECT * FROM status_checks ORDER BY timestamp DESC LIMIT 1000")
+        status_checks = await conn.fetch(
+            "SELECT * FROM status_checks WHERE timestamp >= $1 ORDER BY timestamp DESC LIMIT 1000", since
+        )
     
     return [StatusCheck(**dict(check)) for check in status_checks]
 
 
 # Hotlines endpoint
+async def _coalesced_json(key: tuple, build) -> Response:
+    """Serve `build()`'s JSON, computed and serialized once for concurrent identical requests"""
+    async def render():
+        return json.dumps(
+            jsonable_encoder(await build()), ensure_ascii=False, separators=(",", ":")
+        ).encode()
+
+    return Response(content=await read_flights.do(key, render), media_type="application/json")
+
+
 @api_router.get("/hotlines")
 async def get_hotlines():
     """Get all emergency hotline numbers (from DB, with first-run seeding)."""
-    await _ensure_hotlines_seeded()
-    
-    pool = await get_pool()
-    async with pool.acquire() as conn:
-        hotlines = await conn.fetch("SELECT * FROM hotlines")
-    
-    return {"hotlines": records_to_list(hotlines)}
+    async def build():
+        await _ensure_hotlines_seeded()
+        
+        pool = await get_pool()
+        async with pool.acquire() as conn:
+            hotlines = await conn.fetch("SELECT * FROM hotlines")
+        
+        return {"hotlines": records_to_list(hotlines)}
+
+    return await _coalesced_json(("hotlines",), build)
 
 
 # Incident Report endpoints
@@ -976,15 +1675,20 @@ async def create_incident_report(input: IncidentReportCreate):
     
     pool = await get_pool()
     async with pool.acquire() as conn:
-        await conn.execute('''
-            INSERT INTO incidents (id, incident_type, date, time, latitude, longitude, 
-                                  description, reporter_phone, images, internal_notes, status, created_at)
-            VALUES ($1, $2, $3, $4, $5, $6, $7, $8, $9, $10, $11, $12)
-        ''', doc['id'], doc['incident_type'], doc['date'], doc['time'],
-           doc['latitude'], doc['longitude'], doc['description'], doc['reporter_phone'],
-           doc['images'], doc['internal_notes'], doc['status'], created_at)
-        
-        incident = await conn.fetchrow("SELECT * FROM incidents WHERE id = $1", doc['id'])
+        async with conn.transaction():
+            await conn.execute('''
+                INSERT INTO incidents (id, incident_type, date, time, latitude, longitude, 
+                                      description, reporter_phone, images, internal_notes, status, barangay,
+                                      geohash, created_at)
+                VALUES ($1, $2, $3, $4, $5, $6, $7, $8, $9, $10, $11, $12, $13, $14)
+            ''', doc['id'], doc['incident_type'], doc['date'], doc['time'],
+               doc['latitude'], doc['longitude'], doc['description'], doc['reporter_phone'],
+               doc['images'], doc['internal_notes'], doc['status'], doc['barangay'], doc['geohash'], created_at)
+            
+            incident = await conn.fetchrow("SELECT * FROM incidents WHERE id = $1", doc['id'])
+            await publish_incident_event(conn, "created", dict(incident))
+            if input.images:
+                await enqueue(conn, "incident.process_images", {"incident_id": doc['id']})
     
     incident_dict = dict(incident)
     # Parse JSON images field
@@ -994,12 +1698,31 @@ async def create_incident_report(input: IncidentReportCreate):
     return IncidentReport(**incident_dict)
 
 @api_router.get("/incidents")
-async def get_incidents():
-    """Get all incident reports"""
+async def get_incidents(
+    status: Optional[str] = None,
+    barangay: Optional[str] = None,
+    incident_type: Optional[str] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    bbox: Optional[str] = None,
+):
+    """Get the latest 100 incident reports, optionally filtered like the admin list.
+
+    The admin-only text search (`q`, which matches reporter phone numbers) is
+    not offered here.
+    """
+    filters = _incident_filter_params(
+        status=status, barangay=barangay, incident_type=incident_type, since=since, until=until, bbox=bbox
+    )
+    conditions, params = _incident_filters(**filters)
+    query = "SELECT * FROM incidents"
+    if conditions:
+        query += " WHERE " + " AND ".join(conditions)
+    query += " ORDER BY created_at DESC LIMIT 100"
     pool = await get_pool()
     
     async with pool.acquire() as conn:
-        incidents = await conn.fetch("SELECT * FROM incidents ORDER BY created_at DESC LIMIT 100")
+        incidents = await conn.fetch(query, *params)
     
     incidents_list = []
     for incident in incidents:
@@ -1012,118 +1735,331 @@ async def get_incidents():
     return {"incidents": incidents_list}
 
 
-# Typhoon Dashboard endpoint
+# Typhoon Dashboard endpoints
+async def _load_typhoon_bulletin():
+    pool = await get_pool()
+    async with pool.acquire() as conn:
+        return await latest_bulletin(conn)
+
+
+# Bulletins are ingested by the scheduler leader; requests only read this snapshot
+typhoon_snapshot = BulletinSnapshot(_load_typhoon_bulletin)
+# Affected areas per (bulletin, reference data version)
+typhoon_impacts = ImpactCache()
+
+
+async def _current_typhoon_bulletin():
+    bulletin, _ = await typhoon_snapshot.get()
+    return bulletin_to_api(bulletin) if bulletin else {"active": False}
+
+
 @api_router.get("/typhoon/current")
 async def get_current_typhoon():
-    """Get current typhoon monitoring data"""
-    # Mock data for demo - in production, this would fetch from PAGASA API
-    typhoon_data = {
-        "name": "Typhoon CARINA",
-        "localName": "Gaemi",
-        "position": "15.2°N, 120.5°E",
-        "maxWindSpeed": "185 km/h",
-        "movement": "West at 15 km/h",
-        "intensity": "Severe Tropical Storm",
-        "pressure": "960 hPa",
-        "lastUpdate": datetime.now(timezone.utc).strftime("%b %d, %Y, %I:%M %p"),
-        "satelliteImageUrl": "https://src.meteopilipinas.gov.ph/repo/mtsat-colored/24hour/latest-him-colored.gif",
-        "forecast": [
-            {"time": "24h", "position": "16.0°N, 119.0°E", "intensity": "Typhoon"},
-            {"time": "48h", "position": "17.5°N, 117.5°E", "intensity": "Typhoon"},
-            {"time": "72h", "position": "19.0°N, 116.0°E", "intensity": "Severe Tropical Storm"},
-        ],
-        "warnings": [
-            "Signal No. 2 raised over Albay",
-            "Heavy rainfall expected in Bicol Region",
-            "Storm surge warning for coastal areas"
-        ]
-    }
-    return typhoon_data
+    """Latest ingested typhoon bulletin.
+
+    Served from this worker's in-memory snapshot: a stale snapshot is returned
+    immediately while it reloads in the background. `snapshotAgeSeconds` and
+    the Age header say how old the copy is.
+    """
+    async def build():
+        bulletin, age = await typhoon_snapshot.get()
+        return {
+            **(bulletin_to_api(bulletin) if bulletin else {"active": False}),
+            "snapshotAgeSeconds": round(age or 0, 1),
+            "stale": (age or 0) > typhoon_snapshot.fresh_for,
+        }
+
+    response = await _coalesced_json(("typhoon/current",), build)
+    response.headers["Age"] = str(int(typhoon_snapshot.age() or 0))
+    response.headers["Cache-Control"] = (
+        f"public, max-age={typhoon_snapshot.fresh_for}, "
+        f"stale-while-revalidate={typhoon_snapshot.max_stale}"
+    )
+    return response
+
+
+@api_router.get("/typhoon/impact")
+async def get_typhoon_impact():
+    """Barangays and facilities inside the wind radii or forecast cone.
+
+    Includes the hourly interpolated track and the zone polygons as GeoJSON.
+    Computed once per bulletin and reference data version.
+    """
+    async def build():
+        bulletin, _ = await typhoon_snapshot.get()
+        if bulletin is None:
+            return {"active": False}
+
+        await _ensure_locations_seeded()
+        pool = await get_pool()
+        async with pool.acquire() as conn:
+            key = (bulletin["bulletin_id"], await high_water_mark(conn))
+            impact = typhoon_impacts.get(key)
+            if impact is None:
+                locations = records_to_list(
+                    await conn.fetch("SELECT id, type, name, lat, lng FROM map_locations ORDER BY id")
+                )
+        if impact is None:
+            impact = await asyncio.to_thread(
+                lambda: compute_impact(bulletin, load_barangays(), locations)
+            )
+            typhoon_impacts.put(key, impact)
+        return {"active": True, **impact}
+
+    return await _coalesced_json(("typhoon/impact",), build)
+
+
+@api_router.get("/typhoon/history")
+async def get_typhoon_history(limit: int = 20):
+    """Most recent ingested bulletins, newest first"""
+    limit = max(1, min(limit, 100))
+    pool = await get_pool()
+    async with pool.acquire() as conn:
+        bulletins = await bulletin_history(conn, limit)
+    return {"bulletins": [bulletin_to_api(bulletin) for bulletin in bulletins]}
 
 
 # Map Locations endpoint
 @api_router.get("/map/locations")
 async def get_map_locations(location_type: Optional[str] = None):
     """Get all facility locations for the map (from DB, with first-run seeding)"""
-    await _ensure_locations_seeded()
-    
-    pool = await get_pool()
-    async with pool.acquire() as conn:
-        if location_type:
-            locations = await conn.fetch(
-                "SELECT * FROM map_locations WHERE type = $1 ORDER BY id",
-                location_type
-            )
-        else:
-            locations = await conn.fetch("SELECT * FROM map_locations ORDER BY id")
-    
-    return {"locations": records_to_list(locations)}
+    async def build():
+        await _ensure_locations_seeded()
+        
+        pool = await get_pool()
+        async with pool.acquire() as conn:
+            if location_type:
+                locations = await conn.fetch(
+                    "SELECT * FROM map_locations WHERE type = $1 ORDER BY id",
+                    location_type
+                )
+            else:
+                locations = await conn.fetch("SELECT * FROM map_locations ORDER BY id")
+        
+        return {"locations": records_to_list(locations)}
+
+    return await _coalesced_json(("map/locations", location_type), build)
+
+
+# Hazard map layers; tiles of a given layer version never change
+HAZARD_TILE_MAX_AGE = 365 * 24 * 3600
+HAZARD_TILE_UNVERSIONED_MAX_AGE = 3600
+
+
+@api_router.get("/hazards")
+async def get_hazard_layers():
+    """Available hazard layers with their current version, levels and bounds"""
+    return {"layers": [layer.describe() for layer in load_hazard_layers().values()]}
+
+
+@api_router.get("/hazards/at")
+async def get_hazards_at(lat: float, lon: float):
+    """Hazard zones of every layer that contain the point"""
+    if not (-90 <= lat <= 90 and -180 <= lon <= 180):
+        raise HTTPException(status_code=400, detail="lat/lon out of range")
+    zones = [zone for layer in load_hazard_layers().values() for zone in layer.zones_at(lat, lon)]
+    return {"lat": lat, "lon": lon, "zones": zones}
+
+
+@api_router.get("/hazards/{layer}/{z}/{x}/{y}")
+async def get_hazard_tile(request: Request, layer: str, z: int, x: int, y: int, v: Optional[str] = None):
+    """GeoJSON zones of one layer overlapping a z/x/y tile, simplified for that zoom.
+
+    Pass the layer version from /api/hazards as `v`: versioned tile URLs are
+    cacheable for a year, since a new hazard map gets a new version.
+    """
+    hazard_layer = load_hazard_layers().get(layer)
+    if hazard_layer is None:
+        raise HTTPException(status_code=404, detail="Hazard layer not found")
+    if not valid_tile(z, x, y):
+        raise HTTPException(status_code=400, detail="Invalid tile coordinates")
+
+    max_age = HAZARD_TILE_MAX_AGE if v == hazard_layer.version else HAZARD_TILE_UNVERSIONED_MAX_AGE
+    headers = {
+        "ETag": f'"{hazard_layer.version}"',
+        "Cache-Control": f"public, max-age={max_age}" + (", immutable" if v == hazard_layer.version else ""),
+    }
+    if etag_matches(request.headers.get("if-none-match"), headers["ETag"]):
+        return Response(status_code=304, headers=headers)
+    body = await asyncio.to_thread(tile_json, layer, hazard_layer.version, z, x, y)
+    return Response(content=body, media_type="application/geo+json", headers=headers)
 
 
 
 # Go Bag Checklist endpoint
+# Static payloads; compressed once at startup and served as cached bytes
+DEFAULT_CHECKLIST = [
+    {"id": 1, "category": "Documents", "item": "Valid IDs (Photocopy)", "essential": True},
+    {"id": 2, "category": "Documents", "item": "Insurance documents", "essential": True},
+    {"id": 3, "category": "Documents", "item": "Emergency contact list", "essential": True},
+    {"id": 4, "category": "Documents", "item": "Medical records/prescriptions", "essential": True},
+    {"id": 5, "category": "Water & Food", "item": "Drinking water (3 liters/person)", "essential": True},
+    {"id": 6, "category": "Water & Food", "item": "Canned goods (3-day supply)", "essential": True},
+    {"id": 7, "category": "Water & Food", "item": "Ready-to-eat food", "essential": True},
+    {"id": 8, "category": "Water & Food", "item": "Can opener", "essential": False},
+    {"id": 9, "category": "First Aid", "item": "First aid kit", "essential": True},
+    {"id": 10, "category": "First Aid", "item": "Prescription medications", "essential": True},
+    {"id": 11, "category": "First Aid", "item": "Pain relievers", "essential": False},
+    {"id": 12, "category": "First Aid", "item": "Bandages and antiseptic", "essential": False},
+    {"id": 13, "category": "Tools & Safety", "item": "Flashlight with extra batteries", "essential": True},
+    {"id": 14, "category": "Tools & Safety", "item": "Battery-powered radio", "essential": True},
+    {"id": 15, "category": "Tools & Safety", "item": "Whistle (for signaling)", "essential": True},
+    {"id": 16, "category": "Tools & Safety", "item": "Multi-tool or knife", "essential": False},
+    {"id": 17, "category": "Clothing", "item": "Change of clothes", "essential": True},
+    {"id": 18, "category": "Clothing", "item": "Rain gear/poncho", "essential": True},
+    {"id": 19, "category": "Clothing", "item": "Sturdy shoes", "essential": True},
+    {"id": 20, "category": "Clothing", "item": "Blanket or sleeping bag", "essential": False},
+    {"id": 21, "category": "Communication", "item": "Fully charged power bank", "essential": True},
+    {"id": 22, "category": "Communication", "item": "Phone charger", "essential": True},
+    {"id": 23, "category": "Communication", "item": "Emergency cash (small bills)", "essential": True},
+    {"id": 24, "category": "Hygiene", "item": "Toothbrush and toothpaste", "essential": False},
+    {"id": 25, "category": "Hygiene", "item": "Soap and hand sanitizer", "essential": True},
+    {"id": 26, "category": "Hygiene", "item": "Toilet paper", "essential": False},
+    {"id": 27, "category": "Hygiene", "item": "Face masks", "essential": True},
+]
+
+SUPPORT_RESOURCES = {
+    "government_agencies": [
+        {"name": "NDRRMC", "description": "National Disaster Risk Reduction and Management Council", "link": "https://ndrrmc.gov.ph"},
+        {"name": "PAGASA", "description": "Philippine weather forecasts and warnings", "link": "https://bagong.pagasa.dost.gov.ph"},
+        {"name": "PHIVOLCS", "description": "Volcanic and seismic monitoring", "link": "https://phivolcs.dost.gov.ph"},
+        {"name": "OCD Region V", "description": "Office of Civil Defense Bicol Region", "link": "https://ocd.gov.ph"},
+    ],
+    "emergency_assistance": [
+        {"name": "Philippine Red Cross", "description": "Disaster relief and blood services", "phone": "143"},
+        {"name": "DSWD Hotline", "description": "Social welfare assistance", "phone": "8931-8101"},
+        {"name": "DOH Health Emergency", "description": "24/7 health assistance", "phone": "1555"},
+    ],
+    "local_resources": [
+        {"name": "MDRRMO Pio Duran", "description": "Municipal Disaster Risk Reduction", "address": "Municipal Hall, Poblacion"},
+        {"name": "Pio Duran Municipal Hall", "description": "Local government services", "address": "Poblacion, Pio Duran, Albay"},
+    ]
+}
+
+CHECKLIST_PAYLOAD = PrecompressedJSON({"checklist": DEFAULT_CHECKLIST})
+RESOURCES_PAYLOAD = PrecompressedJSON(SUPPORT_RESOURCES)
+
+
+def _precompressed_response(request: Request, payload: PrecompressedJSON) -> Response:
+    status_code, headers, body = payload.response_parts(
+        request.headers.get("accept-encoding"), request.headers.get("if-none-match")
+    )
+    return Response(content=body, status_code=status_code, headers=headers)
+
+
 @api_router.get("/checklist")
-async def get_checklist():
+async def get_checklist(request: Request):
     """Get default Go Bag checklist items"""
-    checklist = [
-        {"id": 1, "category": "Documents", "item": "Valid IDs (Photocopy)", "essential": True},
-        {"id": 2, "category": "Documents", "item": "Insurance documents", "essential": True},
-        {"id": 3, "category": "Documents", "item": "Emergency contact list", "essential": True},
-        {"id": 4, "category": "Documents", "item": "Medical records/prescriptions", "essential": True},
-        {"id": 5, "category": "Water & Food", "item": "Drinking water (3 liters/person)", "essential": True},
-        {"id": 6, "category": "Water & Food", "item": "Canned goods (3-day supply)", "essential": True},
-        {"id": 7, "category": "Water & Food", "item": "Ready-to-eat food", "essential": True},
-        {"id": 8, "category": "Water & Food", "item": "Can opener", "essential": False},
-        {"id": 9, "category": "First Aid", "item": "First aid kit", "essential": True},
-        {"id": 10, "category": "First Aid", "item": "Prescription medications", "essential": True},
-        {"id": 11, "category": "First Aid", "item": "Pain relievers", "essential": False},
-        {"id": 12, "category": "First Aid", "item": "Bandages and antiseptic", "essential": False},
-        {"id": 13, "category": "Tools & Safety", "item": "Flashlight with extra batteries", "essential": True},
-        {"id": 14, "category": "Tools & Safety", "item": "Battery-powered radio", "essential": True},
-        {"id": 15, "category": "Tools & Safety", "item": "Whistle (for signaling)", "essential": True},
-        {"id": 16, "category": "Tools & Safety", "item": "Multi-tool or knife", "essential": False},
-        {"id": 17, "category": "Clothing", "item": "Change of clothes", "essential": True},
-        {"id": 18, "category": "Clothing", "item": "Rain gear/poncho", "essential": True},
-        {"id": 19, "category": "Clothing", "item": "Sturdy shoes", "essential": True},
-        {"id": 20, "category": "Clothing", "item": "Blanket or sleeping bag", "essential": False},
-        {"id": 21, "category": "Communication", "item": "Fully charged power bank", "essential": True},
-        {"id": 22, "category": "Communication", "item": "Phone charger", "essential": True},
-        {"id": 23, "category": "Communication", "item": "Emergency cash (small bills)", "essential": True},
-        {"id": 24, "category": "Hygiene", "item": "Toothbrush and toothpaste", "essential": False},
-        {"id": 25, "category": "Hygiene", "item": "Soap and hand sanitizer", "essential": True},
-        {"id": 26, "category": "Hygiene", "item": "Toilet paper", "essential": False},
-        {"id": 27, "category": "Hygiene", "item": "Face masks", "essential": True},
-    ]
-    return {"checklist": checklist}
+    return _precompressed_response(request, CHECKLIST_PAYLOAD)
 
 
 # Support Resources endpoint
 @api_router.get("/resources")
-async def get_resources():
+async def get_resources(request: Request):
     """Get support resources and information"""
-    resources = {
-        "government_agencies": [
-            {"name": "NDRRMC", "description": "National Disaster Risk Reduction and Management Council", "link": "https://ndrrmc.gov.ph"},
-            {"name": "PAGASA", "description": "Philippine weather forecasts and warnings", "link": "https://bagong.pagasa.dost.gov.ph"},
-            {"name": "PHIVOLCS", "description": "Volcanic and seismic monitoring", "link": "https://phivolcs.dost.gov.ph"},
-            {"name": "OCD Region V", "description": "Office of Civil Defense Bicol Region", "link": "https://ocd.gov.ph"},
-        ],
-        "emergency_assistance": [
-            {"name": "Philippine Red Cross", "description": "Disaster relief and blood services", "phone": "143"},
-            {"name": "DSWD Hotline", "description": "Social welfare assistance", "phone": "8931-8101"},
-            {"name": "DOH Health Emergency", "description": "24/7 health assistance", "phone": "1555"},
-        ],
-        "local_resources": [
-            {"name": "MDRRMO Pio Duran", "description": "Municipal Disaster Risk Reduction", "address": "Municipal Hall, Poblacion"},
-            {"name": "Pio Duran Municipal Hall", "description": "Local government services", "address": "Poblacion, Pio Duran, Albay"},
-        ]
+    return _precompressed_response(request, RESOURCES_PAYLOAD)
+
+
+# ============ OFFLINE PACK ============
+
+def _section_hash(payload) -> str:
+    canonical = json.dumps(payload, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(canonical.encode()).hexdigest()[:16]
+
+
+async def _offline_pack_sections() -> dict:
+    """Offline data by section, each shaped like the response of its own endpoint"""
+    await _ensure_hotlines_seeded()
+    await _ensure_locations_seeded()
+
+    pool = await get_pool()
+    async with pool.acquire() as conn:
+        hotlines = await conn.fetch("SELECT * FROM hotlines")
+        locations = await conn.fetch("SELECT * FROM map_locations ORDER BY id")
+
+    return jsonable_encoder({
+        "hotlines": {"hotlines": records_to_list(hotlines)},
+        "locations": {"locations": records_to_list(locations)},
+        "checklist": {"checklist": DEFAULT_CHECKLIST},
+        "resources": SUPPORT_RESOURCES,
+        "typhoon": await _current_typhoon_bulletin(),
+    })
+
+
+@api_router.get("/offline-pack")
+async def get_offline_pack(request: Request, have: Optional[str] = None):
+    """Everything the app needs offline as one versioned bundle.
+
+    The manifest maps each section to a content hash. Clients pass the hashes
+    they already hold as `have=hotlines:<hash>,checklist:<hash>` and only
+    receive the sections that changed; an up-to-date If-None-Match gets 304.
+    """
+    sections = await _offline_pack_sections()
+    manifest = {name: _section_hash(data) for name, data in sections.items()}
+    version = _section_hash(manifest)
+    headers = {"ETag": f'"{version}"', "Cache-Control": "no-cache"}
+    if etag_matches(request.headers.get("if-none-match"), headers["ETag"]):
+        return Response(status_code=304, headers=headers)
+
+    known = dict(item.split(":", 1) for item in (have or "").split(",") if ":" in item)
+    changed = {name: data for name, data in sections.items() if known.get(name) != manifest[name]}
+    return JSONResponse({"version": version, "manifest": manifest, "sections": changed}, headers=headers)
+
+
+# ============ REFERENCE DATA SYNC ============
+
+@api_router.get("/sync")
+async def sync_reference_data(since: int = 0):
+    """Changes to hotlines and map locations after sequence number `since`.
+
+    Returns the ordered inserts, updates and deletes plus the new high-water
+    mark to pass as `since` next time (`has_more` asks for another page). When
+    the log was compacted past `since`, or on first sync, a full snapshot of
+    both tables is returned instead.
+    """
+    await _ensure_hotlines_seeded()
+    await _ensure_locations_seeded()
+
+    pool = await get_pool()
+    async with pool.acquire() as conn:
+        # One snapshot, so the high-water mark matches the rows returned
+        async with conn.transaction(isolation="repeatable_read", readonly=True):
+            changes = await changes_since(conn, since) if since > 0 else None
+            if changes is not None:
+                has_more = len(changes) == MAX_CHANGES_PER_PAGE
+                high_water = changes[-1]["seq"] if changes else since
+                return {"snapshot": False, "since": since, "high_water": high_water,
+                        "has_more": has_more, "changes": changes}
+
+            high_water = await high_water_mark(conn)
+            hotlines = await conn.fetch("SELECT * FROM hotlines")
+            locations = await conn.fetch("SELECT * FROM map_locations ORDER BY id")
+    return {
+        "snapshot": True,
+        "since": since,
+        "high_water": high_water,
+        "has_more": False,
+        "hotlines": records_to_list(hotlines),
+        "map_locations": records_to_list(locations),
     }
-    return resources
 
 
 # Include the router in the main app
 app.include_router(api_router)
 
+# Incident payloads are mostly base64 images: compress them fast, not hard
+app.add_middleware(
+    CompressionMiddleware,
+    minimum_size=1024,
+    route_levels={
+        "/api/incidents": FAST,
+        "/api/admin/incidents": FAST,
+    },
+)
+
+# Clients may gzip (or brotli) large uploads such as incident reports
+app.add_middleware(DecompressionMiddleware)
+
 app.add_middleware(
     CORSMiddleware,
     allow_credentials=True,
@@ -1141,12 +2077,30 @@ logger = logging.getLogger(__name__)
 
 @app.on_event("startup")
 async def startup_db_client():
-    """Initialize database connection pool"""
-    await get_pool()
+    """Initialize database connection pool and apply schema upgrades"""
+    pool = await get_pool()
     logger.info("Database connection pool initialized")
+    async with pool.acquire() as conn:
+        await ensure_schema(conn)
+        logger.info("Database schema up to date")
+        if await tasks.queue_location_tagging(conn):
+            logger.info("Queued location tagging of untagged incidents")
+    await asyncio.to_thread(barangay_index)
+    await asyncio.to_thread(load_hazard_layers)
+    await incident_feed.start()
+    try:
+        # The first poll tick is TYPHOON_POLL_SECONDS away; have a bulletin before then
+        await tasks.ingest_typhoon_bulletin()
+    except Exception:
+        logger.exception("Initial typhoon bulletin ingest failed")
+    await scheduler.start()
+    await status_buffer.start()
 
 @app.on_event("shutdown")
 async def shutdown_db_client():
     """Close database connection pool"""
+    await status_buffer.stop()
+    await scheduler.stop()
+    await incident_feed.stop()
     await close_pool()
     logger.info("Database connection pool closed")
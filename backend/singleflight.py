@@ -0,0 +1,32 @@
+"""
+Request coalescing (single-flight) for identical concurrent reads
+
+When many clients ask for the same thing at once (a bulletin goes out and every
+phone refreshes), only the first caller per key runs the computation; callers
+arriving while it is in flight await the same result. Nothing is cached once
+the computation finishes, so results are never staler than one round of work.
+"""
+import asyncio
+
+
+class SingleFlight:
+    """Deduplicates concurrent calls by key within one worker"""
+
+    def __init__(self):
+        self._inflight = {}
+
+    async def do(self, key, fn):
+        """Return the result of `fn()` (a coroutine function), shared by concurrent callers of `key`"""
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(fn())
+            self._inflight[key] = task
+            task.add_done_callback(lambda done: self._forget(key, done))
+        # A caller that disconnects must not cancel the work others are waiting for
+        return await asyncio.shield(task)
+
+    def _forget(self, key, task):
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        if not task.cancelled():
+            task.exception()  # mark retrieved when every waiter went away
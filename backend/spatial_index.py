@@ -0,0 +1,127 @@
+"""
+In-memory point-in-polygon indexes of barangay boundaries and hazard zones
+
+Polygons (barangays.py, hazard_layers.py) are bucketed into a regular lon/lat
+grid by their bounding boxes. A lookup only tests the polygons registered in
+the point's cell, and the ray-casting test runs over all edges of a ring at
+once with NumPy. BarangayIndex.locate_many() tags whole batches: each polygon
+is tested against all points inside its bounding box in one vectorized pass.
+
+Points outside every barangay (or every point, when no boundary file is
+available) map to None.
+"""
+import numpy as np
+
+from barangays import load_barangays
+
+
+GRID_CELL_DEGREES = 0.01  # about 1.1 km
+# Upper bound of the points x edges matrices, so detailed boundaries stay in memory
+MAX_MATRIX_CELLS = 1_000_000
+
+
+def points_in_ring(xs, ys, ring):
+    """Even-odd ray casting of points (xs, ys) against one closed ring"""
+    step = max(1, MAX_MATRIX_CELLS // max(len(ring) - 1, 1))
+    if len(xs) > step:
+        return np.concatenate([
+            points_in_ring(xs[start:start + step], ys[start:start + step], ring)
+            for start in range(0, len(xs), step)
+        ])
+    x1, y1 = ring[:-1, 0], ring[:-1, 1]
+    x2, y2 = ring[1:, 0], ring[1:, 1]
+    xs, ys = xs[:, None], ys[:, None]
+    straddles = (y1 > ys) != (y2 > ys)
+    # Horizontal edges never straddle; the substituted 1 only avoids dividing by 0
+    dy = np.where(y2 == y1, 1.0, y2 - y1)
+    crossing_x = x1 + (ys - y1) * (x2 - x1) / dy
+    return (straddles & (xs < crossing_x)).sum(axis=1) % 2 == 1
+
+
+def points_in_polygons(xs, ys, polygons):
+    """Points inside any of the polygons (outer ring minus holes)"""
+    inside = np.zeros(len(xs), dtype=bool)
+    for outer, *holes in polygons:
+        hit = points_in_ring(xs, ys, outer)
+        for hole in holes:
+            hit &= ~points_in_ring(xs, ys, hole)
+        inside |= hit
+    return inside
+
+
+class PolygonIndex:
+    """Grid-bucketed lookup of the entries (dicts with 'polygons') containing a point"""
+
+    def __init__(self, entries, cell=GRID_CELL_DEGREES):
+        self.cell = cell
+        self.entries = [entry for entry in entries if entry['polygons']]
+        self.grid = {}
+        boxes = []
+        for number, entry in enumerate(self.entries):
+            points = np.concatenate([rings[0] for rings in entry['polygons']])
+            box = (*points.min(axis=0), *points.max(axis=0))  # lon_min, lat_min, lon_max, lat_max
+            boxes.append(box)
+            for cx in range(self._cell(box[0]), self._cell(box[2]) + 1):
+                for cy in range(self._cell(box[1]), self._cell(box[3]) + 1):
+                    self.grid.setdefault((cx, cy), []).append(number)
+        self.boxes = np.array(boxes, dtype=float).reshape(-1, 4)
+
+    def __len__(self):
+        return len(self.entries)
+
+    def _cell(self, degrees):
+        return int(np.floor(degrees / self.cell))
+
+    def containing(self, lat, lon):
+        """Entries whose polygons contain the point, in index order"""
+        if lat is None or lon is None:
+            return []
+        xs, ys = np.array([lon], dtype=float), np.array([lat], dtype=float)
+        return [
+            self.entries[number]
+            for number in self.grid.get((self._cell(lon), self._cell(lat)), ())
+            if points_in_polygons(xs, ys, self.entries[number]['polygons'])[0]
+        ]
+
+    def intersecting(self, lon_min, lat_min, lon_max, lat_max):
+        """Numbers of the entries whose bounding boxes overlap the box"""
+        boxes = self.boxes
+        return np.flatnonzero(
+            (boxes[:, 0] <= lon_max) & (boxes[:, 2] >= lon_min) & (boxes[:, 1] <= lat_max) & (boxes[:, 3] >= lat_min)
+        ).tolist()
+
+
+class BarangayIndex(PolygonIndex):
+    """Lookup of the barangay containing a point"""
+
+    def locate(self, lat, lon):
+        """Name of the barangay containing the point, or None"""
+        found = self.containing(lat, lon)
+        return found[0]['name'] if found else None
+
+    def locate_many(self, lats, lons):
+        """Barangay names (or None) for arrays of points"""
+        xs, ys = np.asarray(lons, dtype=float), np.asarray(lats, dtype=float)
+        names = np.full(len(xs), None, dtype=object)
+        pending = np.ones(len(xs), dtype=bool)
+        for number, (lon_min, lat_min, lon_max, lat_max) in enumerate(self.boxes):
+            candidates = np.flatnonzero(
+                pending & (xs >= lon_min) & (xs <= lon_max) & (ys >= lat_min) & (ys <= lat_max)
+            )
+            if not len(candidates):
+                continue
+            inside = points_in_polygons(xs[candidates], ys[candidates], self.entries[number]['polygons'])
+            names[candidates[inside]] = self.entries[number]['name']
+            pending[candidates[inside]] = False
+        return names.tolist()
+
+
+_index = None
+
+
+def barangay_index():
+    """Process-wide index over the configured boundary file, built on first use"""
+    global _index
+    if _index is None:
+        _index = BarangayIndex(load_barangays())
+    return _index
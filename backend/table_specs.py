@@ -0,0 +1,202 @@
+"""
+Column specifications shared by the MongoDB -> PostgreSQL tooling
+
+Each spec describes how a MongoDB document maps onto a PostgreSQL row, so the
+migration, verification and replication scripts agree on column order, defaults
+and value conversion.
+
+A timestamp column missing from a document falls back to the creation time
+encoded in the document's ObjectId, so every script derives the same value and
+it does not change when the document is replicated again. Documents without an
+ObjectId get the current time, as the original migration did.
+"""
+import json
+from datetime import datetime, timezone
+
+
+# Ordered (column, type) pairs per table; the first column is the primary key
+TABLE_SPECS = {
+    'users': {
+        'columns': [
+            ('id', 'text'),
+            ('email', 'text'),
+            ('password', 'text'),
+            ('full_name', 'text'),
+            ('phone', 'text'),
+            ('is_admin', 'bool'),
+            ('created_at', 'timestamp'),
+        ],
+        'defaults': {'is_admin': False},
+    },
+    'incidents': {
+        'columns': [
+            ('id', 'text'),
+            ('incident_type', 'text'),
+            ('date', 'text'),
+            ('time', 'text'),
+            ('latitude', 'float'),
+            ('longitude', 'float'),
+            ('description', 'text'),
+            ('reporter_phone', 'text'),
+            ('images', 'json'),
+            ('internal_notes', 'text'),
+            ('status', 'text'),
+            ('created_at', 'timestamp'),
+        ],
+        'defaults': {'images': [], 'internal_notes': '', 'status': 'new'},
+    },
+    'hotlines': {
+        'columns': [
+            ('id', 'text'),
+            ('label', 'text'),
+            ('number', 'text'),
+            ('category', 'text'),
+        ],
+        'defaults': {},
+    },
+    'map_locations': {
+        'columns': [
+            ('id', 'int'),
+            ('type', 'text'),
+            ('name', 'text'),
+            ('address', 'text'),
+            ('lat', 'float'),
+            ('lng', 'float'),
+            ('capacity', 'text'),
+            ('services', 'text'),
+            ('hotline', 'text'),
+        ],
+        'defaults': {},
+    },
+    'emergency_plans': {
+        'columns': [
+            ('id', 'text'),
+            ('user_id', 'text'),
+            ('plan_data', 'json'),
+            ('updated_at', 'timestamp'),
+        ],
+        'defaults': {},
+    },
+    'checklists': {
+        'columns': [
+            ('id', 'text'),
+            ('user_id', 'text'),
+            ('checklist_data', 'json'),
+            ('updated_at', 'timestamp'),
+        ],
+        'defaults': {},
+    },
+    'status_checks': {
+        'columns': [
+            ('id', 'text'),
+            ('client_name', 'text'),
+            ('timestamp', 'timestamp'),
+        ],
+        'defaults': {},
+    },
+}
+
+# Tables in foreign-key safe order (users first)
+TABLE_ORDER = [
+    'users',
+    'incidents',
+    'hotlines',
+    'map_locations',
+    'emergency_plans',
+    'checklists',
+    'status_checks',
+]
+
+
+def column_names(table):
+    """Return the ordered column names of a table"""
+    return [name for name, _ in TABLE_SPECS[table]['columns']]
+
+
+def parse_timestamp(value):
+    """Parse an ISO string or datetime into a naive UTC datetime"""
+    if value is None:
+        return None
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    if isinstance(value, datetime) and value.tzinfo:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+def _fallback_timestamp(doc):
+    generation_time = getattr(doc.get('_id'), 'generation_time', None)
+    moment = generation_time or datetime.now(timezone.utc)
+    return moment.astimezone(timezone.utc).replace(tzinfo=None)
+
+
+def _document_value(table, doc, column):
+    spec = TABLE_SPECS[table]
+    if column in doc:
+        return doc[column]
+    if column in spec['defaults']:
+        return spec['defaults'][column]
+    if dict(spec['columns'])[column] == 'timestamp':
+        return _fallback_timestamp(doc)
+    return None
+
+
+def to_pg_value(value, column_type):
+    """Convert a MongoDB value into the parameter asyncpg expects"""
+    if value is None:
+        return None
+    if column_type == 'float':
+        return float(value)
+    if column_type == 'int':
+        return int(value)
+    if column_type == 'bool':
+        return bool(value)
+    if column_type == 'timestamp':
+        return parse_timestamp(value)
+    if column_type == 'json':
+        return value if isinstance(value, str) else json.dumps(value)
+    return value
+
+
+def document_to_row(table, doc):
+    """Convert a MongoDB document into a tuple of PostgreSQL parameters"""
+    return tuple(
+        to_pg_value(_document_value(table, doc, name), column_type)
+        for name, column_type in TABLE_SPECS[table]['columns']
+    )
+
+
+def canonical_value(value, column_type):
+    """Render a value identically regardless of which database it came from"""
+    if value is None:
+        return None
+    if column_type == 'float':
+        return repr(float(value))
+    if column_type == 'int':
+        return int(value)
+    if column_type == 'bool':
+        return bool(value)
+    if column_type == 'timestamp':
+        # MongoDB keeps millisecond precision, PostgreSQL microseconds
+        ts = parse_timestamp(value)
+        return ts.replace(microsecond=ts.microsecond // 1000 * 1000).isoformat()
+    if column_type == 'json':
+        if isinstance(value, str):
+            value = json.loads(value)
+        return json.dumps(value, sort_keys=True, separators=(',', ':'), default=str)
+    return str(value)
+
+
+def canonical_row(table, row):
+    """Canonical JSON text of a row given as a dict keyed by column name"""
+    values = [
+        canonical_value(row.get(name), column_type)
+        for name, column_type in TABLE_SPECS[table]['columns']
+    ]
+    return json.dumps(values, separators=(',', ':'))
+
+
+def canonical_document(table, doc):
+    """Canonical JSON text of a MongoDB document after migration defaults"""
+    row = {name: _document_value(table, doc, name) for name in column_names(table)}
+    return canonical_row(table, row)
@@ -0,0 +1,203 @@
+"""
+Background job handlers and periodic tasks
+
+Job handlers are imported by job_worker.py and receive the job payload dict.
+Periodic tasks take no arguments and are registered with the scheduler in
+server.py.
+"""
+import asyncio
+import base64
+import hashlib
+import json
+from datetime import datetime, timezone, timedelta
+
+from database import get_pool
+from job_queue import job_handler, enqueue
+from partitions import maintain_partitions
+from image_archive import ARCHIVE_BATCH_SIZE, archive_images, find_archivable_incidents, is_archivable, parse_images
+from reference_changes import compact_changes
+from typhoon_feed import default_source, ingest_latest
+from spatial_index import barangay_index
+from geohash import encode_many as geohash_encode_many
+from schema import SCHEMA_LOCK_KEY
+
+
+def _image_metadata(data_url):
+    """Decoded size, MIME type and SHA-256 of a base64 data URL"""
+    header, _, encoded = data_url.partition(',')
+    raw = base64.b64decode(encoded)
+    mime = header[5:].split(';')[0] if header.startswith('data:') else None
+    return {'size': len(raw), 'mime': mime, 'sha256': hashlib.sha256(raw).hexdigest()}
+
+
+@job_handler('incident.process_images')
+async def process_incident_images(payload):
+    """Record decoded size, type and content hash of an incident's images"""
+    pool = await get_pool()
+    async with pool.acquire() as conn:
+        images = await conn.fetchval("SELECT images FROM incidents WHERE id = $1", payload['incident_id'])
+    if images is None:
+        return
+
+    images = json.loads(images) if isinstance(images, str) else images
+    original = json.dumps(images)
+    pending = [image for image in images if image.get('data') and not image.get('sha256')]
+    if not pending:
+        return
+    for image in pending:
+        image.update(await asyncio.to_thread(_image_metadata, image['data']))
+
+    # Same compare-and-set as archival: a concurrent edit wins and is not overwritten
+    async with pool.acquire() as conn:
+        result = await conn.execute(
+            "UPDATE incidents SET images = $2 WHERE id = $1 AND images = $3::jsonb",
+            payload['incident_id'], json.dumps(images), original
+        )
+    if result == 'UPDATE 0':
+        # Retried by the queue with backoff against the edited images
+        raise RuntimeError(f"Images of incident {payload['incident_id']} changed while processing")
+
+
+@job_handler('incident.archive_images')
+async def archive_incident_images(payload):
+    """Move a resolved incident's image payloads to the archive, leaving stubs"""
+    pool = await get_pool()
+    async with pool.acquire() as conn:
+        row = await conn.fetchrow(
+            "SELECT status, images FROM incidents WHERE id = $1", payload['incident_id']
+        )
+    if row is None or row['status'] != 'resolved':
+        return
+
+    images = parse_images(row['images'])
+    if not any(is_archivable(image) for image in images):
+        return
+    stubs = await asyncio.to_thread(archive_images, images)
+
+    # Only replace the images we archived; a concurrent edit wins and the next run retries
+    async with pool.acquire() as conn:
+        await conn.execute(
+            "UPDATE incidents SET images = $2 WHERE id = $1 AND images = $3::jsonb",
+            payload['incident_id'], json.dumps(stubs), json.dumps(images)
+        )
+
+
+@job_handler('incident.queue_archival')
+async def queue_image_archival(payload):
+    """Enqueue archival of one batch of incidents, then continue after it"""
+    pool = await get_pool()
+    async with pool.acquire() as conn:
+        async with conn.transaction():
+            incident_ids = await find_archivable_incidents(conn, after=payload.get('after', ''))
+            for incident_id in incident_ids:
+                await enqueue(conn, 'incident.archive_images', {'incident_id': incident_id})
+            if len(incident_ids) == ARCHIVE_BATCH_SIZE:
+                await enqueue(conn, 'incident.queue_archival', {'after': incident_ids[-1]})
+
+
+# Incidents per location tagging job; each job enqueues the next batch
+TAG_BATCH_SIZE = 1000
+
+
+def _location_tags(index, rows):
+    """Barangays and geohashes of a batch; barangays are kept without boundaries"""
+    lats = [row['latitude'] for row in rows]
+    lons = [row['longitude'] for row in rows]
+    names = index.locate_many(lats, lons) if len(index) else [row['barangay'] for row in rows]
+    return names, geohash_encode_many(lats, lons)
+
+
+@job_handler('incident.tag_locations')
+async def tag_incident_locations(payload):
+    """Tag one batch of incidents with barangay and geohash, then continue after it.
+
+    Untagged incidents only, unless `retag` is set (after the boundary file
+    changed). Batches are walked by id, so incidents outside every barangay are
+    not revisited within a run.
+    """
+    index = barangay_index()
+    retag = bool(payload.get('retag'))
+    pool = await get_pool()
+    async with pool.acquire() as conn:
+        rows = await conn.fetch('''
+            SELECT id, latitude, longitude, barangay FROM incidents
+            WHERE id > $1 AND ($2 OR geohash IS NULL OR ($3 AND barangay IS NULL))
+            ORDER BY id
+            LIMIT $4
+        ''', payload.get('after', ''), retag, len(index) > 0, TAG_BATCH_SIZE)
+        if not rows:
+            return
+
+        names, geohashes = await asyncio.to_thread(_location_tags, index, rows)
+        async with conn.transaction():
+            await conn.execute('''
+                UPDATE incidents SET barangay = tagged.barangay, geohash = tagged.geohash
+                FROM unnest($1::varchar[], $2::varchar[], $3::varchar[]) AS tagged (id, barangay, geohash)
+                WHERE incidents.id = tagged.id
+                  AND (incidents.barangay, incidents.geohash) IS DISTINCT FROM (tagged.barangay, tagged.geohash)
+            ''', [row['id'] for row in rows], names, geohashes)
+            if len(rows) == TAG_BATCH_SIZE:
+                await enqueue(conn, 'incident.tag_locations', {'after': rows[-1]['id'], 'retag': retag})
+
+
+async def queue_location_tagging(conn):
+    """Enqueue tagging at startup when incidents lack a geohash and none is pending; returns the job id"""
+    async with conn.transaction():
+        # Workers start together; the lock lets only the first one enqueue
+        await conn.execute('SELECT pg_advisory_xact_lock($1)', SCHEMA_LOCK_KEY)
+        needed = await conn.fetchval('''
+            SELECT EXISTS (SELECT 1 FROM incidents WHERE geohash IS NULL)
+               AND NOT EXISTS (
+                   SELECT 1 FROM jobs
+                   WHERE kind = 'incident.tag_locations' AND status IN ('queued', 'running')
+               )
+        ''')
+        if needed:
+            return await enqueue(conn, 'incident.tag_locations', {})
+    return None
+
+
+# ============ PERIODIC TASKS ============
+
+# Finished jobs are kept this long for inspection
+FINISHED_JOB_RETENTION = timedelta(days=7)
+
+
+async def purge_finished_jobs():
+    """Delete completed jobs past their retention; dead jobs are kept"""
+    cutoff = datetime.now(timezone.utc).replace(tzinfo=None) - FINISHED_JOB_RETENTION
+    pool = await get_pool()
+    async with pool.acquire() as conn:
+        await conn.execute("DELETE FROM jobs WHERE status = 'done' AND finished_at < $1", cutoff)
+
+
+async def maintain_time_partitions():
+    """Create upcoming monthly partitions and apply retention policies"""
+    pool = await get_pool()
+    async with pool.acquire() as conn:
+        await maintain_partitions(conn)
+
+
+async def schedule_image_archival():
+    """Start a pass over old resolved incidents that still hold images"""
+    pool = await get_pool()
+    async with pool.acquire() as conn:
+        await enqueue(conn, 'incident.queue_archival', {})
+
+
+async def compact_reference_changes():
+    """Trim the reference data change log; older clients resync from a snapshot"""
+    pool = await get_pool()
+    async with pool.acquire() as conn:
+        await compact_changes(conn)
+
+
+# One source per process, so the HTTP adapter keeps its ETag between polls
+typhoon_source = default_source()
+
+
+async def ingest_typhoon_bulletin():
+    """Poll the bulletin feed and store a new bulletin if one was issued"""
+    pool = await get_pool()
+    async with pool.acquire() as conn:
+        await ingest_latest(conn, typhoon_source)
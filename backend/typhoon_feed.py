@@ -0,0 +1,311 @@
+"""
+Typhoon bulletin ingestion and the per-worker bulletin snapshot
+
+The scheduler leader polls an upstream bulletin source (BulletinSource adapter)
+and stores every new bulletin in typhoon_bulletins, which keeps the history.
+Request handlers never touch the upstream: each worker serves the latest stored
+bulletin from an in-memory BulletinSnapshot with stale-while-revalidate
+semantics and reports how old the snapshot is.
+
+Sources:
+    HttpBulletinSource  JSON feed at TYPHOON_FEED_URL (see dev_typhoon_feed.py
+                        for a local stand-in server and the expected format)
+    MockBulletinSource  fixed demo bulletin, used when no feed is configured
+"""
+import asyncio
+import json
+import logging
+import os
+import time
+from abc import ABC, abstractmethod
+from datetime import datetime, timezone
+
+import requests
+
+
+TYPHOON_FEED_URL = os.environ.get('TYPHOON_FEED_URL')
+TYPHOON_POLL_SECONDS = int(os.environ.get('TYPHOON_POLL_SECONDS', 300))
+FEED_TIMEOUT_SECONDS = 10
+
+# Snapshot ages: fresh ones are served as is, stale ones are served while a
+# background reload runs, older ones make the request wait for the reload
+SNAPSHOT_FRESH_SECONDS = 30
+SNAPSHOT_MAX_STALE_SECONDS = 15 * 60
+
+logger = logging.getLogger(__name__)
+
+
+class BulletinParseError(ValueError):
+    """The upstream payload is not a usable bulletin"""
+
+
+def _utcnow():
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+def _parse_time(value):
+    try:
+        moment = datetime.fromisoformat(str(value).replace('Z', '+00:00'))
+    except ValueError:
+        raise BulletinParseError(f"Invalid timestamp {value!r}")
+    if moment.tzinfo:
+        moment = moment.astimezone(timezone.utc).replace(tzinfo=None)
+    return moment
+
+
+def _coordinate(point, key, low, high):
+    try:
+        value = float(point[key])
+    except (KeyError, TypeError, ValueError):
+        raise BulletinParseError(f"Missing or invalid {key}")
+    if not low <= value <= high:
+        raise BulletinParseError(f"{key} {value} out of range")
+    return value
+
+
+def _optional_number(value):
+    return None if value is None else float(value)
+
+
+def parse_bulletin(raw):
+    """Normalize an upstream bulletin payload; raises BulletinParseError"""
+    if not isinstance(raw, dict):
+        raise BulletinParseError("Bulletin must be a JSON object")
+    for field in ('id', 'name', 'issued_at', 'center'):
+        if not raw.get(field):
+            raise BulletinParseError(f"Bulletin has no {field}")
+
+    try:
+        forecast = []
+        for point in raw.get('forecast') or []:
+            forecast.append({
+                'hours': int(point.get('hours', 0)),
+                'lat': _coordinate(point, 'lat', -90, 90),
+                'lon': _coordinate(point, 'lon', -180, 180),
+                'intensity': point.get('intensity'),
+            })
+        forecast.sort(key=lambda point: point['hours'])
+
+        radii = raw.get('wind_radii_km') or {}
+        return {
+            'bulletin_id': str(raw['id']),
+            'name': raw['name'],
+            'local_name': raw.get('local_name'),
+            'issued_at': _parse_time(raw['issued_at']),
+            'lat': _coordinate(raw['center'], 'lat', -90, 90),
+            'lon': _coordinate(raw['center'], 'lon', -180, 180),
+            'max_wind_kph': raw.get('max_wind_kph'),
+            'movement': raw.get('movement'),
+            'intensity': raw.get('intensity'),
+            'pressure_hpa': raw.get('pressure_hpa'),
+            # Radii of damaging (storm-force) and gale-force winds around the center
+            'storm_radius_km': _optional_number(radii.get('storm')),
+            'gale_radius_km': _optional_number(radii.get('gale')),
+            'forecast': forecast,
+            'warnings': list(raw.get('warnings') or []),
+            'satellite_image_url': raw.get('satellite_image_url'),
+        }
+    except BulletinParseError:
+        raise
+    except (TypeError, ValueError, AttributeError) as e:
+        # Wrong types from the feed (say "hours": "soon" or a forecast that is not a list)
+        raise BulletinParseError(f"Malformed bulletin: {e}") from e
+
+
+class BulletinSource(ABC):
+    """Adapter interface for upstream bulletin feeds"""
+
+    name = 'base'
+
+    @abstractmethod
+    async def fetch_latest(self):
+        """Latest raw bulletin payload (a dict), or None when there is none"""
+
+
+class HttpBulletinSource(BulletinSource):
+    """JSON bulletin feed over HTTP; the blocking request runs in a thread"""
+
+    name = 'http'
+
+    def __init__(self, url, timeout=FEED_TIMEOUT_SECONDS):
+        self.url = url
+        self.timeout = timeout
+        self._etag = None
+        self._last = None
+
+    def _get(self):
+        headers = {'Accept': 'application/json'}
+        if self._etag:
+            headers['If-None-Match'] = self._etag
+        response = requests.get(self.url, headers=headers, timeout=self.timeout)
+        if response.status_code == 304:
+            return self._last
+        if response.status_code == 404:
+            return None
+        response.raise_for_status()
+        self._etag = response.headers.get('ETag')
+        self._last = response.json()
+        return self._last
+
+    async def fetch_latest(self):
+        return await asyncio.to_thread(self._get)
+
+
+class MockBulletinSource(BulletinSource):
+    """The demo bulletin the API used to build on every request"""
+
+    name = 'mock'
+
+    async def fetch_latest(self):
+        return {
+            'id': 'DEMO-CARINA-01',
+            'name': 'Typhoon CARINA',
+            'local_name': 'Gaemi',
+            'issued_at': '2024-07-23T03:00:00Z',
+            'center': {'lat': 15.2, 'lon': 120.5},
+            'max_wind_kph': 185,
+            'movement': 'West at 15 km/h',
+            'intensity': 'Severe Tropical Storm',
+            'pressure_hpa': 960,
+            'wind_radii_km': {'storm': 120, 'gale': 300},
+            'forecast': [
+                {'hours': 24, 'lat': 16.0, 'lon': 119.0, 'intensity': 'Typhoon'},
+                {'hours': 48, 'lat': 17.5, 'lon': 117.5, 'intensity': 'Typhoon'},
+                {'hours': 72, 'lat': 19.0, 'lon': 116.0, 'intensity': 'Severe Tropical Storm'},
+            ],
+            'warnings': [
+                'Signal No. 2 raised over Albay',
+                'Heavy rainfall expected in Bicol Region',
+                'Storm surge warning for coastal areas',
+            ],
+            'satellite_image_url': 'https://src.meteopilipinas.gov.ph/repo/mtsat-colored/24hour/latest-him-colored.gif',
+        }
+
+
+def default_source():
+    return HttpBulletinSource(TYPHOON_FEED_URL) if TYPHOON_FEED_URL else MockBulletinSource()
+
+
+async def store_bulletin(conn, bulletin, source_name):
+    """Insert a bulletin unless already stored; returns True when it is new"""
+    stored = await conn.fetchval('''
+        INSERT INTO typhoon_bulletins (bulletin_id, source, name, issued_at, data, fetched_at)
+        VALUES ($1, $2, $3, $4, $5, $6)
+        ON CONFLICT (bulletin_id) DO NOTHING
+        RETURNING bulletin_id
+    ''', bulletin['bulletin_id'], source_name, bulletin['name'], bulletin['issued_at'],
+        json.dumps(bulletin, default=str), _utcnow())
+    return stored is not None
+
+
+async def ingest_latest(conn, source):
+    """Fetch, parse and store the newest upstream bulletin; returns it if new"""
+    raw = await source.fetch_latest()
+    if raw is None:
+        return None
+    bulletin = parse_bulletin(raw)
+    if await store_bulletin(conn, bulletin, source.name):
+        logger.info("Stored typhoon bulletin %s (%s)", bulletin['bulletin_id'], bulletin['name'])
+        return bulletin
+    return None
+
+
+def _row_to_bulletin(row):
+    bulletin = json.loads(row['data']) if isinstance(row['data'], str) else dict(row['data'])
+    bulletin['issued_at'] = row['issued_at']
+    return bulletin
+
+
+async def latest_bulletin(conn):
+    row = await conn.fetchrow('SELECT issued_at, data FROM typhoon_bulletins ORDER BY issued_at DESC LIMIT 1')
+    return _row_to_bulletin(row) if row else None
+
+
+async def bulletin_history(conn, limit=20):
+    rows = await conn.fetch(
+        'SELECT issued_at, data FROM typhoon_bulletins ORDER BY issued_at DESC LIMIT $1', limit
+    )
+    return [_row_to_bulletin(row) for row in rows]
+
+
+def _position(lat, lon):
+    return f"{abs(lat):.1f}°{'N' if lat >= 0 else 'S'}, {abs(lon):.1f}°{'E' if lon >= 0 else 'W'}"
+
+
+def bulletin_to_api(bulletin):
+    """Shape of /api/typhoon/current: the display strings plus raw coordinates"""
+    issued_at = bulletin['issued_at']
+    if isinstance(issued_at, str):
+        issued_at = _parse_time(issued_at)
+    return {
+        "active": True,
+        "bulletinId": bulletin['bulletin_id'],
+        "name": bulletin['name'],
+        "localName": bulletin.get('local_name'),
+        "position": _position(bulletin['lat'], bulletin['lon']),
+        "center": {"lat": bulletin['lat'], "lon": bulletin['lon']},
+        "maxWindSpeed": f"{bulletin['max_wind_kph']} km/h" if bulletin.get('max_wind_kph') is not None else None,
+        "movement": bulletin.get('movement'),
+        "intensity": bulletin.get('intensity'),
+        "pressure": f"{bulletin['pressure_hpa']} hPa" if bulletin.get('pressure_hpa') is not None else None,
+        "issuedAt": issued_at.isoformat() + 'Z',
+        "lastUpdate": issued_at.strftime("%b %d, %Y, %I:%M %p"),
+        "satelliteImageUrl": bulletin.get('satellite_image_url'),
+        "forecast": [
+            {
+                "time": f"{point['hours']}h",
+                "position": _position(point['lat'], point['lon']),
+                "lat": point['lat'],
+                "lon": point['lon'],
+                "intensity": point.get('intensity'),
+            }
+            for point in bulletin.get('forecast', [])
+        ],
+        "warnings": bulletin.get('warnings', []),
+    }
+
+
+class BulletinSnapshot:
+    """Latest stored bulletin held in memory, refreshed stale-while-revalidate"""
+
+    def __init__(self, loader, fresh_for=SNAPSHOT_FRESH_SECONDS, max_stale=SNAPSHOT_MAX_STALE_SECONDS):
+        self.loader = loader
+        self.fresh_for = fresh_for
+        self.max_stale = max_stale
+        self.value = None
+        self.loaded_at = None
+        self._reload = None
+
+    def age(self):
+        return None if self.loaded_at is None else time.monotonic() - self.loaded_at
+
+    async def get(self):
+        """(bulletin or None, snapshot age in seconds)"""
+        age = self.age()
+        if age is None or age > self.max_stale:
+            try:
+                await self._start_reload()
+            except Exception:
+                if age is None:
+                    raise
+                # The database is unreachable: an old bulletin beats none
+                logger.exception("Reloading the typhoon snapshot failed; serving the old one")
+        elif age > self.fresh_for:
+            # Serve the stale copy now; the reload finishes in the background
+            asyncio.ensure_future(self._start_reload_quietly())
+        return self.value, self.age()
+
+    async def _start_reload(self):
+        if self._reload is None or self._reload.done():
+            self._reload = asyncio.ensure_future(self._load())
+        await asyncio.shield(self._reload)
+
+    async def _start_reload_quietly(self):
+        try:
+            await self._start_reload()
+        except Exception as e:
+            logger.warning("Reloading the typhoon snapshot failed: %s", e)
+
+    async def _load(self):
+        self.value = await self.loader()
+        self.loaded_at = time.monotonic()
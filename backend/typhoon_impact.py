@@ -0,0 +1,207 @@
+"""
+Typhoon track interpolation and impact zones
+
+From a parsed bulletin (typhoon_feed.parse_bulletin) this builds the forecast
+track, interpolated hourly. It also builds three zones:
+    storm  storm-force wind radius around the current center
+    gale   gale-force wind radius around the current center
+    cone   forecast uncertainty cone: circles along the track whose radius is
+           the typical track error at that lead time
+
+Barangay centroids and map locations are tested against all zones at once with
+vectorized haversine distances. Polygons are returned as GeoJSON for display
+only. Membership is decided by distance, which is exact for circles and for
+the cone at the interpolation step.
+
+The computation depends only on the bulletin and the reference data, so results
+are cached per (bulletin, reference data version) in ImpactCache.
+"""
+from collections import OrderedDict
+
+import numpy as np
+
+
+EARTH_RADIUS_KM = 6371.0088
+TRACK_STEP_HOURS = 1
+CIRCLE_SEGMENTS = 64
+# Typical forecast track error by lead time (hours, km), i.e. the cone half-width
+CONE_ERROR_KM = ((0, 30), (24, 100), (48, 190), (72, 280), (96, 370), (120, 460))
+ZONES = ('storm', 'gale', 'cone')
+
+
+def haversine_km(lat1, lon1, lat2, lon2):
+    """Great-circle distance in km; arguments broadcast like NumPy arrays"""
+    lat1, lon1, lat2, lon2 = map(np.radians, (lat1, lon1, lat2, lon2))
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0, 1)))
+
+
+def initial_bearing(lat1, lon1, lat2, lon2):
+    """Bearing in degrees from point 1 towards point 2"""
+    lat1, lon1, lat2, lon2 = map(np.radians, (lat1, lon1, lat2, lon2))
+    y = np.sin(lon2 - lon1) * np.cos(lat2)
+    x = np.cos(lat1) * np.sin(lat2) - np.sin(lat1) * np.cos(lat2) * np.cos(lon2 - lon1)
+    return np.degrees(np.arctan2(y, x)) % 360
+
+
+def destination(lat, lon, bearing, distance_km):
+    """Point reached from (lat, lon) along `bearing` after `distance_km`"""
+    lat, lon, bearing = map(np.radians, (lat, lon, bearing))
+    angle = np.asarray(distance_km) / EARTH_RADIUS_KM
+    lat2 = np.arcsin(np.sin(lat) * np.cos(angle) + np.cos(lat) * np.sin(angle) * np.cos(bearing))
+    lon2 = lon + np.arctan2(
+        np.sin(bearing) * np.sin(angle) * np.cos(lat), np.cos(angle) - np.sin(lat) * np.sin(lat2)
+    )
+    return np.degrees(lat2), (np.degrees(lon2) + 540) % 360 - 180
+
+
+def track_points(bulletin):
+    """(hours, lats, lons) of the current center followed by the forecast positions"""
+    points = [(0, bulletin['lat'], bulletin['lon'])]
+    points += [(p['hours'], p['lat'], p['lon']) for p in bulletin.get('forecast', []) if p['hours'] > 0]
+    hours, lats, lons = np.array(sorted(points), dtype=float).T
+    return hours, lats, lons
+
+
+def interpolate_track(hours, lats, lons, step_hours=TRACK_STEP_HOURS):
+    """Positions every `step_hours` along the track.
+
+    Linear in latitude and longitude, which is close enough to the great
+    circle over the few hundred km between forecast positions.
+    """
+    samples = np.arange(hours[0], hours[-1] + step_hours / 2, step_hours)
+    return samples, np.interp(samples, hours, lats), np.interp(samples, hours, lons)
+
+
+def cone_radius_km(hours):
+    lead, error = zip(*CONE_ERROR_KM)
+    return np.interp(hours, lead, error)
+
+
+def _ring(lats, lons):
+    ring = np.column_stack([lons, lats])
+    return np.vstack([ring, ring[:1]]).round(5).tolist()
+
+
+def circle_polygon(lat, lon, radius_km, segments=CIRCLE_SEGMENTS):
+    bearings = np.linspace(0, 360, segments, endpoint=False)
+    lats, lons = destination(lat, lon, bearings, radius_km)
+    return {'type': 'Polygon', 'coordinates': [_ring(lats, lons)]}
+
+
+def cone_polygon(lats, lons, radii, cap_segments=CIRCLE_SEGMENTS // 2):
+    """Outline of the union of circles along the track: both flanks and round caps"""
+    if len(lats) < 2:
+        return circle_polygon(lats[0], lons[0], radii[0])
+
+    headings = initial_bearing(lats[:-1], lons[:-1], lats[1:], lons[1:])
+    headings = np.append(headings, headings[-1])
+    left = destination(lats, lons, headings - 90, radii)
+    right = destination(lats, lons, headings + 90, radii)
+    end_cap = destination(lats[-1], lons[-1], headings[-1] - 90 + np.linspace(0, 180, cap_segments), radii[-1])
+    start_cap = destination(lats[0], lons[0], headings[0] + 90 + np.linspace(0, 180, cap_segments), radii[0])
+
+    outline_lats = np.concatenate([left[0], end_cap[0], right[0][::-1], start_cap[0]])
+    outline_lons = np.concatenate([left[1], end_cap[1], right[1][::-1], start_cap[1]])
+    return {'type': 'Polygon', 'coordinates': [_ring(outline_lats, outline_lons)]}
+
+
+def classify_points(lats, lons, bulletin, track):
+    """Zone, closest approach and its lead time for each point.
+
+    `track` is the interpolated (hours, lats, lons). Returns arrays: zone
+    (one of ZONES or None), distance to the current center, closest
+    distance to the track and the hour it happens.
+    """
+    lats, lons = np.asarray(lats, dtype=float), np.asarray(lons, dtype=float)
+    hours, track_lats, track_lons = track
+    to_center = haversine_km(lats, lons, bulletin['lat'], bulletin['lon'])
+    # (points, samples) distance matrix
+    to_track = haversine_km(lats[:, None], lons[:, None], track_lats[None, :], track_lons[None, :])
+    nearest = to_track.argmin(axis=1)
+    closest = to_track[np.arange(len(lats)), nearest]
+    in_cone = (to_track <= cone_radius_km(hours)[None, :]).any(axis=1)
+
+    zone = np.full(len(lats), None, dtype=object)
+    zone[in_cone] = 'cone'
+    if bulletin.get('gale_radius_km'):
+        zone[to_center <= bulletin['gale_radius_km']] = 'gale'
+    if bulletin.get('storm_radius_km'):
+        zone[to_center <= bulletin['storm_radius_km']] = 'storm'
+    return zone, to_center, closest, hours[nearest]
+
+
+def _affected(items, zone, to_center, closest, eta):
+    rows = []
+    for index in np.flatnonzero(zone != None):  # noqa: E711 (elementwise)
+        rows.append({
+            **items[index],
+            'zone': zone[index],
+            'distance_km': round(float(to_center[index]), 1),
+            'closest_approach_km': round(float(closest[index]), 1),
+            'closest_approach_hours': int(eta[index]),
+        })
+    # Most threatened first
+    rows.sort(key=lambda row: (ZONES.index(row['zone']), row['distance_km']))
+    return rows
+
+
+def compute_impact(bulletin, barangays, locations):
+    """Track, zone polygons and the affected barangays and facilities.
+
+    `barangays` come from barangays.load_barangays(), `locations` are
+    map_locations rows (lat, lng).
+    """
+    track = interpolate_track(*track_points(bulletin))
+    hours, track_lats, track_lons = track
+
+    polygons = {'cone': cone_polygon(track_lats, track_lons, cone_radius_km(hours))}
+    for zone in ('storm', 'gale'):
+        if bulletin.get(f'{zone}_radius_km'):
+            polygons[zone] = circle_polygon(bulletin['lat'], bulletin['lon'], bulletin[f'{zone}_radius_km'])
+
+    areas = []
+    if barangays:
+        areas = _affected(
+            [{'name': b['name'], 'lat': round(b['lat'], 6), 'lon': round(b['lon'], 6)} for b in barangays],
+            *classify_points([b['lat'] for b in barangays], [b['lon'] for b in barangays], bulletin, track),
+        )
+    facilities = []
+    if locations:
+        facilities = _affected(
+            [{'id': loc['id'], 'name': loc['name'], 'type': loc['type'], 'lat': loc['lat'], 'lon': loc['lng']}
+             for loc in locations],
+            *classify_points([loc['lat'] for loc in locations], [loc['lng'] for loc in locations], bulletin, track),
+        )
+
+    return {
+        'bulletin_id': bulletin['bulletin_id'],
+        'track': {
+            'type': 'LineString',
+            'coordinates': np.column_stack([track_lons, track_lats]).round(5).tolist(),
+            'hours': hours.astype(int).tolist(),
+        },
+        'zones': polygons,
+        'barangays_available': bool(barangays),
+        'barangays': areas,
+        'facilities': facilities,
+    }
+
+
+class ImpactCache:
+    """Last few impact results, keyed by bulletin and reference data version"""
+
+    def __init__(self, max_entries=8):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+
+    def get(self, key):
+        if key in self._entries:
+            self._entries.move_to_end(key)
+        return self._entries.get(key)
+
+    def put(self, key, value):
+        self._entries[key] = value
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
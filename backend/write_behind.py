@@ -0,0 +1,142 @@
+"""
+Write-behind buffering of high-volume inserts
+
+Request handlers append rows to an in-memory buffer and return immediately; a
+background task flushes the buffer in batches with COPY (copy_records_to_table)
+whenever it reaches the batch size or the flush interval elapses. When the
+buffer is full, add() waits briefly for space and then raises BufferFull so
+the endpoint can shed load. Remaining rows are flushed on shutdown.
+
+A batch the database rejects because of its contents (say a timestamp with no
+partition) is split until the offending rows are isolated; those are logged
+and dropped so they cannot block the rows behind them. Other failures are
+retried once per flush interval, and a batch is dropped after max_retries
+consecutive failures.
+"""
+import asyncio
+import logging
+
+import asyncpg
+
+
+logger = logging.getLogger(__name__)
+
+# Errors caused by the rows themselves (SQLSTATE classes 22 and 23); writing
+# the same rows again can never succeed
+ROW_ERRORS = (asyncpg.exceptions.DataError, asyncpg.exceptions.IntegrityConstraintViolationError)
+
+
+class BufferFull(Exception):
+    """Raised when the buffer stays full for longer than the put timeout"""
+
+
+class WriteBehindBuffer:
+    """Batches rows for one table and writes them with COPY"""
+
+    def __init__(self, pool_getter, table, columns, max_rows=10000, batch_size=500,
+                 flush_interval=1.0, put_timeout=2.0, max_retries=20):
+        self.pool_getter = pool_getter
+        self.table = table
+        self.columns = columns
+        self.max_rows = max_rows
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.put_timeout = put_timeout
+        self.max_retries = max_retries
+        self._failures = 0
+        self._rows = []
+        self._space = asyncio.Condition()
+        self._batch_ready = asyncio.Event()
+        self._stopping = asyncio.Event()
+        self._task = None
+
+    def __len__(self):
+        return len(self._rows)
+
+    async def add(self, row):
+        """Queue one row (a tuple in `columns` order)"""
+        async with self._space:
+            if len(self._rows) >= self.max_rows:
+                try:
+                    await asyncio.wait_for(
+                        self._space.wait_for(lambda: len(self._rows) < self.max_rows),
+                        self.put_timeout,
+                    )
+                except asyncio.TimeoutError:
+                    raise BufferFull(f"{self.table} write buffer is full")
+            self._rows.append(row)
+        if len(self._rows) >= self.batch_size:
+            self._batch_ready.set()
+
+    async def start(self):
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Stop the flusher and write out everything still buffered"""
+        if self._task:
+            # Not cancelled: a flush in progress has already taken its batch out of _rows
+            self._stopping.set()
+            self._batch_ready.set()
+            await self._task
+            self._task = None
+        while self._rows:
+            if not await self.flush():
+                logger.error("Dropping %d unflushed %s rows at shutdown", len(self._rows), self.table)
+                break
+
+    async def _run(self):
+        while not self._stopping.is_set():
+            try:
+                await asyncio.wait_for(self._batch_ready.wait(), self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._batch_ready.clear()
+            while self._rows and not self._stopping.is_set():
+                if not await self.flush():
+                    # Full buffers keep _batch_ready set; retry once per interval
+                    try:
+                        await asyncio.wait_for(self._stopping.wait(), self.flush_interval)
+                    except asyncio.TimeoutError:
+                        pass
+                    break
+
+    async def flush(self):
+        """Write one batch; on failure the rows go back to the front of the buffer"""
+        batch = self._rows[:self.batch_size]
+        del self._rows[:len(batch)]
+        if not batch:
+            return True
+        try:
+            pool = await self.pool_getter()
+            async with pool.acquire() as conn:
+                try:
+                    await conn.copy_records_to_table(self.table, records=batch, columns=self.columns)
+                except ROW_ERRORS:
+                    await self._copy_valid_rows(conn, batch)
+            self._failures = 0
+            return True
+        except Exception as e:
+            self._failures += 1
+            if self._failures >= self.max_retries:
+                logger.error("Dropping %d %s rows after %d failed flushes: %s",
+                             len(batch), self.table, self._failures, e)
+                self._failures = 0
+            else:
+                logger.warning("Flushing %d %s rows failed: %s", len(batch), self.table, e)
+                self._rows[:0] = batch
+            return False
+        finally:
+            async with self._space:
+                self._space.notify_all()
+
+    async def _copy_valid_rows(self, conn, rows):
+        """Write rows, bisecting rejected batches and dropping the rows at fault"""
+        try:
+            await conn.copy_records_to_table(self.table, records=rows, columns=self.columns)
+        except ROW_ERRORS as e:
+            if len(rows) == 1:
+                logger.error("Dropping %s row %r: %s", self.table, rows[0], e)
+                return
+            middle = len(rows) // 2
+            await self._copy_valid_rows(conn, rows[:middle])
+            await self._copy_valid_rows(conn, rows[middle:])
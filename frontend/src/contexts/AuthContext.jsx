@@ -1,4 +1,4 @@
-import { createContext, useContext, useState, useEffect } from 'react';
+import { createContext, useContext, useState, useEffect, useRef, useCallback } from 'react';
 import axios from 'axios';
 
 const AuthContext = createContext(null);
@@ -9,19 +9,23 @@ export const AuthProvider = ({ children }) => {
   const [user, setUser] = useState(null);
   const [loading, setLoading] = useState(true);
   const [token, setToken] = useState(() => localStorage.getItem('auth_token'));
+  // Plan and checklist delivered with the startup state, handed out once to the pages
+  const initialStateRef = useRef({});
 
   useEffect(() => {
-    // Check if user is logged in on mount
+    // Check if user is logged in on mount; one request also loads plan and checklist
     const checkAuth = async () => {
       const savedToken = localStorage.getItem('auth_token');
       if (savedToken) {
         try {
-          const response = await axios.get(`${API_URL}/api/auth/me`, {
+          const response = await axios.get(`${API_URL}/api/user/state`, {
             headers: {
               Authorization: `Bearer ${savedToken}`
             }
           });
-          setUser(response.data);
+          const { user: userData, plan, checklist } = response.data;
+          initialStateRef.current = { plan, checklist };
+          setUser(userData);
           setToken(savedToken);
         } catch (error) {
           console.error('Auth check failed:', error);
@@ -93,11 +97,21 @@ export const AuthProvider = ({ children }) => {
       console.warn('Logout request failed:', error);
     } finally {
       localStorage.removeItem('auth_token');
+      initialStateRef.current = {};
       setToken(null);
       setUser(null);
     }
   };
 
+  // Returns the startup copy of 'plan' or 'checklist' once; undefined afterwards
+  const consumeInitialState = useCallback((key) => {
+    const state = initialStateRef.current;
+    if (!(key in state)) return undefined;
+    const value = state[key];
+    delete state[key];
+    return value;
+  }, []);
+
   const value = {
     user,
     token,
@@ -105,7 +119,8 @@ export const AuthProvider = ({ children }) => {
     isAuthenticated: !!user,
     register,
     login,
-    logout
+    logout,
+    consumeInitialState
   };
 
   return (
@@ -1,9 +1,10 @@
-import { useEffect, useMemo, useState } from 'react';
+import { useEffect, useMemo, useRef, useState } from 'react';
 import { useNavigate } from 'react-router-dom';
 import { Header } from '../components/Header';
 import { Shield, Search, RefreshCw, Trash2, Eye, Save, Plus, PhoneCall, MapPin } from 'lucide-react';
 import { useAuth } from '../contexts/AuthContext';
 import api from '../utils/api';
+import { matchesIncidentFilters, subscribeIncidentFeed } from '../utils/incidentFeed';
 import { MapContainer, TileLayer, Marker, useMapEvents } from 'react-leaflet';
 import L from 'leaflet';
 import 'leaflet/dist/leaflet.css';
@@ -49,7 +50,12 @@ export default function AdminDashboard() {
   const [incidentsLoading, setIncidentsLoading] = useState(false);
   const [incidentsError, setIncidentsError] = useState('');
   const [statusFilter, setStatusFilter] = useState('');
+  const [barangayFilter, setBarangayFilter] = useState('');
+  const [barangayCounts, setBarangayCounts] = useState([]);
   const [query, setQuery] = useState('');
+  // Filters of the loaded list, read by the live feed handler without resubscribing
+  const incidentFiltersRef = useRef({});
+  incidentFiltersRef.current = { status: statusFilter, barangay: barangayFilter };
   const [selectedIncident, setSelectedIncident] = useState(null);
   const [incidentEdit, setIncidentEdit] = useState({ status: 'new', internal_notes: '' });
   const [incidentSaving, setIncidentSaving] = useState(false);
@@ -101,6 +107,35 @@ export default function AdminDashboard() {
     // eslint-disable-next-line react-hooks/exhaustive-deps
   }, [loading, isAuthenticated, user?.is_admin]);
 
+  // Live incident updates instead of re-polling the whole list
+  useEffect(() => {
+    if (loading || !isAuthenticated || !user?.is_admin) return undefined;
+
+    return subscribeIncidentFeed(async ({ type, incident }) => {
+      if (type === 'reset') {
+        refreshIncidents();
+        return;
+      }
+      if (type === 'deleted') {
+        setIncidents((prev) => prev.filter((i) => i.id !== incident.id));
+        return;
+      }
+      try {
+        const res = await api.get(`/api/admin/incidents/${incident.id}`);
+        const full = res.data.incident;
+        const matches = matchesIncidentFilters(full, incidentFiltersRef.current);
+        setIncidents((prev) => {
+          const rest = prev.filter((i) => i.id !== full.id);
+          if (!matches) return rest; // no longer (or never) part of the filtered list
+          return type === 'created' ? [full, ...rest] : prev.map((i) => (i.id === full.id ? full : i));
+        });
+      } catch (e) {
+        // deleted in the meantime; the delete event will follow
+      }
+    });
+    // eslint-disable-next-line react-hooks/exhaustive-deps
+  }, [loading, isAuthenticated, user?.is_admin]);
+
   const refreshIncidents = async () => {
     setIncidentsLoading(true);
     setIncidentsError('');
@@ -108,8 +143,12 @@ export default function AdminDashboard() {
       const params = {};
       if (statusFilter) params.status = statusFilter;
       if (query) params.q = query;
-      const res = await api.get('/api/admin/incidents', { params });
+      const [res, counts] = await Promise.all([
+        api.get('/api/admin/incidents', { params: barangayFilter ? { ...params, barangay: barangayFilter } : params }),
+        api.get('/api/admin/incidents/barangays', { params }),
+      ]);
       setIncidents(res.data.incidents || []);
+      setBarangayCounts((counts.data.barangays || []).filter((row) => row.barangay));
     } catch (e) {
       setIncidentsError(e.response?.data?.detail || 'Failed to load incidents');
     } finally {
@@ -141,7 +180,7 @@ export default function AdminDashboard() {
       };
       const res = await api.patch(`/api/admin/incidents/${selectedIncident.id}`, payload);
       setSelectedIncident(res.data.incident);
-      await refreshIncidents();
+      setIncidents((prev) => prev.map((i) => (i.id === res.data.incident.id ? res.data.incident : i)));
     } catch (e) {
       alert(e.response?.data?.detail || 'Failed to update incident');
     } finally {
@@ -156,7 +195,7 @@ export default function AdminDashboard() {
       if (selectedIncident?.id === incidentId) {
         setSelectedIncident(null);
       }
-      await refreshIncidents();
+      setIncidents((prev) => prev.filter((i) => i.id !== incidentId));
     } catch (e) {
       alert(e.response?.data?.detail || 'Failed to delete incident');
     }
@@ -453,7 +492,7 @@ export default function AdminDashboard() {
                 </button>
               </div>
 
-              <div className="mt-3 grid grid-cols-1 md:grid-cols-3 gap-3" data-testid="admin-incidents-filters">
+              <div className="mt-3 grid grid-cols-1 md:grid-cols-4 gap-3" data-testid="admin-incidents-filters">
                 <div className="md:col-span-2 relative">
                   <Search className="w-4 h-4 text-slate-400 absolute left-3 top-1/2 -translate-y-1/2" />
                   <input
@@ -475,6 +514,17 @@ export default function AdminDashboard() {
                     <option key={opt.value} value={opt.value}>{opt.label}</option>
                   ))}
                 </select>
+                <select
+                  value={barangayFilter}
+                  onChange={(e) => setBarangayFilter(e.target.value)}
+                  className="w-full py-2.5 px-3 bg-slate-50 border border-slate-200 rounded-xl focus:outline-none focus:border-yellow-500"
+                  data-testid="admin-incidents-barangay-filter"
+                >
+                  <option value="">All barangays</option>
+                  {barangayCounts.map((row) => (
+                    <option key={row.barangay} value={row.barangay}>{row.barangay} ({row.count})</option>
+                  ))}
+                </select>
               </div>
 
               <div className="mt-3">
@@ -499,7 +549,7 @@ export default function AdminDashboard() {
                           </span>
                         </div>
                         <div className="text-slate-500 text-xs mt-0.5" data-testid={`admin-incident-meta-${it.id}`}>
-                          {it.date} {it.time} • {Number(it.latitude).toFixed(4)}, {Number(it.longitude).toFixed(4)}
+                          {it.date} {it.time} • {it.barangay ? `${it.barangay} • ` : ''}{Number(it.latitude).toFixed(4)}, {Number(it.longitude).toFixed(4)}
                           {it.reporter_phone ? ` • ${it.reporter_phone}` : ''}
                         </div>
                       </div>
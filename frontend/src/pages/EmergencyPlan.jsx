@@ -1,8 +1,18 @@
-import { useState, useEffect } from 'react';
+import { useState, useEffect, useRef } from 'react';
 import { Header } from '../components/Header';
 import { FileText, Plus, Save, Trash2, Users, MapPin, Phone, Home, AlertCircle, Cloud, CloudOff, Waves, Mountain, CloudLightning, Wind, Flame, Sun, ChevronDown, ChevronUp, BookOpen } from 'lucide-react';
 import { useAuth } from '../contexts/AuthContext';
 import { userAPI } from '../utils/api';
+import { createPatch } from '../utils/jsonPatch';
+import { resolveConflict } from '../utils/documentSync';
+
+const planSource = {
+  getDeltas: userAPI.getEmergencyPlanDeltas,
+  getDocument: async () => (await userAPI.getEmergencyPlan()).data.plan,
+  field: 'plan_data',
+  conflictMessage: 'Your plan was also changed on another device and the changes conflict.\n\n'
+    + 'OK keeps the plan on this device, Cancel loads the other one.',
+};
 
 const defaultPlan = {
   familyMembers: [],
@@ -237,7 +247,7 @@ const disasters = [
 ];
 
 export default function EmergencyPlan() {
-  const { isAuthenticated, user } = useAuth();
+  const { isAuthenticated, user, consumeInitialState } = useAuth();
   const [plan, setPlan] = useState(() => {
     const saved = localStorage.getItem('emergency-plan');
     return saved ? JSON.parse(saved) : defaultPlan;
@@ -247,16 +257,23 @@ export default function EmergencyPlan() {
   const [syncing, setSyncing] = useState(false);
   const [syncStatus, setSyncStatus] = useState('local'); // 'local', 'synced', 'error'
   const [expandedDisasters, setExpandedDisasters] = useState({});
+  const versionRef = useRef(null);
+  const syncedRef = useRef(null); // last plan the server acknowledged
 
   // Load plan from backend if user is authenticated
   useEffect(() => {
     const loadPlanFromBackend = async () => {
       if (isAuthenticated) {
         try {
-          const response = await userAPI.getEmergencyPlan();
-          if (response.data.plan && response.data.plan.plan_data) {
-            setPlan(response.data.plan.plan_data);
-            localStorage.setItem('emergency-plan', JSON.stringify(response.data.plan.plan_data));
+          let savedPlan = consumeInitialState('plan');
+          if (savedPlan === undefined) {
+            savedPlan = (await userAPI.getEmergencyPlan()).data.plan;
+          }
+          if (savedPlan && savedPlan.plan_data) {
+            versionRef.current = savedPlan.version;
+            syncedRef.current = savedPlan.plan_data;
+            setPlan(savedPlan.plan_data);
+            localStorage.setItem('emergency-plan', JSON.stringify(savedPlan.plan_data));
             setSyncStatus('synced');
           }
         } catch (error) {
@@ -267,15 +284,28 @@ export default function EmergencyPlan() {
     };
 
     loadPlanFromBackend();
-  }, [isAuthenticated]);
+  }, [isAuthenticated, consumeInitialState]);
 
   useEffect(() => {
     localStorage.setItem('emergency-plan', JSON.stringify(plan));
-    if (isAuthenticated && syncStatus === 'synced') {
+    if (isAuthenticated && syncStatus === 'synced' && plan !== syncedRef.current) {
       setSyncStatus('local'); // Mark as having local changes
     }
   }, [plan, isAuthenticated, syncStatus]);
 
+  const pushPlan = async (current) => {
+    // Send only the changes once the server copy is known
+    const ops = versionRef.current && syncedRef.current ? createPatch(syncedRef.current, current) : null;
+    if (ops === null) {
+      const response = await userAPI.saveEmergencyPlan(current, versionRef.current);
+      versionRef.current = response.data.plan.version;
+    } else if (ops.length > 0) {
+      const response = await userAPI.patchEmergencyPlan(ops, versionRef.current);
+      versionRef.current = response.data.version;
+    }
+    syncedRef.current = current;
+  };
+
   const handleSave = async () => {
     localStorage.setItem('emergency-plan', JSON.stringify(plan));
     
@@ -283,7 +313,16 @@ export default function EmergencyPlan() {
     if (isAuthenticated) {
       setSyncing(true);
       try {
-        await userAPI.saveEmergencyPlan(plan);
+        try {
+          await pushPlan(plan);
+        } catch (error) {
+          if (error.response?.status !== 409) throw error;
+          // Saved on another device meanwhile: catch up, rebase and push once more
+          const merged = await resolveConflict(planSource, { versionRef, syncedRef }, plan);
+          setPlan(merged);
+          localStorage.setItem('emergency-plan', JSON.stringify(merged));
+          await pushPlan(merged);
+        }
         setSyncStatus('synced');
         setSaved(true);
         setTimeout(() => setSaved(false), 2000);
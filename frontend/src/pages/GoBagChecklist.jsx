@@ -1,8 +1,18 @@
-import { useState, useEffect } from 'react';
+import { useState, useEffect, useRef } from 'react';
 import { Header } from '../components/Header';
 import { Briefcase, Check, Plus, Trash2, Save, RotateCcw, Cloud, CloudOff, AlertCircle } from 'lucide-react';
 import { useAuth } from '../contexts/AuthContext';
 import { userAPI } from '../utils/api';
+import { createPatch } from '../utils/jsonPatch';
+import { resolveConflict } from '../utils/documentSync';
+
+const checklistSource = {
+  getDeltas: userAPI.getChecklistDeltas,
+  getDocument: async () => (await userAPI.getChecklist()).data.checklist,
+  field: 'checklist_data',
+  conflictMessage: 'Your checklist was also changed on another device and the changes conflict.\n\n'
+    + 'OK keeps the checklist on this device, Cancel loads the other one.',
+};
 
 const defaultChecklist = [
   { id: 1, category: 'Documents', item: 'Valid IDs (Photocopy)', checked: false },
@@ -47,7 +57,7 @@ const categoryColors = {
 };
 
 export default function GoBagChecklist() {
-  const { isAuthenticated, user } = useAuth();
+  const { isAuthenticated, user, consumeInitialState } = useAuth();
   const [checklist, setChecklist] = useState(() => {
     const saved = localStorage.getItem('gobag-checklist');
     return saved ? JSON.parse(saved) : defaultChecklist;
@@ -57,16 +67,23 @@ export default function GoBagChecklist() {
   const [showAddForm, setShowAddForm] = useState(false);
   const [syncing, setSyncing] = useState(false);
   const [syncStatus, setSyncStatus] = useState('local'); // 'local', 'synced', 'error'
+  const versionRef = useRef(null);
+  const syncedRef = useRef(null); // last checklist the server acknowledged
 
   // Load checklist from backend if user is authenticated
   useEffect(() => {
     const loadChecklistFromBackend = async () => {
       if (isAuthenticated) {
         try {
-          const response = await userAPI.getChecklist();
-          if (response.data.checklist && response.data.checklist.checklist_data) {
-            setChecklist(response.data.checklist.checklist_data);
-            localStorage.setItem('gobag-checklist', JSON.stringify(response.data.checklist.checklist_data));
+          let savedChecklist = consumeInitialState('checklist');
+          if (savedChecklist === undefined) {
+            savedChecklist = (await userAPI.getChecklist()).data.checklist;
+          }
+          if (savedChecklist && savedChecklist.checklist_data) {
+            versionRef.current = savedChecklist.version;
+            syncedRef.current = savedChecklist.checklist_data;
+            setChecklist(savedChecklist.checklist_data);
+            localStorage.setItem('gobag-checklist', JSON.stringify(savedChecklist.checklist_data));
             setSyncStatus('synced');
           }
         } catch (error) {
@@ -77,7 +94,7 @@ export default function GoBagChecklist() {
     };
 
     loadChecklistFromBackend();
-  }, [isAuthenticated]);
+  }, [isAuthenticated, consumeInitialState]);
 
   useEffect(() => {
     localStorage.setItem('gobag-checklist', JSON.stringify(checklist));
@@ -88,10 +105,30 @@ export default function GoBagChecklist() {
       const syncTimer = setTimeout(async () => {
         try {
           setSyncing(true);
-          await userAPI.saveChecklist(checklist);
+          // Send only the changes once the server copy is known
+          const ops = versionRef.current && syncedRef.current ? createPatch(syncedRef.current, checklist) : null;
+          if (ops === null) {
+            const response = await userAPI.saveChecklist(checklist, versionRef.current);
+            versionRef.current = response.data.checklist.version;
+          } else if (ops.length > 0) {
+            const response = await userAPI.patchChecklist(ops, versionRef.current);
+            versionRef.current = response.data.version;
+          }
+          syncedRef.current = checklist;
           setSyncStatus('synced');
         } catch (error) {
-          console.error('Failed to sync checklist:', error);
+          if (error.response?.status === 409) {
+            // Saved on another device meanwhile: catch up and rebase; the new
+            // checklist re-runs this effect, which pushes it as a patch
+            try {
+              setChecklist(await resolveConflict(checklistSource, { versionRef, syncedRef }, checklist));
+              return;
+            } catch (conflictError) {
+              console.error('Failed to reconcile checklist:', conflictError);
+            }
+          } else {
+            console.error('Failed to sync checklist:', error);
+          }
           setSyncStatus('error');
         } finally {
           setSyncing(false);
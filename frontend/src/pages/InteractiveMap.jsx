@@ -1,7 +1,7 @@
-import { useState, useEffect } from 'react';
+import { useState, useEffect, useMemo, useRef } from 'react';
 import { Header } from '../components/Header';
 import { Map as MapIcon, Building2, Hospital, Shield, Landmark, Home, Search, Layers, X } from 'lucide-react';
-import { MapContainer, TileLayer, Marker, Popup, useMap } from 'react-leaflet';
+import { MapContainer, TileLayer, Marker, Popup, GeoJSON, useMap, useMapEvents } from 'react-leaflet';
 import L from 'leaflet';
 import 'leaflet/dist/leaflet.css';
 
@@ -28,6 +28,100 @@ const facilityTypes = [
   { id: 'government', label: 'Government Facilities', icon: Landmark, color: '#8b5cf6' },
 ];
 
+const API_URL = process.env.REACT_APP_BACKEND_URL || '';
+
+// Hazard layers served by /api/hazards; unknown layers get a neutral color
+const hazardStyles = {
+  flood: { label: 'Flood', color: '#0ea5e9' },
+  landslide: { label: 'Landslide', color: '#a16207' },
+  storm_surge: { label: 'Storm Surge', color: '#7c3aed' },
+};
+const LEVEL_OPACITY = { high: 0.5, moderate: 0.35, medium: 0.35, low: 0.2 };
+
+const hazardStyle = (name) => hazardStyles[name] || { label: name.replace(/_/g, ' '), color: '#64748b' };
+
+const lonToTile = (lon, zoom) => Math.floor(((lon + 180) / 360) * 2 ** zoom);
+const latToTile = (lat, zoom) => {
+  const rad = (lat * Math.PI) / 180;
+  return Math.floor(((1 - Math.log(Math.tan(rad) + 1 / Math.cos(rad)) / Math.PI) / 2) * 2 ** zoom);
+};
+
+// Loads the hazard tiles covering the viewport; zones spanning tiles are drawn once
+function HazardTiles({ layers }) {
+  const map = useMap();
+  const tileCache = useRef(new Map());
+  const [features, setFeatures] = useState([]);
+
+  useEffect(() => {
+    let current = true;
+
+    const load = async () => {
+      const zoom = Math.round(map.getZoom());
+      const visible = layers.filter((layer) => zoom >= layer.min_zoom);
+      const bounds = map.getBounds();
+      const requests = [];
+      for (const layer of visible) {
+        for (let x = lonToTile(bounds.getWest(), zoom); x <= lonToTile(bounds.getEast(), zoom); x += 1) {
+          for (let y = latToTile(bounds.getNorth(), zoom); y <= latToTile(bounds.getSouth(), zoom); y += 1) {
+            const url = `${API_URL}/api/hazards/${layer.name}/${zoom}/${x}/${y}?v=${layer.version}`;
+            if (!tileCache.current.has(url)) {
+              tileCache.current.set(url, fetch(url).then((res) => (res.ok ? res.json() : { features: [] })).catch(() => {
+                tileCache.current.delete(url);
+                return { features: [] };
+              }));
+            }
+            requests.push(tileCache.current.get(url));
+          }
+        }
+      }
+
+      const unique = new Map();
+      for (const tile of await Promise.all(requests)) {
+        for (const feature of tile.features) {
+          unique.set(`${feature.properties.layer}:${feature.id}:${zoom}`, feature);
+        }
+      }
+      if (current) setFeatures([...unique.entries()]);
+    };
+
+    load();
+    map.on('moveend', load);
+    return () => {
+      current = false;
+      map.off('moveend', load);
+    };
+  }, [map, layers]);
+
+  return features.map(([key, feature]) => {
+    const { color } = hazardStyle(feature.properties.layer);
+    const level = String(feature.properties.level || '').toLowerCase();
+    return (
+      <GeoJSON
+        key={key}
+        data={feature}
+        interactive={false}
+        style={{ color, weight: 1, fillColor: color, fillOpacity: LEVEL_OPACITY[level] ?? 0.3 }}
+      />
+    );
+  });
+}
+
+// Tapping the map lists the hazard zones at that point
+function HazardProbe({ enabled, onResult }) {
+  useMapEvents({
+    click: async (e) => {
+      if (!enabled) return;
+      try {
+        const res = await fetch(`${API_URL}/api/hazards/at?lat=${e.latlng.lat}&lon=${e.latlng.lng}`);
+        if (res.ok) onResult({ position: e.latlng, zones: (await res.json()).zones });
+      } catch (error) {
+        // offline: no hazard details
+      }
+    },
+  });
+  return null;
+}
+
 // Sample facilities data for Pio Duran, Albay
 const facilities = [
   // Evacuation Centers
@@ -64,6 +158,30 @@ export default function InteractiveMap() {
   const [searchQuery, setSearchQuery] = useState('');
   const [selectedFacility, setSelectedFacility] = useState(null);
   const [mapCenter, setMapCenter] = useState([13.0547, 123.5214]);
+  const [hazardLayers, setHazardLayers] = useState([]);
+  const [activeHazards, setActiveHazards] = useState([]);
+  const [hazardInfo, setHazardInfo] = useState(null);
+
+  useEffect(() => {
+    fetch(`${API_URL}/api/hazards`)
+      .then((res) => (res.ok ? res.json() : { layers: [] }))
+      .then((data) => setHazardLayers(data.layers || []))
+      .catch(() => setHazardLayers([]));
+  }, []);
+
+  const toggleHazard = (name) => {
+    setActiveHazards(prev => 
+      prev.includes(name)
+        ? prev.filter(h => h !== name)
+        : [...prev, name]
+    );
+  };
+
+  // Stable between renders, so the tile loader only restarts on toggles
+  const shownHazardLayers = useMemo(
+    () => hazardLayers.filter((layer) => activeHazards.includes(layer.name)),
+    [hazardLayers, activeHazards]
+  );
 
   const toggleFilter = (filterId) => {
     setActiveFilters(prev => 
@@ -141,6 +259,30 @@ export default function InteractiveMap() {
           ))}
         </div>
 
+        {/* Hazard Layer Toggles */}
+        {hazardLayers.length > 0 && (
+          <div className="flex flex-wrap gap-2" data-testid="hazard-buttons">
+            {hazardLayers.map((layer) => {
+              const { label, color } = hazardStyle(layer.name);
+              return (
+                <button
+                  key={layer.name}
+                  onClick={() => toggleHazard(layer.name)}
+                  className={`flex items-center gap-2 px-3 py-2 rounded-full text-sm font-medium transition-all ${
+                    activeHazards.includes(layer.name)
+                      ? 'bg-blue-950 text-white'
+                      : 'bg-white text-slate-600 border-2 border-slate-200'
+                  }`}
+                  data-testid={`hazard-${layer.name}`}
+                >
+                  <div className="w-3 h-3 rounded-sm" style={{ backgroundColor: color }} />
+                  <span className="capitalize">{label}</span>
+                </button>
+              );
+            })}
+          </div>
+        )}
+
         {/* Map Container */}
         <div className="map-container h-[350px] md:h-[450px]" data-testid="map-container">
           <MapContainer
@@ -160,6 +302,24 @@ export default function InteractiveMap() {
               detectRetina={true}
             />
             <FlyToLocation center={mapCenter} />
+            <HazardTiles layers={shownHazardLayers} />
+            <HazardProbe enabled={shownHazardLayers.length > 0} onResult={setHazardInfo} />
+            {hazardInfo && (
+              <Popup position={hazardInfo.position} eventHandlers={{ remove: () => setHazardInfo(null) }}>
+                <div className="p-1" data-testid="hazard-popup">
+                  <h3 className="font-bold text-blue-950">Hazard zones here</h3>
+                  {hazardInfo.zones.length === 0 ? (
+                    <p className="text-slate-600 text-sm">None of the mapped hazards</p>
+                  ) : (
+                    hazardInfo.zones.map((zone) => (
+                      <p key={`${zone.layer}:${zone.id}`} className="text-sm mt-1 capitalize" style={{ color: hazardStyle(zone.layer).color }}>
+                        {hazardStyle(zone.layer).label}{zone.level ? `: ${zone.level}` : ''}
+                      </p>
+                    ))
+                  )}
+                </div>
+              </Popup>
+            )}
             {filteredFacilities.map((facility) => (
               <Marker
                 key={facility.id}
@@ -244,6 +404,15 @@ export default function InteractiveMap() {
                 <span className="text-slate-600 text-xs">{type.label}</span>
               </div>
             ))}
+            {hazardLayers.map((layer) => (
+              <div key={layer.name} className="flex items-center gap-2">
+                <div 
+                  className="w-4 h-4 rounded-sm opacity-70"
+                  style={{ backgroundColor: hazardStyle(layer.name).color }}
+                />
+                <span className="text-slate-600 text-xs capitalize">{hazardStyle(layer.name).label} zone</span>
+              </div>
+            ))}
           </div>
         </div>
       </main>
@@ -5,6 +5,7 @@ import { MapContainer, TileLayer, Marker, useMapEvents } from 'react-leaflet';
 import L from 'leaflet';
 import 'leaflet/dist/leaflet.css';
 import offlineQueue from '../utils/offlineQueue';
+import { jsonRequestBody } from '../utils/compressBody';
 import axios from 'axios';
 import { useAuth } from '../contexts/AuthContext';
 
@@ -125,21 +126,11 @@ export default function ReportIncident() {
     try {
       if (navigator.onLine) {
         // Try to submit directly if online
+        const { body, headers } = await jsonRequestBody(reportData);
         const response = await axios.post(
           `${process.env.REACT_APP_BACKEND_URL}/api/incidents`,
-          {
-            incidentType: formData.incidentType,
-            date: formData.date,
-            time: formData.time,
-            description: formData.description,
-            reporter_phone: formData.reporterPhone || undefined,
-            location: {
-              latitude: position[0],
-              longitude: position[1],
-            },
-            images: uploadedImages,
-            timestamp: new Date().toISOString(),
-          }
+          body,
+          { headers }
         );
         
         if (response.status === 200 || response.status === 201) {
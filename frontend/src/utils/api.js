@@ -44,9 +44,27 @@ export const authAPI = {
   logout: () => api.post('/api/auth/logout')
 };
 
+// Saves send the version they were based on; the server answers 409 if another
+// device saved in the meantime
+const ifMatch = (version) => (version ? { headers: { 'If-Match': `"${version}"` } } : undefined);
+
+const jsonPatch = (version) => ({
+  headers: { 'If-Match': `"${version}"`, 'Content-Type': 'application/json-patch+json' },
+});
+
 export const userAPI = {
-  saveEmergencyPlan: (plan_data) => api.post('/api/user/emergency-plan', { plan_data }),
+  saveEmergencyPlan: (plan_data, version) => api.post('/api/user/emergency-plan', { plan_data }, ifMatch(version)),
+  patchEmergencyPlan: (ops, version) => api.patch('/api/user/emergency-plan', ops, jsonPatch(version)),
   getEmergencyPlan: () => api.get('/api/user/emergency-plan'),
-  saveChecklist: (checklist_data) => api.post('/api/user/checklist', { checklist_data }),
-  getChecklist: () => api.get('/api/user/checklist')
+  getEmergencyPlanDeltas: (since) => api.get('/api/user/emergency-plan/deltas', { params: { since } }),
+  saveChecklist: (checklist_data, version) => api.post('/api/user/checklist', { checklist_data }, ifMatch(version)),
+  patchChecklist: (ops, version) => api.patch('/api/user/checklist', ops, jsonPatch(version)),
+  getChecklist: () => api.get('/api/user/checklist'),
+  getChecklistDeltas: (since) => api.get('/api/user/checklist/deltas', { params: { since } })
+};
+
+// Several GETs in one round trip; resolves to [{ path, status, body }] in request order
+export const batchAPI = {
+  get: (paths) => api.post('/api/batch', { requests: paths.map((path) => ({ path })) })
+    .then((response) => response.data.responses)
 };
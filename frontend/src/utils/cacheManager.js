@@ -1,43 +1,67 @@
 // Cache manager for pre-caching critical data
+// Critical data comes from one versioned offline pack; only sections whose
+// hash changed are downloaded and each is stored under its endpoint's URL, so
+// the service worker serves it offline.
 
-const CRITICAL_ENDPOINTS = [
-  '/api/hotlines',
-  '/api/resources',
-  '/api/checklist',
-  '/api/map/locations',
-];
+const API_CACHE = 'mdrrmo-api-v1';
+const MANIFEST_KEY = 'offline-pack-manifest';
+
+// Offline pack sections and the endpoint each one stands in for
+const PACK_SECTIONS = {
+  hotlines: '/api/hotlines',
+  locations: '/api/map/locations',
+  checklist: '/api/checklist',
+  resources: '/api/resources',
+  typhoon: '/api/typhoon/current',
+};
+
+const CRITICAL_ENDPOINTS = Object.values(PACK_SECTIONS);
 
 class CacheManager {
   constructor() {
     this.baseURL = process.env.REACT_APP_BACKEND_URL || '';
   }
 
-  // Pre-cache critical API endpoints
+  // Download changed sections of the offline pack into the API cache
   async preCacheCriticalData() {
     console.log('[CacheManager] Pre-caching critical data...');
-    
-    const promises = CRITICAL_ENDPOINTS.map(async (endpoint) => {
-      try {
-        const response = await fetch(`${this.baseURL}${endpoint}`);
-        if (response.ok) {
-          console.log('[CacheManager] Cached:', endpoint);
-          return { endpoint, success: true };
-        } else {
-          console.warn('[CacheManager] Failed to cache:', endpoint, response.status);
-          return { endpoint, success: false };
-        }
-      } catch (error) {
-        console.error('[CacheManager] Error caching:', endpoint, error);
-        return { endpoint, success: false, error };
+    const cache = 'caches' in window ? await caches.open(API_CACHE) : null;
+    const manifest = JSON.parse(localStorage.getItem(MANIFEST_KEY) || '{}');
+
+    // Only claim sections that are still in the cache
+    const have = [];
+    for (const [name, hash] of Object.entries(manifest)) {
+      if (cache && PACK_SECTIONS[name] && await cache.match(`${this.baseURL}${PACK_SECTIONS[name]}`)) {
+        have.push(`${name}:${hash}`);
       }
-    });
+    }
 
-    const results = await Promise.allSettled(promises);
-    const successCount = results.filter(r => r.status === 'fulfilled' && r.value.success).length;
-    
-    console.log(`[CacheManager] Pre-cached ${successCount}/${CRITICAL_ENDPOINTS.length} endpoints`);
-    
-    return results;
+    try {
+      const query = have.length ? `?have=${encodeURIComponent(have.join(','))}` : '';
+      const response = await fetch(`${this.baseURL}/api/offline-pack${query}`);
+      if (!response.ok) {
+        console.warn('[CacheManager] Offline pack request failed:', response.status);
+        return { success: false };
+      }
+
+      const pack = await response.json();
+      const updated = Object.keys(pack.sections).filter((name) => PACK_SECTIONS[name]);
+      if (cache) {
+        await Promise.all(updated.map((name) => cache.put(
+          `${this.baseURL}${PACK_SECTIONS[name]}`,
+          new Response(JSON.stringify(pack.sections[name]), {
+            headers: { 'Content-Type': 'application/json' },
+          })
+        )));
+        localStorage.setItem(MANIFEST_KEY, JSON.stringify(pack.manifest));
+      }
+
+      console.log(`[CacheManager] Offline pack ${pack.version}: updated ${updated.length}/${CRITICAL_ENDPOINTS.length} sections`);
+      return { success: true, version: pack.version, updated };
+    } catch (error) {
+      console.error('[CacheManager] Error fetching offline pack:', error);
+      return { success: false, error };
+    }
   }
 
   // Clear old cache data
@@ -56,7 +80,7 @@ class CacheManager {
   // Check if data is available in cache
   async isCached(endpoint) {
     if ('caches' in window) {
-      const cache = await caches.open('mdrrmo-api-v1');
+      const cache = await caches.open(API_CACHE);
       const response = await cache.match(`${this.baseURL}${endpoint}`);
       return !!response;
     }
@@ -78,6 +102,7 @@ class CacheManager {
   async refreshCache() {
     console.log('[CacheManager] Refreshing cache...');
     await this.clearOldCache();
+    localStorage.removeItem(MANIFEST_KEY);
     return await this.preCacheCriticalData();
   }
 }
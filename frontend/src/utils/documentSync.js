@@ -0,0 +1,53 @@
+// Conflict recovery for the versioned per-user documents (emergency plan, checklist).
+// A save or patch answered with 409 was based on an old version: catch up with
+// the server, reapply this device's edits on top and continue from the new version.
+import { applyMergePatch, applyPatch, createPatch } from './jsonPatch';
+
+const applyDelta = (document, delta) => (
+  delta.patch_type === 'merge-patch' ? applyMergePatch(document, delta.patch) : applyPatch(document, delta.patch)
+);
+
+// Server copy of the document: `base` (the copy at `version`) with the deltas
+// since replayed, or the whole document when the deltas are gone (410)
+export async function fetchLatest(source, base, version) {
+  let log = null;
+  try {
+    log = (await source.getDeltas(version)).data;
+  } catch (error) {
+    if (error.response?.status !== 410) throw error;
+  }
+  if (log) {
+    try {
+      return { document: log.deltas.reduce(applyDelta, base), version: log.version };
+    } catch (error) {
+      // base is out of step with the log; fall back to the whole document
+    }
+  }
+  const saved = await source.getDocument();
+  return { document: saved ? saved[source.field] : null, version: saved ? saved.version : null };
+}
+
+// Local edits (base -> local) applied to the server copy, or null when they no
+// longer apply (e.g. an edited entry was removed on the other device)
+export function rebase(base, local, remote) {
+  try {
+    return applyPatch(remote, createPatch(base, local));
+  } catch (error) {
+    return null;
+  }
+}
+
+// Moves versionRef/syncedRef to the server copy and returns the document to
+// show and push next. Asks the user which version to keep when edits conflict.
+export async function resolveConflict(source, { versionRef, syncedRef }, local) {
+  const base = syncedRef.current;
+  const remote = await fetchLatest(source, base, versionRef.current);
+  versionRef.current = remote.version;
+  syncedRef.current = remote.document;
+  if (remote.document === null) return local;
+
+  const merged = rebase(base, local, remote.document);
+  if (merged !== null) return merged;
+  // eslint-disable-next-line no-alert
+  return window.confirm(source.conflictMessage) ? JSON.parse(JSON.stringify(local)) : remote.document;
+}
@@ -0,0 +1,78 @@
+// Live admin incident feed over Server-Sent Events
+// Uses fetch streaming because EventSource cannot send the Authorization header.
+
+const API_URL = process.env.REACT_APP_BACKEND_URL || '';
+const RECONNECT_DELAY_MS = 3000;
+
+const parseEvent = (block) => {
+  const event = { id: null, type: 'message', data: '' };
+  for (const line of block.split('\n')) {
+    if (line.startsWith(':')) continue; // keep-alive comment
+    const sep = line.indexOf(':');
+    const field = sep === -1 ? line : line.slice(0, sep);
+    const value = sep === -1 ? '' : line.slice(sep + 1).replace(/^ /, '');
+    if (field === 'id') event.id = value;
+    else if (field === 'event') event.type = value;
+    else if (field === 'data') event.data += value;
+  }
+  return event.data ? event : null;
+};
+
+// Whether an incident belongs in a list loaded with these server-side filters.
+// The feed carries every change, so handlers check this before inserting.
+export const matchesIncidentFilters = (incident, { status, incidentType, barangay } = {}) =>
+  (!status || incident.status === status)
+  && (!incidentType || incident.incident_type === incidentType)
+  && (!barangay || incident.barangay === barangay);
+
+// Calls onEvent({ id, type, incident }) for every change; returns an unsubscribe function.
+// A `reset` event (gap in the feed) means the list must be reloaded.
+export function subscribeIncidentFeed(onEvent) {
+  const controller = new AbortController();
+  let lastEventId = null;
+  let stopped = false;
+
+  const run = async () => {
+    while (!stopped) {
+      try {
+        const headers = { Accept: 'text/event-stream' };
+        const token = localStorage.getItem('auth_token');
+        if (token) headers.Authorization = `Bearer ${token}`;
+        if (lastEventId) headers['Last-Event-ID'] = lastEventId;
+
+        const response = await fetch(`${API_URL}/api/admin/incidents/stream`, {
+          headers,
+          signal: controller.signal,
+        });
+        if (!response.ok) throw new Error(`Feed returned ${response.status}`);
+
+        const reader = response.body.pipeThrough(new TextDecoderStream()).getReader();
+        let buffer = '';
+        for (;;) {
+          const { value, done } = await reader.read();
+          if (done) break;
+          buffer += value;
+          let boundary;
+          while ((boundary = buffer.indexOf('\n\n')) !== -1) {
+            const event = parseEvent(buffer.slice(0, boundary));
+            buffer = buffer.slice(boundary + 2);
+            if (!event) continue;
+            if (event.id) lastEventId = event.id;
+            onEvent({ id: event.id, type: event.type, incident: JSON.parse(event.data) });
+          }
+        }
+      } catch (error) {
+        if (stopped) return;
+        console.warn('[IncidentFeed] Disconnected:', error.message);
+      }
+      await new Promise((resolve) => setTimeout(resolve, RECONNECT_DELAY_MS));
+    }
+  };
+
+  run();
+
+  return () => {
+    stopped = true;
+    controller.abort();
+  };
+}
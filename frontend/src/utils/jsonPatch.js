@@ -0,0 +1,125 @@
+// Minimal RFC 6902 JSON Patch generator for syncing small edits
+// Objects and equal-length arrays are diffed member by member; arrays that only
+// grew get "add" operations; any other array change replaces the whole array.
+
+const escapeToken = (token) => String(token).replace(/~/g, '~0').replace(/\//g, '~1');
+
+const isObject = (value) => value !== null && typeof value === 'object' && !Array.isArray(value);
+
+const isEqual = (a, b) => JSON.stringify(a) === JSON.stringify(b);
+
+export function createPatch(previous, next, path = '') {
+  if (isEqual(previous, next)) return [];
+
+  if (isObject(previous) && isObject(next)) {
+    const ops = [];
+    for (const key of Object.keys(previous)) {
+      if (!(key in next)) ops.push({ op: 'remove', path: `${path}/${escapeToken(key)}` });
+    }
+    for (const key of Object.keys(next)) {
+      const childPath = `${path}/${escapeToken(key)}`;
+      if (!(key in previous)) ops.push({ op: 'add', path: childPath, value: next[key] });
+      else ops.push(...createPatch(previous[key], next[key], childPath));
+    }
+    return ops;
+  }
+
+  if (Array.isArray(previous) && Array.isArray(next)) {
+    if (previous.length === next.length) {
+      return previous.flatMap((item, index) => createPatch(item, next[index], `${path}/${index}`));
+    }
+    if (next.length > previous.length && isEqual(previous, next.slice(0, previous.length))) {
+      return next.slice(previous.length).map((value) => ({ op: 'add', path: `${path}/-`, value }));
+    }
+  }
+
+  return [{ op: 'replace', path, value: next }];
+}
+
+// Applying patches, to replay the server's deltas and rebase local edits.
+// Both return new values and leave their inputs untouched.
+
+const clone = (value) => (value === undefined ? value : JSON.parse(JSON.stringify(value)));
+
+const parsePointer = (pointer) => (pointer === ''
+  ? []
+  : pointer.slice(1).split('/').map((token) => token.replace(/~1/g, '/').replace(/~0/g, '~')));
+
+const resolveParent = (document, tokens) => {
+  let value = document;
+  for (const token of tokens.slice(0, -1)) {
+    if (value === null || typeof value !== 'object' || !(token in value)) {
+      throw new Error(`Path ${tokens.join('/')} does not exist`);
+    }
+    value = value[token];
+  }
+  if (value === null || typeof value !== 'object') throw new Error(`Path ${tokens.join('/')} does not exist`);
+  return value;
+};
+
+const arrayIndex = (array, token, allowEnd) => {
+  if (allowEnd && token === '-') return array.length;
+  const index = Number(token);
+  if (!/^(0|[1-9][0-9]*)$/.test(token) || index > array.length || (index === array.length && !allowEnd)) {
+    throw new Error(`Array index ${token} out of range`);
+  }
+  return index;
+};
+
+const addValue = (document, tokens, value) => {
+  if (tokens.length === 0) return value;
+  const parent = resolveParent(document, tokens);
+  const token = tokens[tokens.length - 1];
+  if (Array.isArray(parent)) parent.splice(arrayIndex(parent, token, true), 0, value);
+  else parent[token] = value;
+  return document;
+};
+
+const removeValue = (document, tokens) => {
+  const parent = resolveParent(document, tokens);
+  const token = tokens[tokens.length - 1];
+  if (Array.isArray(parent)) return parent.splice(arrayIndex(parent, token, false), 1)[0];
+  if (!(token in parent)) throw new Error(`Path member ${token} does not exist`);
+  const value = parent[token];
+  delete parent[token];
+  return value;
+};
+
+// RFC 6902; throws when an operation does not apply
+export function applyPatch(document, ops) {
+  let result = clone(document);
+  for (const op of ops) {
+    const tokens = parsePointer(op.path);
+    if (op.op === 'add') {
+      result = addValue(result, tokens, clone(op.value));
+    } else if (op.op === 'remove') {
+      removeValue(result, tokens);
+    } else if (op.op === 'replace') {
+      if (tokens.length) removeValue(result, tokens);
+      result = addValue(result, tokens, clone(op.value));
+    } else if (op.op === 'move' || op.op === 'copy') {
+      const from = parsePointer(op.from);
+      const value = op.op === 'move'
+        ? (from.length ? removeValue(result, from) : result)
+        : clone(from.length ? resolveParent(result, from)[from[from.length - 1]] : result);
+      result = addValue(result, tokens, value);
+    } else if (op.op === 'test') {
+      const value = tokens.length ? resolveParent(result, tokens)[tokens[tokens.length - 1]] : result;
+      if (!isEqual(value, op.value)) throw new Error(`Test failed at ${op.path}`);
+    } else {
+      throw new Error(`Unknown operation ${op.op}`);
+    }
+  }
+  return result;
+}
+
+// RFC 7396
+export function applyMergePatch(document, patch) {
+  if (!isObject(patch)) return clone(patch);
+  const result = isObject(document) ? clone(document) : {};
+  for (const [key, value] of Object.entries(patch)) {
+    if (value === null) delete result[key];
+    else result[key] = applyMergePatch(result[key], value);
+  }
+  return result;
+}
@@ -1,5 +1,7 @@
 // IndexedDB manager for offline incident queue
 
+import { jsonRequestBody } from './compressBody';
+
 const DB_NAME = 'MDRRMOOfflineDB';
 const DB_VERSION = 1;
 const STORE_NAME = 'incidents';
@@ -172,12 +174,11 @@ class OfflineQueueManager {
     for (const incident of incidents) {
       try {
         // Try to send incident to server
+        const { body, headers } = await jsonRequestBody(incident.data);
         const response = await fetch('/api/incidents', {
           method: 'POST',
-          headers: {
-            'Content-Type': 'application/json',
-          },
-          body: JSON.stringify(incident.data),
+          headers,
+          body,
         });
 
         if (response.ok) {
@@ -0,0 +1,32 @@
+import asyncio
+
+from batch import run_batch
+
+
+def json_app(bodies):
+    """ASGI app answering each path with the JSON body text from `bodies`"""
+
+    async def app(scope, receive, send):
+        await send({'type': 'http.response.start', 'status': 200, 'headers': [(b'content-type', b'application/json')]})
+        await send({'type': 'http.response.body', 'body': bodies[scope['path']]})
+
+    return app
+
+
+def test_invalid_json_sub_response_fails_only_its_item():
+    app = json_app({'/api/good': b'{"ok": true}', '/api/bad': b'{"ok": tru'})
+    items = [{'id': 1, 'path': '/api/good'}, {'id': 2, 'path': '/api/bad'}]
+
+    good, bad = asyncio.run(run_batch(app, {}, items, {}, {}))
+
+    assert (good['status'], good['body']) == (200, {'ok': True})
+    assert bad['status'] == 500
+    assert bad['id'] == 2
+
+
+def test_rejected_path_is_a_400_item():
+    items = [{'id': 1, 'path': '/api/batch'}, {'id': 2, 'path': '/etc/passwd'}]
+
+    results = asyncio.run(run_batch(json_app({}), {}, items, {}, {}))
+
+    assert [result['status'] for result in results] == [400, 400]
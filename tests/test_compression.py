@@ -0,0 +1,86 @@
+import asyncio
+import gzip
+import json
+
+from compression import DecompressionMiddleware, etag_matches, negotiate_encoding
+
+
+def test_negotiate_picks_highest_quality():
+    assert negotiate_encoding('gzip;q=0.5, br;q=0.9', ['zstd', 'br', 'gzip']) == 'br'
+
+
+def test_negotiate_uses_server_preference_on_ties():
+    assert negotiate_encoding('gzip, br, zstd', ['zstd', 'br', 'gzip']) == 'zstd'
+    assert negotiate_encoding('*', ['br', 'gzip']) == 'br'
+
+
+def test_negotiate_identity_when_nothing_acceptable():
+    assert negotiate_encoding('', ['gzip']) is None
+    assert negotiate_encoding('deflate', ['gzip']) is None
+    assert negotiate_encoding('gzip;q=0, *;q=0', ['gzip']) is None
+    assert negotiate_encoding('*;q=0.1, gzip;q=0', ['br', 'gzip']) == 'br'
+
+
+def test_etag_matches_weakly():
+    assert etag_matches('W/"abc"', '"abc"')
+    assert etag_matches('"x", "abc"', 'W/"abc"')
+    assert etag_matches('*', '"abc"')
+    assert not etag_matches(None, '"abc"')
+    assert not etag_matches('"x"', '"abc"')
+
+
+def post(middleware_kwargs, body, encoding='gzip'):
+    """Send `body` through DecompressionMiddleware; returns (status, JSON or bytes seen by the app)"""
+    received = {}
+
+    async def app(scope, receive, send):
+        chunks = []
+        while True:
+            message = await receive()
+            chunks.append(message.get('body', b''))
+            if not message.get('more_body'):
+                break
+        received['body'] = b''.join(chunks)
+        await send({'type': 'http.response.start', 'status': 200, 'headers': []})
+        await send({'type': 'http.response.body', 'body': b''})
+
+    middleware = DecompressionMiddleware(app, **middleware_kwargs)
+    scope = {'type': 'http', 'headers': [(b'content-encoding', encoding.encode())]}
+    messages = []
+
+    async def receive():
+        return {'type': 'http.request', 'body': body, 'more_body': False}
+
+    async def send(message):
+        messages.append(message)
+
+    asyncio.run(middleware(scope, receive, send))
+    status = messages[0]['status']
+    if status != 200:
+        return status, json.loads(messages[1]['body'])
+    return status, received['body']
+
+
+def test_inflates_gzip_body():
+    payload = json.dumps({'description': 'flooding ' * 100}).encode()
+
+    assert post({}, gzip.compress(payload)) == (200, payload)
+
+
+def test_rejects_decompression_bomb():
+    bomb = gzip.compress(b'\0' * (4 * 1024 * 1024))
+
+    status, body = post({}, bomb)
+
+    assert status == 413
+    assert 'ratio' in body['detail']
+    assert post({'max_size': 1024}, gzip.compress(b'x' * 4096))[0] == 413
+
+
+def test_rejects_malformed_body():
+    assert post({}, b'not gzip at all')[0] == 400
+    assert post({}, gzip.compress(b'{"a": 1}')[:-6])[0] == 400
+
+
+def test_rejects_unknown_encoding():
+    assert post({}, b'data', encoding='compress')[0] == 415
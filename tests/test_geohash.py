@@ -0,0 +1,52 @@
+import random
+
+from geohash import BASE32, cover, encode, encode_many, prefix_ranges
+
+
+def in_ranges(code, ranges):
+    return any(low <= code and (high is None or code < high) for low, high in ranges)
+
+
+def test_encode_known_value():
+    assert encode(57.64911, 10.40744, 11) == 'u4pruydqqvj'
+
+
+def test_encode_many_matches_encode():
+    lats, lons = [13.05, -33.9, 0.0, 89.99], [123.52, 151.2, 0.0, -179.99]
+
+    assert encode_many(lats, lons) == [encode(lat, lon) for lat, lon in zip(lats, lons)]
+
+
+def test_cover_contains_every_point_of_the_box():
+    box = (13.0, 123.4, 13.12, 123.6)  # min_lat, min_lon, max_lat, max_lon
+    prefixes = cover(*box)
+    ranges = prefix_ranges(prefixes)
+    rng = random.Random(1)
+
+    assert prefixes == sorted(prefixes) and len({len(prefix) for prefix in prefixes}) == 1
+    assert len(prefixes) <= 32
+    for _ in range(500):
+        lat, lon = rng.uniform(box[0], box[2]), rng.uniform(box[1], box[3])
+        assert in_ranges(encode(lat, lon), ranges)
+
+
+def test_cover_of_the_whole_world_is_one_unbounded_range():
+    assert prefix_ranges(cover(-90, -180, 90, 180)) == [('0', None)]
+
+
+def test_prefix_ranges_merge_neighbours():
+    assert prefix_ranges(['wdp', 'wdq', 'wdr', 'wdt']) == [('wdp', 'wds'), ('wdt', 'wdu')]
+
+
+def test_prefix_ranges_carry_and_end():
+    assert prefix_ranges(['b8z']) == [('b8z', 'b90')]
+    assert prefix_ranges(['zzy', 'zzz']) == [('zzy', None)]
+    assert prefix_ranges([]) == []
+
+
+def test_prefix_range_holds_exactly_its_cell():
+    (low, high), = prefix_ranges(['wdp'])
+
+    assert in_ranges('wdp' + BASE32[-1] * 6, [(low, high)])
+    assert not in_ranges('wdn' + BASE32[-1] * 6, [(low, high)])
+    assert not in_ranges('wdq000000', [(low, high)])
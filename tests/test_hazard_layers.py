@@ -0,0 +1,71 @@
+import math
+
+import numpy as np
+import pytest
+
+from hazard_layers import simplify_ring, tile_bounds, tile_json, valid_tile
+
+
+def circle(points, radius=1.0):
+    angles = np.linspace(0, 2 * math.pi, points)
+    ring = np.column_stack([radius * np.cos(angles), radius * np.sin(angles)])
+    ring[-1] = ring[0]
+    return ring
+
+
+def test_simplify_ring_drops_collinear_points():
+    ring = np.array([[0, 0], [1, 0], [2, 0], [2, 1], [2, 2], [0, 2], [0, 1], [0, 0]], dtype=float)
+
+    assert simplify_ring(ring, 0.01).tolist() == [[0, 0], [2, 0], [2, 2], [0, 2], [0, 0]]
+
+
+def test_simplify_ring_stays_within_tolerance():
+    ring = circle(200)
+
+    coarse = simplify_ring(ring, 0.05)
+    fine = simplify_ring(ring, 0.001)
+
+    assert len(coarse) < len(fine) < len(ring)
+    assert (coarse[0] == ring[0]).all() and (coarse[-1] == ring[-1]).all()
+    # Chords of the simplified outline stay within the tolerance of the circle
+    kept_radius = np.hypot(*coarse.T)
+    assert np.allclose(kept_radius, 1.0)
+    midpoints = (coarse[:-1] + coarse[1:]) / 2
+    assert (1 - np.hypot(*midpoints.T)).max() <= 0.05
+
+
+def test_simplify_ring_keeps_tiny_rings():
+    triangle = np.array([[0, 0], [1, 0], [0, 1], [0, 0]], dtype=float)
+
+    assert simplify_ring(triangle, 10) is triangle
+
+
+def test_tile_bounds():
+    assert tile_bounds(0, 0, 0) == pytest.approx((-180, -85.0511, 180, 85.0511), abs=1e-4)
+    lon_min, lat_min, lon_max, lat_max = tile_bounds(1, 1, 0)
+    assert (lon_min, lat_min, lon_max) == (0, 0, 180)
+    assert lat_max == pytest.approx(85.0511, abs=1e-4)
+
+
+def test_tile_bounds_of_neighbours_touch():
+    assert tile_bounds(12, 3480, 1900)[1] == tile_bounds(12, 3480, 1901)[3]
+    assert tile_bounds(12, 3480, 1900)[2] == tile_bounds(12, 3481, 1900)[0]
+
+
+@pytest.mark.parametrize('z, x, y, valid', [
+    (0, 0, 0, True),
+    (12, 4095, 4095, True),
+    (22, 0, 2 ** 22 - 1, True),
+    (12, 4096, 0, False),
+    (12, 0, -1, False),
+    (-1, 0, 0, False),
+    (23, 0, 0, False),
+    (1000, 0, 0, False),
+])
+def test_valid_tile(z, x, y, valid):
+    assert valid_tile(z, x, y) is valid
+
+
+def test_tile_json_rejects_invalid_tiles():
+    with pytest.raises(ValueError):
+        tile_json('flood', 'v1', 3, 8, 0)
@@ -0,0 +1,24 @@
+import asyncio
+
+import job_queue
+from job_queue import job_handler, run_job
+
+
+class UnreachablePool:
+    def acquire(self):
+        raise ConnectionError('database unreachable')
+
+
+def test_run_job_survives_failing_to_record_the_outcome():
+    ran = []
+
+    @job_handler('test.noop')
+    async def noop(payload):
+        ran.append(payload)
+
+    job = {'id': 1, 'kind': 'test.noop', 'payload': '{"n": 1}', 'attempts': 1, 'locked_by': 'w'}
+    try:
+        assert asyncio.run(run_job(UnreachablePool(), job)) is True
+    finally:
+        job_queue._handlers.pop('test.noop')
+    assert ran == [{'n': 1}]
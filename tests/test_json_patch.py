@@ -0,0 +1,66 @@
+import pytest
+
+from json_patch import (
+    JsonPatchError, JsonPatchTestFailed, apply_json_patch, apply_merge_patch, json_equal, parse_pointer,
+)
+
+
+def test_parse_pointer_unescapes_tokens():
+    assert parse_pointer('') == []
+    assert parse_pointer('/a~1b/m~0n/0') == ['a/b', 'm~n', '0']
+    with pytest.raises(JsonPatchError):
+        parse_pointer('a')
+
+
+def test_operations():
+    document = {'contacts': [{'name': 'A'}], 'notes': 'x'}
+    patched = apply_json_patch(document, [
+        {'op': 'add', 'path': '/contacts/-', 'value': {'name': 'B'}},
+        {'op': 'replace', 'path': '/notes', 'value': 'y'},
+        {'op': 'copy', 'from': '/contacts/0', 'path': '/first'},
+        {'op': 'move', 'from': '/first', 'path': '/contacts/0'},
+        {'op': 'remove', 'path': '/contacts/2'},
+    ])
+    assert patched == {'contacts': [{'name': 'A'}, {'name': 'A'}], 'notes': 'y'}
+
+
+def test_patch_is_atomic():
+    document = {'items': [1, 2]}
+    with pytest.raises(JsonPatchError):
+        apply_json_patch(document, [{'op': 'remove', 'path': '/items/0'}, {'op': 'remove', 'path': '/missing'}])
+    assert document == {'items': [1, 2]}
+
+
+@pytest.mark.parametrize('operations', [
+    {'op': 'add', 'path': '/a'},
+    [{'op': 'add', 'path': '/a'}],
+    [{'op': 'add', 'path': '/items/5', 'value': 1}],
+    [{'op': 'add', 'path': '/items/01', 'value': 1}],
+    [{'op': 'move', 'from': '/items', 'path': '/items/0'}],
+    [{'op': 'frobnicate', 'path': '/items'}],
+])
+def test_invalid_patches(operations):
+    with pytest.raises(JsonPatchError):
+        apply_json_patch({'items': [1]}, operations)
+
+
+def test_test_operation_is_type_strict():
+    document = {'done': True, 'count': 1, 'label': '1'}
+    apply_json_patch(document, [{'op': 'test', 'path': '/done', 'value': True}])
+    for path, value in [('/done', 1), ('/count', True), ('/label', 1), ('/count', '1')]:
+        with pytest.raises(JsonPatchTestFailed):
+            apply_json_patch(document, [{'op': 'test', 'path': path, 'value': value}])
+
+
+def test_json_equal_nested_values():
+    assert json_equal({'a': [1, {'b': None}]}, {'a': [1.0, {'b': None}]})
+    assert not json_equal({'a': [True]}, {'a': [1]})
+    assert not json_equal({'a': 1}, {'a': 1, 'b': 2})
+    assert not json_equal([0], [False])
+
+
+def test_merge_patch():
+    document = {'a': 1, 'b': {'c': 2, 'd': 3}}
+    assert apply_merge_patch(document, {'a': None, 'b': {'c': 5}, 'e': [1]}) == {'b': {'c': 5, 'd': 3}, 'e': [1]}
+    assert apply_merge_patch(document, ['x']) == ['x']
+    assert document == {'a': 1, 'b': {'c': 2, 'd': 3}}
@@ -0,0 +1,41 @@
+import asyncio
+
+import pytest
+
+from pg_backup import _dependency_levels
+
+
+class ForeignKeys:
+    """Fake connection answering the foreign key query with fixed edges"""
+
+    def __init__(self, *edges):
+        self.edges = edges
+
+    async def fetch(self, query, tables):
+        return [
+            {'dependent': dependent, 'referenced': referenced}
+            for dependent, referenced in self.edges
+            if dependent in tables and referenced in tables
+        ]
+
+
+def test_referenced_tables_come_first():
+    conn = ForeignKeys(('emergency_plans', 'users'), ('checklists', 'users'))
+    tables = ['checklists', 'jobs', 'emergency_plans', 'users', 'typhoon_bulletins']
+
+    levels = asyncio.run(_dependency_levels(conn, tables))
+
+    assert levels == [['jobs', 'typhoon_bulletins', 'users'], ['checklists', 'emergency_plans']]
+
+
+def test_references_outside_the_selection_are_ignored():
+    conn = ForeignKeys(('emergency_plans', 'users'))
+
+    assert asyncio.run(_dependency_levels(conn, ['emergency_plans'])) == [['emergency_plans']]
+
+
+def test_cycles_are_reported():
+    conn = ForeignKeys(('a', 'b'), ('b', 'a'))
+
+    with pytest.raises(ValueError, match='cycle'):
+        asyncio.run(_dependency_levels(conn, ['a', 'b']))
@@ -0,0 +1,47 @@
+from datetime import datetime
+
+import pytest
+
+from scheduler import Cron, Interval
+
+
+def test_interval_is_aligned_to_the_epoch():
+    every_five = Interval(minutes=5)
+    assert every_five.seconds == 300
+    assert every_five.next_after(datetime(2024, 8, 15, 2, 3, 59)) == datetime(2024, 8, 15, 2, 5)
+    # Exactly on a slot means the next one
+    assert every_five.next_after(datetime(2024, 8, 15, 2, 5)) == datetime(2024, 8, 15, 2, 10)
+    assert Interval(hours=1).next_after(datetime(2024, 12, 31, 23, 30)) == datetime(2025, 1, 1)
+
+
+def test_interval_must_be_positive():
+    with pytest.raises(ValueError):
+        Interval()
+
+
+@pytest.mark.parametrize('expression, moment, expected', [
+    ('15 0 * * *', datetime(2024, 8, 15, 0, 15), datetime(2024, 8, 16, 0, 15)),
+    ('15 0 * * *', datetime(2024, 8, 15, 0, 14, 30), datetime(2024, 8, 15, 0, 15)),
+    ('*/15 * * * *', datetime(2024, 8, 15, 10, 31), datetime(2024, 8, 15, 10, 45)),
+    ('0 2-5 * * *', datetime(2024, 8, 15, 5, 0), datetime(2024, 8, 16, 2, 0)),
+    ('30 9 * * 1,3', datetime(2024, 8, 15, 12, 0), datetime(2024, 8, 19, 9, 30)),  # Thu -> Mon
+    ('0 0 * * 7', datetime(2024, 8, 15, 12, 0), datetime(2024, 8, 18, 0, 0)),  # 7 is Sunday
+    ('0 0 1 * *', datetime(2024, 12, 15), datetime(2025, 1, 1)),
+    ('0 0 29 2 *', datetime(2024, 3, 1), datetime(2028, 2, 29)),
+    # Both day fields restricted: either matches (the 13th or a Friday)
+    ('0 0 13 * 5', datetime(2024, 8, 10), datetime(2024, 8, 13)),
+    ('0 0 13 * 5', datetime(2024, 8, 13, 1), datetime(2024, 8, 16)),
+])
+def test_cron_next_after(expression, moment, expected):
+    assert Cron(expression).next_after(moment) == expected
+
+
+@pytest.mark.parametrize('expression', ['* * * *', '60 * * * *', '* 24 * * *', '5-1 * * * *', '0 0 0 * *'])
+def test_cron_rejects_invalid_expressions(expression):
+    with pytest.raises(ValueError):
+        Cron(expression)
+
+
+def test_cron_that_never_fires():
+    with pytest.raises(ValueError):
+        Cron('0 0 31 2 *').next_after(datetime(2024, 1, 1))
@@ -0,0 +1,61 @@
+import numpy as np
+
+from spatial_index import BarangayIndex, PolygonIndex, points_in_polygons, points_in_ring
+
+
+def _ring(*points):
+    ring = np.array(points, dtype=float)
+    return np.vstack([ring, ring[:1]])
+
+
+SQUARE = _ring((0, 0), (4, 0), (4, 4), (0, 4))
+HOLE = _ring((1, 1), (3, 1), (3, 3), (1, 3))
+# Concave "U": the notch between x=1 and x=3 above y=1 is outside
+U_SHAPE = _ring((0, 0), (4, 0), (4, 4), (3, 4), (3, 1), (1, 1), (1, 4), (0, 4))
+
+
+def test_points_in_ring():
+    xs = np.array([2, 5, -1, 2, 3.999])
+    ys = np.array([2, 2, 2, 5, 0.001])
+    assert points_in_ring(xs, ys, SQUARE).tolist() == [True, False, False, False, True]
+
+
+def test_points_in_concave_ring():
+    xs = np.array([0.5, 2, 3.5, 2])
+    ys = np.array([3, 3, 3, 0.5])
+    assert points_in_ring(xs, ys, U_SHAPE).tolist() == [True, False, True, True]
+
+
+def test_points_in_ring_in_chunks(monkeypatch):
+    monkeypatch.setattr('spatial_index.MAX_MATRIX_CELLS', 8)
+    xs = np.linspace(-1, 5, 50)
+    ys = np.full(50, 2.0)
+    assert points_in_ring(xs, ys, SQUARE).tolist() == ((xs > 0) & (xs < 4)).tolist()
+
+
+def test_holes_are_excluded():
+    xs = np.array([0.5, 2])
+    ys = np.array([0.5, 2])
+    assert points_in_polygons(xs, ys, [[SQUARE, HOLE]]).tolist() == [True, False]
+
+
+def test_polygon_index_lookups():
+    entries = [
+        {'name': 'a', 'polygons': [[SQUARE * 0.01]]},
+        {'name': 'b', 'polygons': [[(SQUARE + [4, 0]) * 0.01]]},
+        {'name': 'point only', 'polygons': []},
+    ]
+    index = PolygonIndex(entries, cell=0.01)
+    assert len(index) == 2
+    assert [entry['name'] for entry in index.containing(0.02, 0.05)] == ['b']
+    assert index.containing(None, 0.05) == []
+    assert index.intersecting(0.035, 0, 0.045, 0.01) == [0, 1]
+
+
+def test_barangay_index_locate_many():
+    index = BarangayIndex([
+        {'name': 'a', 'polygons': [[SQUARE, HOLE]]},
+        {'name': 'b', 'polygons': [[HOLE]]},
+    ])
+    assert index.locate(0.5, 0.5) == 'a'
+    assert index.locate_many([0.5, 2, 10], [0.5, 2, 10]) == ['a', 'b', None]
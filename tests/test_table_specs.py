@@ -0,0 +1,65 @@
+from datetime import datetime, timedelta, timezone
+
+from bson import ObjectId
+
+from table_specs import canonical_document, canonical_row, column_names, document_to_row
+
+
+def _migrated(table, document):
+    """Row as migrate_to_neon.py writes it, read back as a dict"""
+    return dict(zip(column_names(table), document_to_row(table, document)))
+
+
+def test_canonical_row_ignores_source_representation():
+    mongo = {
+        'id': 'i-1', 'incident_type': 'flood', 'latitude': '13.05', 'longitude': 123.5,
+        'description': 'x', 'images': [{'b': 1, 'a': 2}], 'status': 'new',
+        'created_at': '2024-08-15T02:00:00.123456Z',
+    }
+    postgres = {
+        **mongo, 'latitude': 13.05, 'images': '[{"a": 2, "b": 1}]',
+        'created_at': datetime(2024, 8, 15, 2, 0, 0, 123000),
+    }
+    assert canonical_row('incidents', mongo) == canonical_row('incidents', postgres)
+
+
+def test_canonical_row_detects_changed_values():
+    row = {'id': 'h-1', 'label': 'Police', 'number': '117', 'category': 'police'}
+    assert canonical_row('hotlines', row) != canonical_row('hotlines', {**row, 'number': '911'})
+
+
+def test_canonical_row_timezone_aware_timestamps_are_utc():
+    aware = {'id': 's-1', 'client_name': 'a', 'timestamp': datetime(2024, 1, 1, 10, tzinfo=timezone.utc)}
+    naive = {**aware, 'timestamp': datetime(2024, 1, 1, 10)}
+    assert canonical_row('status_checks', aware) == canonical_row('status_checks', naive)
+
+
+def test_migrated_rows_match_source_documents():
+    documents = {
+        'users': {'_id': ObjectId(), 'id': 'u-1', 'email': 'a@b.c', 'password': 'x', 'full_name': 'A'},
+        'incidents': {
+            'id': 'i-1', 'incident_type': 'fire', 'latitude': 13, 'longitude': 123,
+            'description': 'd', 'created_at': '2024-08-15T02:00:00',
+        },
+        'map_locations': {'id': '7', 'type': 'hospital', 'name': 'n', 'address': 'a', 'lat': 1, 'lng': 2},
+        'emergency_plans': {'_id': ObjectId(), 'id': 'p-1', 'user_id': 'u-1', 'plan_data': {'contacts': []}},
+    }
+    for table, document in documents.items():
+        assert canonical_row(table, _migrated(table, document)) == canonical_document(table, document), table
+
+
+def test_missing_values_take_migration_defaults():
+    row = _migrated('incidents', {'id': 'i-1', 'incident_type': 'fire', 'latitude': 1, 'longitude': 2,
+                                  'description': 'd'})
+    assert row['images'] == '[]'
+    assert row['status'] == 'new'
+    assert abs(row['created_at'] - datetime.now(timezone.utc).replace(tzinfo=None)) < timedelta(minutes=1)
+
+
+def test_missing_timestamps_come_from_the_object_id():
+    created = datetime(2024, 8, 15, 2, 0, tzinfo=timezone.utc)
+    document = {'_id': ObjectId.from_datetime(created), 'id': 'p-1', 'user_id': 'u-1', 'plan_data': {}}
+
+    assert _migrated('emergency_plans', document)['updated_at'] == datetime(2024, 8, 15, 2, 0)
+    # Stable across runs, so replicated updates never move the value
+    assert document_to_row('emergency_plans', document) == document_to_row('emergency_plans', dict(document))
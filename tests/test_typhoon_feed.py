@@ -0,0 +1,102 @@
+import asyncio
+import threading
+import time
+from datetime import datetime, timezone
+from http.server import ThreadingHTTPServer
+
+import pytest
+import requests
+
+import typhoon_feed
+from dev_typhoon_feed import TRACK, bulletin_at, make_handler
+from typhoon_feed import BulletinParseError, BulletinSource, HttpBulletinSource, parse_bulletin
+
+
+ISSUED = datetime(2024, 7, 23, 3, 0, tzinfo=timezone.utc)
+
+
+@pytest.fixture
+def feed_url():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), make_handler(time.time(), 3600))
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f'http://127.0.0.1:{server.server_port}'
+    server.shutdown()
+    server.server_close()
+
+
+def test_dev_bulletins_follow_the_track_and_parse():
+    bulletin = parse_bulletin(bulletin_at(len(TRACK) + 1, ISSUED))
+
+    assert bulletin['bulletin_id'] == f'DEV-{len(TRACK) + 1:04d}'
+    assert (bulletin['lat'], bulletin['lon']) == TRACK[1]
+    assert bulletin['issued_at'] == datetime(2024, 7, 23, 3, 0)
+    assert [point['hours'] for point in bulletin['forecast']] == [24, 48, 72]
+    assert (bulletin['forecast'][0]['lat'], bulletin['forecast'][0]['lon']) == TRACK[2]
+    assert (bulletin['storm_radius_km'], bulletin['gale_radius_km']) == (100, 250)
+
+
+def test_parse_bulletin_sorts_forecast_and_converts_time_zone():
+    raw = bulletin_at(0, ISSUED)
+    raw['issued_at'] = '2024-07-23T11:00:00+08:00'
+    raw['forecast'].reverse()
+
+    bulletin = parse_bulletin(raw)
+
+    assert bulletin['issued_at'] == datetime(2024, 7, 23, 3, 0)
+    assert [point['hours'] for point in bulletin['forecast']] == [24, 48, 72]
+
+
+@pytest.mark.parametrize('change', [
+    lambda raw: raw.pop('center'),
+    lambda raw: raw.update(issued_at='yesterday'),
+    lambda raw: raw['center'].update(lat=95),
+    lambda raw: raw['forecast'][0].pop('lon'),
+    lambda raw: raw['forecast'][0].update(hours='soon'),
+    lambda raw: raw['forecast'][0].update(hours=None),
+    lambda raw: raw.update(forecast=[['not', 'a', 'point']]),
+    lambda raw: raw.update(forecast=12),
+    lambda raw: raw.update(wind_radii_km={'storm': 'wide'}),
+    lambda raw: raw.update(wind_radii_km=[100, 250]),
+    lambda raw: raw.update(center='13N 125E'),
+])
+def test_parse_bulletin_rejects_bad_payloads(change):
+    raw = bulletin_at(0, ISSUED)
+    change(raw)
+
+    with pytest.raises(BulletinParseError):
+        parse_bulletin(raw)
+
+
+def test_parse_bulletin_rejects_non_objects():
+    with pytest.raises(BulletinParseError):
+        parse_bulletin([bulletin_at(0, ISSUED)])
+
+
+def test_http_source_revalidates_with_etag(feed_url, monkeypatch):
+    statuses = []
+    real_get = requests.get
+
+    def recording_get(*args, **kwargs):
+        response = real_get(*args, **kwargs)
+        statuses.append(response.status_code)
+        return response
+
+    monkeypatch.setattr(typhoon_feed.requests, 'get', recording_get)
+    source = HttpBulletinSource(f'{feed_url}/bulletin/latest')
+
+    first = asyncio.run(source.fetch_latest())
+    second = asyncio.run(source.fetch_latest())
+
+    assert statuses == [200, 304]
+    assert first['id'] == 'DEV-0000'
+    assert second == first
+
+
+def test_http_source_treats_404_as_no_bulletin(feed_url):
+    assert asyncio.run(HttpBulletinSource(f'{feed_url}/missing').fetch_latest()) is None
+
+
+def test_bulletin_source_is_abstract():
+    with pytest.raises(TypeError):
+        BulletinSource()
@@ -0,0 +1,88 @@
+import numpy as np
+import pytest
+
+from typhoon_impact import (
+    ImpactCache, compute_impact, cone_radius_km, destination, haversine_km, interpolate_track, track_points,
+)
+
+
+BULLETIN = {
+    'bulletin_id': 'TC-01',
+    'lat': 13.0, 'lon': 125.0,
+    'storm_radius_km': 40,
+    'gale_radius_km': 120,
+    'forecast': [
+        {'hours': 24, 'lat': 13.5, 'lon': 123.5},
+        {'hours': 12, 'lat': 13.2, 'lon': 124.3},
+    ],
+}
+
+
+def _offset(bearing, km):
+    lat, lon = destination(BULLETIN['lat'], BULLETIN['lon'], bearing, km)
+    return float(lat), float(lon)
+
+
+def test_haversine_distance():
+    # One degree of latitude is about 111.2 km
+    assert haversine_km(13, 123, 14, 123) == pytest.approx(111.2, abs=0.1)
+    assert haversine_km(13, 123, 13, 123) == 0
+
+
+def test_destination_round_trip():
+    lat, lon = _offset(45, 150)
+    assert haversine_km(BULLETIN['lat'], BULLETIN['lon'], lat, lon) == pytest.approx(150, abs=0.01)
+
+
+def test_track_is_sorted_and_interpolated_hourly():
+    hours, lats, lons = interpolate_track(*track_points(BULLETIN))
+    assert hours[0] == 0 and hours[-1] == 24 and len(hours) == 25
+    assert lats[12] == pytest.approx(13.2)
+    assert lons[24] == pytest.approx(123.5)
+
+
+def test_cone_widens_with_lead_time():
+    radii = cone_radius_km(np.array([0, 12, 24, 200]))
+    assert list(radii) == [30, 65, 100, 460]
+
+
+def test_compute_impact_classifies_zones():
+    barangays = [
+        {'name': 'Center', 'lat': BULLETIN['lat'], 'lon': BULLETIN['lon'] + 0.1},
+        {'name': 'Gale', 'lat': _offset(0, 100)[0], 'lon': _offset(0, 100)[1]},
+        {'name': 'Cone', 'lat': 13.55, 'lon': 123.45},
+        {'name': 'Far', 'lat': 8.0, 'lon': 118.0},
+    ]
+    locations = [{'id': 1, 'name': 'Hospital', 'type': 'hospital', 'lat': 13.01, 'lng': 125.01}]
+    impact = compute_impact(BULLETIN, barangays, locations)
+
+    assert [(area['name'], area['zone']) for area in impact['barangays']] == [
+        ('Center', 'storm'), ('Gale', 'gale'), ('Cone', 'cone'),
+    ]
+    cone = impact['barangays'][2]
+    assert cone['closest_approach_hours'] == 24
+    assert cone['closest_approach_km'] < cone['distance_km']
+    assert impact['facilities'][0]['zone'] == 'storm'
+    assert set(impact['zones']) == {'storm', 'gale', 'cone'}
+    assert impact['track']['coordinates'][0] == [125.0, 13.0]
+    assert impact['barangays_available']
+
+
+def test_compute_impact_without_reference_data():
+    bulletin = {**BULLETIN, 'storm_radius_km': None, 'gale_radius_km': None, 'forecast': []}
+    impact = compute_impact(bulletin, [], [])
+    assert impact['barangays'] == [] and impact['facilities'] == []
+    assert not impact['barangays_available']
+    assert set(impact['zones']) == {'cone'}
+    ring = impact['zones']['cone']['coordinates'][0]
+    assert ring[0] == ring[-1]
+
+
+def test_impact_cache_evicts_least_recently_used():
+    cache = ImpactCache(max_entries=2)
+    cache.put('a', 1)
+    cache.put('b', 2)
+    assert cache.get('a') == 1
+    cache.put('c', 3)
+    assert cache.get('b') is None
+    assert cache.get('a') == 1 and cache.get('c') == 3
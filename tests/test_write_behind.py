@@ -0,0 +1,53 @@
+import asyncio
+
+from write_behind import WriteBehindBuffer
+
+
+class SlowConnection:
+    def __init__(self, written, started):
+        self.written = written
+        self.started = started
+
+    async def copy_records_to_table(self, table, records, columns):
+        self.started.set()
+        await asyncio.sleep(0.05)
+        self.written.extend(records)
+
+
+class FakePool:
+    def __init__(self):
+        self.written = []
+        self.started = asyncio.Event()
+
+    def acquire(self):
+        pool = self
+
+        class Acquire:
+            async def __aenter__(self):
+                return SlowConnection(pool.written, pool.started)
+
+            async def __aexit__(self, *exc):
+                return False
+
+        return Acquire()
+
+
+def test_stop_during_a_flush_keeps_the_batch():
+    async def scenario():
+        pool = FakePool()
+
+        async def get_pool():
+            return pool
+
+        buffer = WriteBehindBuffer(get_pool, 'status_checks', ['id'], batch_size=2, flush_interval=10)
+        await buffer.start()
+        for number in range(5):
+            await buffer.add((number,))
+        await pool.started.wait()  # the first batch is out of the buffer and being copied
+        await buffer.stop()
+        return pool.written, len(buffer)
+
+    written, left = asyncio.run(scenario())
+
+    assert sorted(written) == [(number,) for number in range(5)]
+    assert left == 0